@@ -1,21 +1,11 @@
 import os
 import sys
-import re
-from typing import List, Literal, Optional
 
 import dotenv
 import pandas as pd
-from langchain.prompts import PromptTemplate
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, WebBaseLoader
-from langchain_community.vectorstores import SKLearnVectorStore
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_nomic.embeddings import NomicEmbeddings  # local
-from langchain_openai import OpenAIEmbeddings  # api
-from pydantic import BaseModel, Field
 
+from src.services.ingestion_pipeline import IngestionPipeline
 from src.services.retrival_engine import RetrivalEngine
-from src.utils.document_loader import load_documents_from_urls
 from src.utils.convert_gdrive_link import convert_gdrive_link
 
 
@@ -36,43 +26,28 @@ def main():
     # Convert any Google Drive share links to direct download links
     converted_urls = [convert_gdrive_link(url) for url in urls]
 
-    # Load documents from the URLs
-    docs = [PyPDFLoader(url).load() for url in converted_urls]
-    docs_list = [item for sublist in docs for item in sublist]
-
-    # Initialize a text splitter with specified chunk size and overlap
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=600, chunk_overlap=100
+    # Stream documents through load -> split -> embed -> upsert; chunks are
+    # indexed while later documents are still downloading
+    engine = RetrivalEngine()
+    pipeline = IngestionPipeline(
+        engine,
+        item_type="nutrition_document",
+        metadata={"category": "nutrition_article"},
+        batch_size=100,
     )
-
-    # Create a retrival engine
-    retrival_engine = RetrivalEngine()
-
-    # Split the documents into chunks
-    doc_splits = text_splitter.split_documents(docs_list)
-
-    contents = [doc.page_content for doc in doc_splits]
-    metadatas = []
-
-    for doc in doc_splits:
-        metadata = dict(doc.metadata)
-        metadata["content"] = "nutrition_article"
-        metadatas.append(metadata)
-
-    # Add items to retrival engine in smaller batches
-    batch_size = 10
-    for i in range(0, len(contents), batch_size):
-        batch_contents = contents[i:i+batch_size]
-        batch_metadatas = metadatas[i:i+batch_size]
-        
-        # This will use the cache for any existing embeddings
-        ids = retrival_engine.bulk_add_items(
-            contents=batch_contents,
-            metadatas=batch_metadatas,
-            item_types=["nutrition_document"] * len(batch_contents)
-        )
-
-    print("All documents stored in Pinecone!")
+    stats = pipeline.run(converted_urls)
+
+    if stats["failed_urls"]:
+        print(f"Could not load {stats['failed']} of {stats['failed'] + stats['urls']} URLs:")
+        for url, error in stats["failed_urls"]:
+            print(f"  {url}: {error}")
+    print(f"Indexed {stats['upserted']} new chunks ({stats['skipped']} already indexed) "
+          f"from {stats['documents']} documents in {stats['seconds']:.0f}s")
+    # The engine falls back to the local index if Pinecone could not be opened
+    if engine.use_pinecone:
+        print(f"All documents stored in Pinecone index {engine.index_name}!")
+    else:
+        print(f"All documents stored in the local vector index under {engine.cache_dir}!")
 
 
 if __name__ == "__main__":
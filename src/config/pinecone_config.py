@@ -1,27 +1,126 @@
+import logging
 import os
+import threading
+from typing import Dict, Optional
+
 from pinecone import Pinecone, ServerlessSpec
 
-def initialize_pinecone(index_name: str) -> None:
-    """Initialize Pinecone and create index if it doesn't exist."""
-    
-    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    
-    # List existing indexes
-    existing_indexes = [index.name for index in pc.list_indexes()]
-    
-    if index_name not in existing_indexes:
-        print(f"Creating new Pinecone index: {index_name}")
-        pc.create_index(
-            name=index_name,
-            dimension=1536,  # OpenAI embedding dimension
-            metric="cosine",
-            spec=ServerlessSpec(
-                cloud="aws",
-                region="us-east-1",
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_NAME = "recommendation-index"
+
+# Dimension of the default OpenAI embedding model, text-embedding-ada-002
+DEFAULT_DIMENSION = 1536
+
+# Process-wide client and index handles; each owns a connection pool worth reusing
+_lock = threading.RLock()
+_clients: Dict[str, Pinecone] = {}
+_indexes: Dict[str, object] = {}
+_index_hosts: Dict[str, str] = {}
+_initialized: set = set()
+
+
+def get_pinecone_client(api_key: Optional[str] = None) -> Pinecone:
+    """
+    Return the shared Pinecone client for ``api_key``, creating it on first use.
+
+    Args:
+        api_key (str, optional): Pinecone API key, ``PINECONE_API_KEY`` if None
+    """
+    api_key = api_key or os.getenv("PINECONE_API_KEY")
+    if not api_key:
+        raise ValueError("PINECONE_API_KEY environment variable not set")
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = Pinecone(api_key=api_key)
+        return client
+
+
+def initialize_pinecone(index_name: str, dimension: Optional[int] = DEFAULT_DIMENSION) -> None:
+    """
+    Initialize Pinecone and create index if it doesn't exist.
+
+    The existence check runs once per index and process; later calls return
+    immediately.
+
+    Args:
+        index_name (str): Name of the index
+        dimension (int, optional): Vector dimension to create the index with. An
+            existing index of another dimension is rejected; None accepts any
+            existing index but cannot create one.
+    """
+    with _lock:
+        if index_name in _initialized:
+            return
+
+        pc = get_pinecone_client()
+
+        # List existing indexes
+        existing_indexes = [index.name for index in pc.list_indexes()]
+
+        if index_name not in existing_indexes:
+            if dimension is None:
+                raise ValueError(f"Pinecone index {index_name} does not exist and no dimension was given to create it")
+            logger.info(f"Creating new Pinecone index: {index_name} ({dimension} dimensions)")
+            pc.create_index(
+                name=index_name,
+                dimension=dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region="us-east-1",
+                )
             )
-        )
-    else:
-        print(f"Using existing Pinecone index: {index_name}")
+        else:
+            existing_dimension = pc.describe_index(index_name).dimension
+            if dimension is not None and existing_dimension != dimension:
+                raise ValueError(
+                    f"Pinecone index {index_name} has dimension {existing_dimension}, not {dimension}; "
+                    "migrate into a new index with src.utils.migrate_embeddings"
+                )
+            logger.info(f"Using existing Pinecone index: {index_name}")
+        _initialized.add(index_name)
+
+
+def get_pinecone_index_host(index_name: str = DEFAULT_INDEX_NAME, dimension: Optional[int] = DEFAULT_DIMENSION) -> str:
+    """Return the data-plane host of ``index_name``, resolved once per process."""
+    with _lock:
+        host = _index_hosts.get(index_name)
+        if host is None:
+            initialize_pinecone(index_name, dimension)
+            host = _index_hosts[index_name] = get_pinecone_client().describe_index(index_name).host
+        return host
+
+
+def get_pinecone_index(index_name: str = DEFAULT_INDEX_NAME, dimension: Optional[int] = DEFAULT_DIMENSION):
+    """
+    Return the shared index handle for ``index_name``.
+
+    The index is created if needed and its host resolved on the first call;
+    every later call, from any engine or store in the process, reuses the same
+    handle and its connection pool.
+
+    Args:
+        index_name (str): Name of the index
+        dimension (int, optional): Vector dimension, see ``initialize_pinecone``
+    """
+    with _lock:
+        index = _indexes.get(index_name)
+        if index is None:
+            host = get_pinecone_index_host(index_name, dimension)
+            index = _indexes[index_name] = get_pinecone_client().Index(host=host)
+        return index
+
+
+def reset_pinecone_registry() -> None:
+    """Forget every pooled client and index handle, e.g. after forking or rotating keys."""
+    with _lock:
+        _clients.clear()
+        _indexes.clear()
+        _index_hosts.clear()
+        _initialized.clear()
+
 
 def delete_pinecone_index(index_name: str = "recommendation-index"):
     """
@@ -30,18 +129,18 @@ def delete_pinecone_index(index_name: str = "recommendation-index"):
     Args:
         index_name (str): Name of the index to delete
     """
-    # Get API key from environment
-    api_key = os.getenv("PINECONE_API_KEY")
-    if not api_key:
-        raise ValueError("PINECONE_API_KEY environment variable not set")
-    
-    # Initialize Pinecone client
-    pc = Pinecone(api_key=api_key)
+    # Shared client; raises if PINECONE_API_KEY is not set
+    pc = get_pinecone_client()
     
     # Delete the index
     if index_name in [index_info["name"] for index_info in pc.list_indexes()]:
-        print(f"Deleting Pinecone index: {index_name}")
+        logger.info(f"Deleting Pinecone index: {index_name}")
         pc.delete_index(index_name)
-        print(f"Index {index_name} deleted successfully")
+        logger.info(f"Index {index_name} deleted successfully")
     else:
-        print(f"Index {index_name} does not exist")
+        logger.info(f"Index {index_name} does not exist")
+
+    with _lock:
+        _indexes.pop(index_name, None)
+        _index_hosts.pop(index_name, None)
+        _initialized.discard(index_name)
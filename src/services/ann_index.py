@@ -0,0 +1,119 @@
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length; zero rows are left as zeros."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) coarse quantizer for approximate cosine search.
+
+    Vectors are partitioned by spherical k-means into ``nlist`` clusters. A
+    query is only scored against the vectors in the ``nprobe`` clusters whose
+    centroids are closest to it, so raising ``nprobe`` trades latency for
+    recall; ``nprobe == nlist`` is an exact search.
+
+    The index only owns the centroids. Callers keep the cluster of each vector
+    (see ``assign``) alongside their own storage, so inserts and deletes never
+    touch the quantizer and it never needs to be retrained for correctness,
+    only occasionally for balance.
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, iterations: int = 10, seed: int = 0):
+        """
+        Initialize an untrained index.
+
+        Args:
+            nlist (int, optional): Number of clusters, 4 * sqrt(n) at training time if None
+            nprobe (int): Default number of clusters scored per query
+            iterations (int): k-means iterations when training
+            seed (int): Random seed for centroid initialisation and sampling
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @staticmethod
+    def default_nlist(count: int) -> int:
+        return max(1, int(4 * math.sqrt(count)))
+
+    def train(self, vectors: np.ndarray, max_training_points: int = 256) -> None:
+        """
+        Fit centroids to ``vectors`` with spherical k-means.
+
+        At most ``max_training_points`` vectors per cluster are sampled, which
+        is plenty for stable centroids and keeps training time bounded.
+
+        Args:
+            vectors (np.ndarray): Vectors to cluster, one per row
+            max_training_points (int): Sample size per cluster
+        """
+        if len(vectors) == 0:
+            raise ValueError("Cannot train an IVF index on no vectors")
+
+        rng = np.random.default_rng(self.seed)
+        nlist = min(self.nlist or self.default_nlist(len(vectors)), len(vectors))
+        sample = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        if len(sample) > nlist * max_training_points:
+            sample = sample[rng.choice(len(sample), nlist * max_training_points, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            # Empty clusters keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = normalize_rows(sums[filled])
+
+        self.centroids = centroids
+        self.nlist = nlist
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the cluster of each row of ``vectors``."""
+        if not self.trained:
+            raise RuntimeError("IVF index is not trained")
+        if len(vectors) == 0:
+            return np.empty(0, dtype=np.int32)
+        return np.argmax(np.asarray(vectors, dtype=np.float32) @ self.centroids.T, axis=1).astype(np.int32)
+
+    def probe(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Return the ``nprobe`` clusters closest to ``query``."""
+        if not self.trained:
+            raise RuntimeError("IVF index is not trained")
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        similarities = self.centroids @ np.asarray(query, dtype=np.float32)
+        if nprobe >= self.nlist:
+            return np.arange(self.nlist, dtype=np.int32)
+        return np.argpartition(-similarities, nprobe - 1)[:nprobe].astype(np.int32)
+
+    def state(self) -> Dict[str, Any]:
+        """Arrays and settings needed to restore the index with ``from_state``."""
+        return {
+            "centroids": self.centroids,
+            "nprobe": self.nprobe,
+            "iterations": self.iterations,
+            "seed": self.seed,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "IVFIndex":
+        centroids = np.asarray(state["centroids"], dtype=np.float32)
+        index = cls(nlist=len(centroids), nprobe=int(state["nprobe"]),
+                    iterations=int(state["iterations"]), seed=int(state["seed"]))
+        index.centroids = centroids
+        return index
@@ -0,0 +1,257 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the heap footprint of a cached value in bytes.
+
+    NumPy arrays report their buffer size; lists of floats are counted as the
+    list itself plus one boxed float per element.
+    """
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value[:1]) * len(value)
+    return sys.getsizeof(value)
+
+
+class BoundedCache:
+    """
+    In-memory cache with an entry and/or byte budget, LRU or LFU eviction and
+    an optional time-to-live.
+
+    Reads through ``get`` update the recency/frequency bookkeeping and the hit
+    and miss counters; ``in`` checks do neither. Expired entries are dropped
+    when they are next read, or evicted first when the cache is over budget.
+    """
+
+    POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: str = "lru",
+        sizeof: Callable[[Any], int] = estimate_size,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of entries, unbounded if None
+            max_bytes (int, optional): Maximum estimated size of all values, unbounded if None
+            policy (str): Eviction policy, "lru" or "lfu"
+            sizeof (Callable[[Any], int]): Function estimating the size of a value
+            on_evict (Callable[[Hashable, Any], None], optional): Called with the key and
+                value of each entry that is evicted or expires
+            ttl (float, optional): Seconds an entry stays valid after it is written, forever if None
+            clock (Callable[[], float]): Time source for ``ttl``
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown eviction policy: {policy}. Expected one of {list(self.POLICIES)}")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.ttl = ttl
+        self.clock = clock
+
+        # key -> (value, size, expires_at); insertion order doubles as LRU order
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # LFU bookkeeping: key -> use count, count -> keys in LRU order
+        self._freq: Dict[Hashable, int] = {}
+        self._freq_buckets: Dict[int, "OrderedDict[Hashable, None]"] = {}
+        self._min_freq = 0
+
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._expired(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._entries))
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self.get(key)
+        if value is None and key not in self._entries:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.put(key, value)
+
+    def __delitem__(self, key: Hashable) -> None:
+        if not self.pop(key):
+            raise KeyError(key)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value and record a hit or miss."""
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._expire(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._touch(key)
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Insert or replace a value, evicting others if the budget is exceeded.
+
+        ``expires_at`` overrides the expiry time that ``ttl`` would give the entry.
+        """
+        size = self.sizeof(value)
+        if expires_at is None and self.ttl is not None:
+            expires_at = self.clock() + self.ttl
+        if key in self._entries:
+            self.current_bytes -= self._entries[key][1]
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            self._touch(key)
+        else:
+            self._entries[key] = (value, size, expires_at)
+            self.current_bytes += size
+            if self.policy == "lfu":
+                self._freq[key] = 1
+                self._freq_buckets.setdefault(1, OrderedDict())[key] = None
+                self._min_freq = 1
+        self._evict(protect=key)
+
+    def pop(self, key: Hashable) -> bool:
+        """Remove a key without counting it as an eviction; returns whether it was present."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.current_bytes -= entry[1]
+        if self.policy == "lfu":
+            self._remove_freq(key)
+        return True
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live value without touching bookkeeping or counters."""
+        entry = self._entries.get(key)
+        if entry is None or self._expired(entry):
+            return default
+        return entry[0]
+
+    def items(self) -> Iterator[tuple]:
+        """Yield ``(key, value, expires_at)`` for every live entry, least recently used first."""
+        for key, (value, _, expires_at) in list(self._entries.items()):
+            if expires_at is None or expires_at > self.clock():
+                yield key, value, expires_at
+
+    def clear(self) -> None:
+        """Drop every entry; counters are kept."""
+        self._entries.clear()
+        self._freq.clear()
+        self._freq_buckets.clear()
+        self._min_freq = 0
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss and eviction counters and current usage."""
+        lookups = self.hits + self.misses
+        return {
+            "policy": self.policy,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        if self.max_bytes is not None and self.current_bytes > self.max_bytes:
+            return True
+        return False
+
+    def _expired(self, entry: tuple) -> bool:
+        return entry[2] is not None and entry[2] <= self.clock()
+
+    def _expire(self, key: Hashable) -> None:
+        value = self._entries[key][0]
+        self.pop(key)
+        self.expirations += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _evict(self, protect: Hashable) -> None:
+        if self._over_budget() and self.ttl is not None:
+            for key in [key for key, entry in self._entries.items() if key != protect and self._expired(entry)]:
+                self._expire(key)
+        while self._over_budget() and len(self._entries) > 1:
+            self._record_eviction(self._victim(protect))
+        # A single value larger than the whole budget is not kept
+        if self._over_budget() and len(self._entries) == 1 and protect in self._entries:
+            self._record_eviction(protect)
+
+    def _record_eviction(self, key: Hashable) -> None:
+        value = self._entries[key][0]
+        self.pop(key)
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _victim(self, protect: Hashable) -> Hashable:
+        # The entry being inserted is never its own victim
+        if self.policy == "lfu":
+            bucket = self._freq_buckets.get(self._min_freq, {})
+            for key in bucket:
+                if key != protect:
+                    return key
+            for freq in sorted(self._freq_buckets):
+                for key in self._freq_buckets[freq]:
+                    if key != protect:
+                        return key
+        for key in self._entries:
+            if key != protect:
+                return key
+        return protect
+
+    def _touch(self, key: Hashable) -> None:
+        if self.policy == "lru":
+            self._entries.move_to_end(key)
+            return
+        freq = self._freq[key]
+        bucket = self._freq_buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._freq_buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = freq + 1
+        self._freq[key] = freq + 1
+        self._freq_buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def _remove_freq(self, key: Hashable) -> None:
+        freq = self._freq.pop(key)
+        bucket = self._freq_buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._freq_buckets[freq]
+            if self._min_freq == freq:
+                self._min_freq = min(self._freq_buckets, default=0)
@@ -0,0 +1,199 @@
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.services.metadata_filter import compile_filter
+
+logger = logging.getLogger(__name__)
+
+
+# Metadata types Pinecone can filter on
+FILTERABLE_TYPES = (str, int, float, bool)
+
+# Longer strings are document text, not filter values
+MAX_FILTERABLE_STRING = 256
+
+
+def filterable_metadata(
+    metadata: Dict[str, Any],
+    fields: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = ("content",),
+) -> Dict[str, Any]:
+    """
+    Select the metadata worth sending to the vector index.
+
+    With ``fields`` only those keys are kept. Otherwise every value Pinecone can
+    filter on is kept: strings up to ``MAX_FILTERABLE_STRING`` characters,
+    numbers, booleans and lists of short strings. Keys in ``exclude`` are always
+    dropped.
+
+    Args:
+        metadata (Dict[str, Any]): Full item metadata
+        fields (Iterable[str], optional): Explicit allow-list of keys
+        exclude (Iterable[str]): Keys never sent to the index
+
+    Returns:
+        Dict[str, Any]: The slim metadata
+    """
+    excluded = set(exclude)
+    if fields is not None:
+        return {key: metadata[key] for key in fields if key in metadata and key not in excluded}
+
+    slim = {}
+    for key, value in metadata.items():
+        if key in excluded:
+            continue
+        if isinstance(value, str):
+            if len(value) <= MAX_FILTERABLE_STRING:
+                slim[key] = value
+        elif isinstance(value, FILTERABLE_TYPES):
+            slim[key] = value
+        elif isinstance(value, list) and all(
+            isinstance(item, str) and len(item) <= MAX_FILTERABLE_STRING for item in value
+        ):
+            slim[key] = value
+    return slim
+
+
+class DocumentStore:
+    """
+    SQLite-backed id -> document store holding chunk text and full metadata.
+
+    The vector index only needs the fields queries filter on; everything else
+    lives here and is joined back onto query results by id. Each thread gets
+    its own connection and the database runs in WAL mode, so readers never
+    block the ingesting writer, including across processes.
+    """
+
+    # SQLite's default limit on bound parameters is 999
+    _LOOKUP_BATCH = 900
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the store.
+
+        Args:
+            path (str): SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def __contains__(self, doc_id: str) -> bool:
+        row = self._connect().execute("SELECT 1 FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return row is not None
+
+    def put_many(self, documents: List[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """
+        Insert or replace documents in one transaction.
+
+        Args:
+            documents (List[Tuple[str, str, Dict[str, Any]]]): ``(id, content, metadata)`` triples
+        """
+        if not documents:
+            return
+        rows = [
+            (doc_id, content, json.dumps(metadata, default=str))
+            for doc_id, content, metadata in documents
+        ]
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO documents (id, content, metadata) VALUES (?, ?, ?)", rows
+            )
+
+    def get_many(self, ids: List[str], fields: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up documents by id with batched queries.
+
+        Args:
+            ids (List[str]): Document ids; unknown ids are left out of the result
+            fields (Iterable[str], optional): Keys to return, ``content`` included;
+                every key if None
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Metadata with ``content`` for each found id
+        """
+        fields = None if fields is None else list(fields)
+        want_content = fields is None or "content" in fields
+        columns = "id, content, metadata" if want_content else "id, metadata"
+
+        unique_ids = list(dict.fromkeys(ids))
+        documents = {}
+        connection = self._connect()
+        for start in range(0, len(unique_ids), self._LOOKUP_BATCH):
+            chunk = unique_ids[start:start + self._LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(chunk))
+            for row in connection.execute(f"SELECT {columns} FROM documents WHERE id IN ({placeholders})", chunk):
+                metadata = json.loads(row[-1])
+                if want_content:
+                    metadata["content"] = row[1]
+                if fields is not None:
+                    metadata = {key: metadata[key] for key in fields if key in metadata}
+                documents[row[0]] = metadata
+        return documents
+
+    def find_ids(self, filter_criteria: Dict[str, Any]) -> List[str]:
+        """
+        Return the ids of the documents whose metadata matches a Pinecone-style filter.
+
+        Rows are streamed, so memory stays flat however many documents are stored.
+        """
+        predicate = compile_filter(filter_criteria)
+        cursor = self._connect().execute("SELECT id, metadata FROM documents")
+        return [doc_id for doc_id, metadata in cursor if predicate(json.loads(metadata))]
+
+    def iter_documents(self, batch_size: int = 500) -> Iterator[List[Tuple[str, str, Dict[str, Any]]]]:
+        """
+        Yield every document as batches of ``(id, content, metadata)`` triples, in id order.
+
+        Each batch is a separate query keyed on the last id seen, so no read
+        transaction stays open while the caller processes a batch.
+        """
+        connection = self._connect()
+        last_id = ""
+        while True:
+            rows = connection.execute(
+                "SELECT id, content, metadata FROM documents WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            yield [(doc_id, content, json.loads(metadata)) for doc_id, content, metadata in rows]
+            last_id = rows[-1][0]
+
+    def delete_many(self, ids: List[str]) -> int:
+        """
+        Delete documents by id.
+
+        Returns:
+            int: Number of documents deleted
+        """
+        deleted = 0
+        with self._connect() as connection:
+            for start in range(0, len(ids), self._LOOKUP_BATCH):
+                chunk = ids[start:start + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(chunk))
+                deleted += connection.execute(f"DELETE FROM documents WHERE id IN ({placeholders})", chunk).rowcount
+        return deleted
+
+    def clear(self) -> None:
+        """Delete every document."""
+        with self._connect() as connection:
+            connection.execute("DELETE FROM documents")
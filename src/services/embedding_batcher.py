@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken ships with langchain_openai, but stay usable without it
+    tiktoken = None
+
+from src.services.metrics import EMBEDDING_API_LATENCY, EMBEDDING_API_TEXTS
+
+logger = logging.getLogger(__name__)
+
+
+# OpenAI allows 2048 inputs and 300k tokens per embeddings request; stay just under
+DEFAULT_MAX_BATCH_TOKENS = 280_000
+DEFAULT_MAX_BATCH_SIZE = 2048
+
+
+class TokenCounter:
+    """Count tokens the way the embedding model will, falling back to a char estimate."""
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+
+    def _load(self) -> None:
+        # Loaded on first use: tiktoken may need to download the encoding
+        self._loaded = True
+        if tiktoken is None:
+            return
+        try:
+            self._encoding = tiktoken.encoding_for_model(self.model) if self.model else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            self._load_default()
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer, estimating token counts: {e}")
+
+    def _load_default(self) -> None:
+        try:
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer, estimating token counts: {e}")
+
+    def __call__(self, text: str) -> int:
+        if not self._loaded:
+            self._load()
+        if self._encoding is None:
+            return max(1, len(text) // 4)
+        return max(1, len(self._encoding.encode(text, disallowed_special=())))
+
+
+def pack_batches(
+    items: List[Tuple[str, str]],
+    count_tokens: Callable[[str], int],
+    max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+) -> List[List[Tuple[str, str]]]:
+    """
+    Greedily pack ``(key, text)`` pairs into batches under a token and size budget.
+
+    Args:
+        items (List[Tuple[str, str]]): Cache keys and the texts to embed
+        count_tokens (Callable[[str], int]): Token counter for the embedding model
+        max_batch_tokens (int): Token budget per request
+        max_batch_size (int): Maximum number of inputs per request
+
+    Returns:
+        List[List[Tuple[str, str]]]: Batches in input order
+    """
+    batches: List[List[Tuple[str, str]]] = []
+    batch: List[Tuple[str, str]] = []
+    batch_tokens = 0
+
+    for key, text in items:
+        tokens = count_tokens(text)
+        if batch and (batch_tokens + tokens > max_batch_tokens or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+            batch_tokens = 0
+        batch.append((key, text))
+        batch_tokens += tokens
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an API error is a rate limit or transient server/network failure."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # Pinecone exceptions carry the HTTP status as ``status``
+        status = getattr(error, "status", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    name = type(error).__name__
+    return any(marker in name for marker in ("RateLimit", "Timeout", "Connection"))
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff_delay(error: Exception, attempt: int, base_delay: float, max_delay: float) -> float:
+    delay = _retry_after(error)
+    if delay is None:
+        delay = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+    return delay
+
+
+def call_with_retry(
+    fn: Callable[[], List[List[float]]],
+    max_retries: int = 6,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    label: str = "Embedding request",
+) -> List[List[float]]:
+    """
+    Call ``fn`` and retry retryable errors with exponential backoff and jitter.
+
+    A ``retry-after`` header on the error takes precedence over the computed delay.
+    ``label`` names the request in retry log messages.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = _backoff_delay(e, attempt, base_delay, max_delay)
+            logger.warning(f"{label} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+async def acall_with_retry(
+    fn: Callable[[], Awaitable[List[List[float]]]],
+    max_retries: int = 6,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    label: str = "Embedding request",
+) -> List[List[float]]:
+    """Async version of ``call_with_retry``; backs off without blocking the event loop."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = _backoff_delay(e, attempt, base_delay, max_delay)
+            logger.warning(f"{label} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+class BatchEmbedder:
+    """
+    Embed many texts as token-budgeted batches sent with bounded concurrency.
+    """
+
+    def __init__(
+        self,
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        aembed_documents: Optional[Callable[[List[str]], Awaitable[List[List[float]]]]] = None,
+        model: Optional[str] = None,
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_concurrency: int = 4,
+        max_retries: int = 6,
+    ):
+        """
+        Initialize the batch embedder.
+
+        Args:
+            embed_documents (Callable[[List[str]], List[List[float]]]): Provider call for one batch
+            aembed_documents (Callable[[List[str]], Awaitable[List[List[float]]]], optional):
+                Async provider call for one batch, used by ``aembed``
+            model (str, optional): Embedding model name, used to pick the tokenizer
+            max_batch_tokens (int): Token budget per request
+            max_batch_size (int): Maximum number of inputs per request
+            max_concurrency (int): Maximum number of requests in flight
+            max_retries (int): Retries per batch on rate limits and transient errors
+        """
+        self.embed_documents = embed_documents
+        self.aembed_documents = aembed_documents
+        self.count_tokens = TokenCounter(model)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+    def embed(self, items: List[Tuple[str, str]]) -> Iterator[Dict[str, List[float]]]:
+        """
+        Embed ``(key, text)`` pairs, yielding each batch's results as it completes.
+
+        Args:
+            items (List[Tuple[str, str]]): Cache keys and the texts to embed
+
+        Yields:
+            Dict[str, List[float]]: Embeddings of one completed batch keyed by cache key
+        """
+        batches = pack_batches(items, self.count_tokens, self.max_batch_tokens, self.max_batch_size)
+        if len(batches) == 1 or self.max_concurrency <= 1:
+            for batch in batches:
+                yield self._embed_batch(batch)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            futures = [executor.submit(self._embed_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _embed_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+        texts = [text for _, text in batch]
+
+        def request() -> List[List[float]]:
+            with EMBEDDING_API_LATENCY.time(call="documents"):
+                return self.embed_documents(texts)
+
+        embeddings = call_with_retry(request, max_retries=self.max_retries)
+        EMBEDDING_API_TEXTS.inc(len(texts))
+        return {key: embedding for (key, _), embedding in zip(batch, embeddings)}
+
+    async def aembed(self, items: List[Tuple[str, str]]) -> AsyncIterator[Dict[str, List[float]]]:
+        """
+        Async version of ``embed``, with at most ``max_concurrency`` requests awaiting at once.
+
+        Args:
+            items (List[Tuple[str, str]]): Cache keys and the texts to embed
+
+        Yields:
+            Dict[str, List[float]]: Embeddings of one completed batch keyed by cache key
+        """
+        batches = pack_batches(items, self.count_tokens, self.max_batch_tokens, self.max_batch_size)
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def embed_batch(batch: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+            texts = [text for _, text in batch]
+
+            async def request() -> List[List[float]]:
+                with EMBEDDING_API_LATENCY.time(call="documents"):
+                    return await self.aembed_documents(texts)
+
+            async with semaphore:
+                embeddings = await acall_with_retry(request, max_retries=self.max_retries)
+            EMBEDDING_API_TEXTS.inc(len(texts))
+            return {key: embedding for (key, _), embedding in zip(batch, embeddings)}
+
+        tasks = [asyncio.ensure_future(embed_batch(batch)) for batch in batches]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -1,29 +1,146 @@
+import asyncio
+import logging
 import os
+import threading
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-import json
+from typing import Dict, List, Any, Optional, Union
 import hashlib
-import pickle
+import re
 
+import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from langchain_nomic import NomicEmbeddings
 
+from src.services.cache_tier import BoundedCache
+from src.services.embedding_batcher import (
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_BATCH_TOKENS,
+    BatchEmbedder,
+    acall_with_retry,
+    call_with_retry,
+)
+from src.services.embedding_store import AppendOnlyEmbeddingStore, EmbeddingStore, MemmapEmbeddingStore
+from src.services.metrics import (
+    BYTES_PERSISTED,
+    EMBEDDING_API_LATENCY,
+    EMBEDDING_API_TEXTS,
+    EMBEDDING_CACHE_EVICTIONS,
+    EMBEDDING_CACHE_HITS,
+    EMBEDDING_CACHE_MISSES,
+)
+from src.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Native output size of the OpenAI embedding models
+MODEL_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+# Models that cannot return shortened vectors
+FIXED_DIMENSION_MODELS = {"text-embedding-ada-002"}
+
+
+def embedding_variant(model: Optional[str] = None, dimensions: Optional[int] = None) -> Optional[str]:
+    """
+    Name the files and keys of embeddings from ``model`` at ``dimensions``.
+
+    The default model at its native size returns None and keeps the original
+    names, so existing caches stay valid; any other model or size gets its own
+    name, so vectors of different shapes never mix.
+    """
+    model = model or DEFAULT_EMBEDDING_MODEL
+    native = MODEL_DIMENSIONS.get(model)
+    if dimensions is not None and dimensions != native and model in FIXED_DIMENSION_MODELS:
+        raise ValueError(f"{model} only returns {native}-dimensional embeddings")
+    if model == DEFAULT_EMBEDDING_MODEL and dimensions in (None, native):
+        return None
+    return re.sub(r"[^A-Za-z0-9_-]", "_", f"{model}-{dimensions or native or 'native'}")
+
 
 class EmbeddingCache:
     """
     Cache for storing and retrieving text embeddings to avoid redundant API calls.
     """
     
-    def __init__(self, cache_dir: str = "./embedding_cache"):
+    STORAGE_FILES = {
+        "log": "embedding_cache.log",
+        "mmap": "embedding_matrix.f32",
+    }
+    INT8_MATRIX_FILE = "embedding_matrix_int8.i8"
+
+    def __init__(
+        self,
+        cache_dir: str = "./embedding_cache",
+        storage: str = "log",
+        quantization: Optional[str] = None,
+        model: Optional[str] = None,
+        dimensions: Optional[int] = None,
+        max_memory_bytes: Optional[int] = 128 * 1024 * 1024,
+        max_memory_entries: Optional[int] = None,
+        eviction_policy: str = "lru",
+        max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_concurrency: int = 4,
+    ):
         """
         Initialize the embedding cache.
         
         Args:
             cache_dir (str): Directory to store the cache files
+            storage (str): "log" keeps hot vectors as Python lists backed by an
+                append-only log; "mmap" keeps every vector in a memory-mapped
+                float32 matrix and hands out zero-copy NumPy views
+            quantization (str, optional): "int8" stores "mmap" vectors as int8 codes with a
+                per-row scale, a quarter of the disk and page-cache footprint, and hands out
+                decoded float32 copies
+            model (str, optional): OpenAI embedding model, text-embedding-ada-002 if None
+            dimensions (int, optional): Embedding size to request; text-embedding-3 models
+                return shortened vectors (e.g. 256 or 512) at little quality cost. The
+                model's native size if None.
+            max_memory_bytes (int, optional): Budget for the in-memory tier of the
+                "log" storage mode, unbounded if None
+            max_memory_entries (int, optional): Entry budget for the in-memory tier,
+                unbounded if None
+            eviction_policy (str): "lru" or "lfu" eviction for the in-memory tier
+            max_batch_tokens (int): Token budget of one embeddings request
+            max_batch_size (int): Maximum number of texts in one embeddings request
+            max_concurrency (int): Maximum number of embeddings requests in flight
         """
+        if storage not in self.STORAGE_FILES:
+            raise ValueError(f"Unknown storage mode: {storage}. Expected one of {list(self.STORAGE_FILES)}")
+        if quantization not in (None, "int8") or (quantization and storage != "mmap"):
+            raise ValueError(f"Quantization {quantization!r} is not supported with {storage!r} storage")
+
+        self.model = model or DEFAULT_EMBEDDING_MODEL
+        self.variant = embedding_variant(self.model, dimensions)
+        self.dimension = dimensions or MODEL_DIMENSIONS.get(self.model)
+        # Only ask the API for a size when it differs from the model's own
+        self.dimensions = dimensions if dimensions != MODEL_DIMENSIONS.get(self.model) else None
+
         self.cache_dir = Path(cache_dir)
-        self.cache_file = self.cache_dir / "embedding_cache.pkl"
-        self.cache: Dict[str, List[float]] = {}
+        self.storage = storage
+        self.quantization = quantization
+        self.cache_file = self._variant_file(
+            self.INT8_MATRIX_FILE if quantization == "int8" else self.STORAGE_FILES[storage]
+        )
+        self.legacy_cache_file = self.cache_dir / "embedding_cache.pkl"
+        self.cache = BoundedCache(
+            max_entries=max_memory_entries,
+            max_bytes=max_memory_bytes,
+            policy=eviction_policy,
+            on_evict=lambda key, value: EMBEDDING_CACHE_EVICTIONS.inc(),
+        )
+        self.store: Optional[EmbeddingStore] = None
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._store_lock = threading.RLock()
+        self._inflight = SingleFlight()
         
         # Ensure cache directory exists
         self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -33,7 +150,13 @@ class EmbeddingCache:
         
         # Try to initialize OpenAI embeddings first
         if os.getenv("OPENAI_API_KEY"):
-            self.embeddings_model = OpenAIEmbeddings()
+            # One API request per packed batch, retried only by call_with_retry
+            self.embeddings_model = OpenAIEmbeddings(
+                model=self.model,
+                dimensions=self.dimensions,
+                chunk_size=max_batch_size,
+                max_retries=0,
+            )
         else:
             raise RuntimeError(
                     "Failed to initialize embeddings. Please set OPENAI_API_KEY "
@@ -46,103 +169,342 @@ class EmbeddingCache:
             #         "Failed to initialize embeddings. Please set OPENAI_API_KEY "
             #         "environment variable or ensure local embedding model is available."
             #     ) from e
+
+        self.batcher = BatchEmbedder(
+            lambda texts: self.embeddings_model.embed_documents(texts),
+            aembed_documents=lambda texts: self.embeddings_model.aembed_documents(texts),
+            model=getattr(self.embeddings_model, "model", None),
+            max_batch_tokens=max_batch_tokens,
+            max_batch_size=max_batch_size,
+            max_concurrency=max_concurrency,
+        )
     
+    def _variant_file(self, name: str) -> Path:
+        """Path of cache file ``name`` for this model and dimension."""
+        if self.variant is None:
+            return self.cache_dir / name
+        stem, suffix = os.path.splitext(name)
+        return self.cache_dir / f"{stem}-{self.variant}{suffix}"
+
     def _load_cache(self) -> None:
-        """Load the cache from disk."""
-        try:
-            if self.cache_file.exists():
-                with open(self.cache_file, "rb") as f:
-                    self.cache = pickle.load(f)
-                print(f"Loaded {len(self.cache)} cached embeddings")
-            else:
-                print("No existing cache found, starting fresh")
-                self.cache = {}
-        except Exception as e:
-            print(f"Error loading cache: {e}")
-            self.cache = {}
-    
-    def _save_cache(self) -> None:
-        """Save the cache to disk."""
+        """Open the on-disk store; vectors are read lazily on first use."""
+        is_new = not self.cache_file.exists()
+        if self.storage == "mmap":
+            self.store = MemmapEmbeddingStore(str(self.cache_file), dtype=self.quantization or "float32")
+        else:
+            self.store = AppendOnlyEmbeddingStore(str(self.cache_file))
+
+        log_file = self._variant_file(self.STORAGE_FILES["log"])
+        matrix_file = self._variant_file(self.STORAGE_FILES["mmap"])
+        if is_new and self.quantization and matrix_file.exists():
+            # One-off quantization of the float32 matrix
+            try:
+                imported = self.store.import_store(MemmapEmbeddingStore(str(matrix_file)))
+                logger.info(f"Imported {imported} embeddings from {matrix_file}")
+            except Exception as e:
+                logger.error(f"Error importing embedding matrix: {e}")
+        elif is_new and self.storage == "mmap" and log_file.exists():
+            # One-off copy of the append-only log into the matrix
+            try:
+                imported = self.store.import_store(AppendOnlyEmbeddingStore(str(log_file)))
+                logger.info(f"Imported {imported} embeddings from {log_file}")
+            except Exception as e:
+                logger.error(f"Error importing embedding log: {e}")
+        elif is_new and self.variant is None and self.legacy_cache_file.exists():
+            # One-off import of the old pickle format
+            try:
+                imported = self.store.import_pickle(str(self.legacy_cache_file))
+                logger.info(f"Imported {imported} embeddings from {self.legacy_cache_file}")
+            except Exception as e:
+                logger.error(f"Error importing legacy cache: {e}")
+
+        logger.info(f"Indexed {len(self.store)} cached embeddings")
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        """Look a key up in memory first, then on disk."""
+        embedding = self._lookup_memory(key)
+        if embedding is not None:
+            return embedding
+        return self._lookup_disk(key)
+
+    def _lookup_memory(self, key: str) -> Optional[List[float]]:
+        """Look a key up without doing any file I/O, so it is safe on an event loop."""
+        if self.storage == "mmap":
+            # The mapping is itself the in-memory copy; views are handed out directly.
+            # No _store_lock: the store swaps its index and mapping together under
+            # its own lock, which is never held during I/O, and never reuses rows.
+            embedding = self.store.get(key)
+            if embedding is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                EMBEDDING_CACHE_HITS.inc(tier="mmap")
+            return embedding
+        with self._lock:
+            embedding = self.cache.get(key)
+        if embedding is not None:
+            EMBEDDING_CACHE_HITS.inc(tier="memory")
+        return embedding
+
+    def _lookup_disk(self, key: str) -> Optional[List[float]]:
+        """Look a key up in the on-disk store, picking up other processes' writes."""
+        with self._store_lock:
+            embedding = self.store.get(key)
+            if embedding is None and self.store.refresh() > 0:
+                # Another process may have embedded this text since we last looked
+                embedding = self.store.get(key)
+
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                EMBEDDING_CACHE_MISSES.inc()
+                return None
+            self.disk_hits += 1
+            EMBEDDING_CACHE_HITS.inc(tier=self.storage)
+            if self.storage != "mmap":
+                # Promote back into the memory tier after an eviction
+                self.cache[key] = embedding
+        return embedding
+
+    def _stored(self, key: str) -> Optional[List[float]]:
+        """Read a key straight from the store without touching the counters."""
+        with self._store_lock:
+            return self.store.get(key) if key in self.store else None
+
+    def _save_cache(self, new_entries: Dict[str, List[float]]) -> None:
+        """Append new embeddings to the on-disk store."""
         try:
-            with open(self.cache_file, "wb") as f:
-                pickle.dump(self.cache, f)
-            print(f"Saved {len(self.cache)} embeddings to cache")
+            with self._store_lock:
+                written = self.store.put_many(new_entries)
+            BYTES_PERSISTED.inc(written, cache="embedding")
         except Exception as e:
-            print(f"Error saving cache: {e}")
+            logger.error(f"Error saving cache: {e}")
     
     def _generate_key(self, text: str) -> str:
-        """Generate a unique key for a text string."""
+        """Generate a unique key for a text string under this model and dimension."""
+        if self.variant is not None:
+            text = f"{self.model}|{self.dimension}|{text}"
         return hashlib.md5(text.encode('utf-8')).hexdigest()
     
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str) -> Union[List[float], np.ndarray]:
         """
         Get embedding for text, either from cache or by generating a new one.
+
+        Concurrent callers missing on the same text share a single API call.
         
         Args:
             text (str): The text to get embedding for
             
         Returns:
-            List[float]: The embedding vector
+            Union[List[float], np.ndarray]: The embedding vector; a read-only
+            float32 view in "mmap" storage mode
         """
         key = self._generate_key(text)
         
-        if key in self.cache:
-            print(f"Using cached embedding for: {text[:30]}...")
-            return self.cache[key]
+        cached = self._lookup(key)
+        if cached is not None:
+            logger.debug("Using cached embedding for: %.30s...", text)
+            return cached
         
-        # Generate new embedding if not in cache
-        print(f"Generating new embedding for: {text[:30]}...")
-        embedding = self.embeddings_model.embed_query(text)
-        
-        # Store in cache
-        self.cache[key] = embedding
-        self._save_cache()
+        # Generate new embedding if not in cache, unless another caller already is
+        embedding = self._inflight.do(key, lambda: self._embed_one(key, text))
         
+        if self.storage == "mmap":
+            return self._stored_or(key, embedding)
         return embedding
     
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def get_embeddings(self, texts: List[str]) -> Union[List[List[float]], np.ndarray]:
         """
         Get embeddings for multiple texts, using cache when possible.
+
+        Duplicate texts are embedded once, and texts already being embedded by
+        a concurrent caller are awaited rather than requested again.
         
         Args:
             texts (List[str]): List of texts to embed
             
         Returns:
-            List[List[float]]: List of embedding vectors
+            Union[List[List[float]], np.ndarray]: List of embedding vectors, or a
+            2-D float32 array of shape (len(texts), dimension) in "mmap" storage mode
+        """
+        keys = [self._generate_key(text) for text in texts]
+        texts_by_key = dict(zip(keys, texts))
+        found = {}
+        
+        # Check which unique texts need new embeddings
+        for key, text in texts_by_key.items():
+            cached = self._lookup(key)
+            if cached is not None:
+                logger.debug("Using cached embedding for: %.30s...", text)
+                found[key] = cached
+        
+        missing = [key for key in texts_by_key if key not in found]
+        if missing:
+            found.update(self._inflight.do_many(
+                missing, lambda claimed: self._embed_batch(claimed, texts_by_key)
+            ))
+        
+        return self._assemble(keys, found)
+    
+    def _embed_one(self, key: str, text: str) -> List[float]:
+        """Call the embedding API for one text and cache the result."""
+        # A concurrent caller may have stored it between our lookup and now
+        stored = self._stored(key)
+        if stored is not None:
+            return stored
+        
+        logger.debug("Generating new embedding for: %.30s...", text)
+        embedding = call_with_retry(lambda: self._embed_query(text))
+        self._remember({key: embedding})
+        return embedding
+    
+    def _embed_batch(self, keys: List[str], texts_by_key: Dict[str, str]) -> Dict[str, List[float]]:
         """
-        embeddings = []
-        texts_to_embed = []
-        indices = []
-        
-        # Check which texts need new embeddings
-        for i, text in enumerate(texts):
-            key = self._generate_key(text)
-            if key in self.cache:
-                print(f"Using cached embedding for: {text[:30]}...")
-                embeddings.append(self.cache[key])
-            else:
-                texts_to_embed.append(text)
-                indices.append(i)
-        
-        # If there are texts that need embedding
-        if texts_to_embed:
-            # Generate new embeddings
-            print(f"Generating {len(texts_to_embed)} new embeddings...")
-            new_embeddings = self.embeddings_model.embed_documents(texts_to_embed)
+        Embed several texts as token-budgeted requests sent concurrently, caching
+        each request's results as soon as it completes.
+        """
+        logger.debug("Generating %d new embeddings...", len(keys))
+        new_entries = {}
+        for batch_entries in self.batcher.embed([(key, texts_by_key[key]) for key in keys]):
+            self._remember(batch_entries)
+            new_entries.update(batch_entries)
+        return new_entries
+    
+    async def aget_embedding(self, text: str) -> Union[List[float], np.ndarray]:
+        """
+        Async version of ``get_embedding``.
+
+        Memory lookups run inline; disk reads and writes run in a worker thread
+        so the event loop never blocks on file I/O.
+        
+        Args:
+            text (str): The text to get embedding for
             
-            # Insert new embeddings in the right positions and update cache
-            for idx, text, embedding in zip(indices, texts_to_embed, new_embeddings):
-                key = self._generate_key(text)
-                self.cache[key] = embedding
-                embeddings.insert(idx, embedding)
+        Returns:
+            Union[List[float], np.ndarray]: The embedding vector
+        """
+        key = self._generate_key(text)
+        
+        cached = self._lookup_memory(key)
+        if cached is None:
+            cached = await asyncio.to_thread(self._lookup_disk, key)
+        if cached is not None:
+            logger.debug("Using cached embedding for: %.30s...", text)
+            return cached
+        
+        embedding = await self._inflight.ado(key, lambda: self._aembed_one(key, text))
+        
+        if self.storage == "mmap":
+            return self._stored_or(key, embedding)
+        return embedding
+    
+    async def aget_embeddings(self, texts: List[str]) -> Union[List[List[float]], np.ndarray]:
+        """
+        Async version of ``get_embeddings``.
+        
+        Args:
+            texts (List[str]): List of texts to embed
             
-            # Save updated cache
-            self._save_cache()
+        Returns:
+            Union[List[List[float]], np.ndarray]: List of embedding vectors, or a
+            2-D float32 array in "mmap" storage mode
+        """
+        keys = [self._generate_key(text) for text in texts]
+        texts_by_key = dict(zip(keys, texts))
+        found = {}
+        
+        for key in texts_by_key:
+            cached = self._lookup_memory(key)
+            if cached is not None:
+                found[key] = cached
+        
+        on_disk = [key for key in texts_by_key if key not in found]
+        if on_disk:
+            disk_hits = await asyncio.to_thread(lambda: {key: self._lookup_disk(key) for key in on_disk})
+            found.update({key: embedding for key, embedding in disk_hits.items() if embedding is not None})
+        
+        missing = [key for key in texts_by_key if key not in found]
+        if missing:
+            found.update(await self._inflight.ado_many(
+                missing, lambda claimed: self._aembed_batch(claimed, texts_by_key)
+            ))
+        
+        return self._assemble(keys, found)
+    
+    async def _aembed_one(self, key: str, text: str) -> List[float]:
+        """Async version of ``_embed_one``."""
+        stored = await asyncio.to_thread(self._stored, key)
+        if stored is not None:
+            return stored
         
-        return embeddings
+        logger.debug("Generating new embedding for: %.30s...", text)
+        embedding = await acall_with_retry(lambda: self._aembed_query(text))
+        await asyncio.to_thread(self._remember, {key: embedding})
+        return embedding
+    
+    async def _aembed_batch(self, keys: List[str], texts_by_key: Dict[str, str]) -> Dict[str, List[float]]:
+        """Async version of ``_embed_batch``."""
+        logger.debug("Generating %d new embeddings...", len(keys))
+        new_entries = {}
+        async for batch_entries in self.batcher.aembed([(key, texts_by_key[key]) for key in keys]):
+            await asyncio.to_thread(self._remember, batch_entries)
+            new_entries.update(batch_entries)
+        return new_entries
+    
+    def _assemble(self, keys: List[str], found: Dict[str, List[float]]) -> Union[List[List[float]], np.ndarray]:
+        """Lay embeddings out in input order, as a 2-D array in "mmap" mode."""
+        if self.storage == "mmap":
+            if all(key in self.store for key in keys):
+                try:
+                    return self.store.get_many(keys)
+                except KeyError:
+                    # Cleared by another thread or process since the check
+                    pass
+            return np.asarray([found[key] for key in keys], dtype=np.float32).reshape(len(keys), -1)
+        return [found[key] for key in keys]
+    
+    def _embed_query(self, text: str) -> List[float]:
+        with EMBEDDING_API_LATENCY.time(call="query"):
+            embedding = self.embeddings_model.embed_query(text)
+        EMBEDDING_API_TEXTS.inc()
+        return embedding
+    
+    async def _aembed_query(self, text: str) -> List[float]:
+        with EMBEDDING_API_LATENCY.time(call="query"):
+            embedding = await self.embeddings_model.aembed_query(text)
+        EMBEDDING_API_TEXTS.inc()
+        return embedding
+    
+    def _remember(self, new_entries: Dict[str, List[float]]) -> None:
+        """Persist new embeddings and keep them in the memory tier."""
+        self._save_cache(new_entries)
+        if self.storage != "mmap":
+            with self._lock:
+                for key, embedding in new_entries.items():
+                    self.cache[key] = embedding
+    
+    def _stored_or(self, key: str, embedding: List[float]) -> np.ndarray:
+        """Prefer the zero-copy view of a stored embedding in "mmap" mode."""
+        stored = self._stored(key)
+        return stored if stored is not None else np.asarray(embedding, dtype=np.float32)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache effectiveness.
+
+        Returns:
+            Dict[str, Any]: Memory tier counters and usage, disk tier hits, misses
+            that required an API call, and the number of stored embeddings
+        """
+        return {
+            "memory": self.cache.stats(),
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stored": len(self.store),
+        }
     
     def clear_cache(self) -> None:
         """Clear the embedding cache."""
-        self.cache = {}
-        self._save_cache()
-        print("Embedding cache cleared.")
+        with self._lock, self._store_lock:
+            self.cache.clear()
+            self.store.clear()
+        logger.info("Embedding cache cleared.")
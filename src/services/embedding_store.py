@@ -0,0 +1,736 @@
+import json
+import logging
+import os
+import pickle
+import struct
+import threading
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.quantization import dequantize_int8, quantize_int8
+from src.utils.file_lock import file_lock
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingStore:
+    """
+    Base class for on-disk embedding stores keyed by the md5 hex of the text.
+    """
+
+    path: Path
+
+    def __contains__(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def keys(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def put_many(self, items: Dict[str, List[float]]) -> int:
+        raise NotImplementedError
+
+    def put(self, key: str, embedding: List[float]) -> int:
+        """Store a single embedding."""
+        return self.put_many({key: embedding})
+
+    def compact(self) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def import_pickle(self, pickle_path: str) -> int:
+        """
+        Import embeddings from a legacy pickled ``{key: embedding}`` cache file.
+
+        Args:
+            pickle_path (str): Path to the legacy pickle file
+
+        Returns:
+            int: Number of embeddings imported
+        """
+        with open(pickle_path, "rb") as f:
+            legacy_cache = pickle.load(f)
+        before = len(self)
+        self.put_many(legacy_cache)
+        return len(self) - before
+
+    def import_store(self, other: "EmbeddingStore", batch_size: int = 1024) -> int:
+        """
+        Copy every embedding from another store into this one.
+
+        Args:
+            other (EmbeddingStore): Store to copy from
+            batch_size (int): Number of embeddings written per batch
+
+        Returns:
+            int: Number of embeddings imported
+        """
+        before = len(self)
+        batch = {}
+        for key in other.keys():
+            embedding = other.get(key)
+            if embedding is not None:
+                batch[key] = embedding
+            if len(batch) >= batch_size:
+                self.put_many(batch)
+                batch = {}
+        if batch:
+            self.put_many(batch)
+        return len(self) - before
+
+    def _fsync_dir(self) -> None:
+        # Persist renames and new files; not supported on every platform
+        try:
+            fd = os.open(self.path.parent, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+class AppendOnlyEmbeddingStore(EmbeddingStore):
+    """
+    Append-only on-disk store for embedding vectors.
+
+    Every new embedding is appended to a log file as one record, so a cache miss
+    costs a single small write instead of re-pickling the whole cache. At startup
+    only the key -> offset index is built by walking the record headers; vectors
+    are read from disk on demand.
+
+    Several processes can share one log: appends, compaction and clearing happen
+    under an exclusive file lock after first reading whatever other processes
+    appended, so concurrent writers merge instead of overwriting each other.
+
+    Record layout: 32-byte md5 hex key, uint32 value count, uint32 crc32 of the
+    payload, followed by the float32 payload.
+    """
+
+    _HEADER = struct.Struct("<32sII")
+
+    def __init__(
+        self,
+        path: str,
+        compaction_ratio: float = 0.5,
+        min_compaction_bytes: int = 16 * 1024 * 1024,
+    ):
+        """
+        Initialize the store and index any existing log file.
+
+        Args:
+            path (str): Path of the log file
+            compaction_ratio (float): Fraction of dead bytes that triggers a compaction
+            min_compaction_bytes (int): Log size below which compaction is never triggered
+        """
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.compaction_ratio = compaction_ratio
+        self.min_compaction_bytes = min_compaction_bytes
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self.dead_bytes = 0
+        self.size = 0
+        self._file_id: Optional[Tuple[int, int]] = None
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            self.path.touch(exist_ok=True)
+            self._scan(truncate=True)
+
+    def _scan(self, truncate: bool = False) -> None:
+        """Rebuild the key -> (offset, count) index from the record headers."""
+        self.index = {}
+        self.dead_bytes = 0
+        self.size = 0
+        stat = self.path.stat()
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self._scan_from(0, stat.st_size, truncate)
+
+    def _scan_from(self, offset: int, file_size: int, truncate: bool) -> None:
+        """Index the complete records between ``offset`` and ``file_size``."""
+        with open(self.path, "rb") as f:
+            while offset + self._HEADER.size <= file_size:
+                f.seek(offset)
+                raw_key, count, _ = self._HEADER.unpack(f.read(self._HEADER.size))
+                record_size = self._HEADER.size + count * 4
+                if offset + record_size > file_size:
+                    break
+                key = raw_key.decode("ascii")
+                if key in self.index:
+                    self.dead_bytes += self._record_size(self.index[key][1])
+                self.index[key] = (offset, count)
+                offset += record_size
+
+        # Drop a torn record left behind by a crash in the middle of an append.
+        # Only safe while holding the lock, otherwise it may be another
+        # process's append in progress.
+        if truncate and offset < file_size:
+            logger.warning(f"Truncating {file_size - offset} bytes of incomplete records from {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+        self.size = offset
+
+    def refresh(self, truncate: bool = False) -> int:
+        """
+        Pick up records written by other processes since the last read.
+
+        Args:
+            truncate (bool): Drop a torn tail record; only pass True while holding the lock
+
+        Returns:
+            int: Change in the number of indexed embeddings
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return 0
+
+        before = len(self.index)
+        if (stat.st_dev, stat.st_ino) != self._file_id or stat.st_size < self.size:
+            # Another process compacted or cleared the log
+            self._scan(truncate)
+        elif stat.st_size > self.size:
+            self._scan_from(self.size, stat.st_size, truncate)
+        return len(self.index) - before
+
+    def _record_size(self, count: int) -> int:
+        return self._HEADER.size + count * 4
+
+    def _encode(self, key: str, embedding: List[float]) -> bytes:
+        payload = array("f", embedding).tobytes()
+        header = self._HEADER.pack(key.encode("ascii"), len(embedding), zlib.crc32(payload))
+        return header + payload
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self.index))
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """
+        Read a single embedding from disk.
+
+        Args:
+            key (str): Cache key of the embedding
+
+        Returns:
+            Optional[List[float]]: The embedding, or None if missing or corrupt
+        """
+        for _ in range(2):
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+
+            offset, count = entry
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                if (stat.st_dev, stat.st_ino) == self._file_id:
+                    f.seek(offset)
+                    raw = f.read(self._record_size(count))
+                    break
+            # The log was swapped out by another process; offsets are stale
+            self.refresh()
+        else:
+            return None
+
+        _, _, checksum = self._HEADER.unpack_from(raw)
+        payload = raw[self._HEADER.size:]
+        if len(payload) != count * 4 or zlib.crc32(payload) != checksum:
+            logger.warning(f"Discarding corrupt embedding record for key {key}")
+            del self.index[key]
+            self.dead_bytes += len(raw)
+            return None
+
+        values = array("f")
+        values.frombytes(payload)
+        return values.tolist()
+
+    def put_many(self, items: Dict[str, List[float]]) -> int:
+        """
+        Append several embeddings to the log in one write.
+
+        Keys that are already stored, including ones just written by another
+        process, are skipped, since an embedding for a given text never changes.
+
+        Args:
+            items (Dict[str, List[float]]): Embeddings keyed by cache key
+
+        Returns:
+            int: Number of bytes appended to the log
+        """
+        if not items:
+            return 0
+
+        with file_lock(self.lock_path):
+            self.refresh(truncate=True)
+            new_items = [(key, embedding) for key, embedding in items.items() if key not in self.index]
+            if not new_items:
+                return 0
+
+            chunks = []
+            offset = self.size
+            for key, embedding in new_items:
+                record = self._encode(key, embedding)
+                self.index[key] = (offset, len(embedding))
+                offset += len(record)
+                chunks.append(record)
+
+            with open(self.path, "ab") as f:
+                f.write(b"".join(chunks))
+                f.flush()
+                os.fsync(f.fileno())
+            written = offset - self.size
+            self.size = offset
+
+            if self.size >= self.min_compaction_bytes and self.dead_bytes >= self.size * self.compaction_ratio:
+                self._compact()
+            return written
+
+    def compact(self) -> None:
+        """
+        Rewrite the log with only live records.
+
+        The new log is written to a temporary file and atomically swapped in, so
+        a crash during compaction leaves the previous log intact. Other processes
+        notice the swap and re-index on their next read.
+        """
+        with file_lock(self.lock_path):
+            self.refresh(truncate=True)
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        new_index: Dict[str, Tuple[int, int]] = {}
+        offset = 0
+
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            for key, (old_offset, count) in self.index.items():
+                src.seek(old_offset)
+                record = src.read(self._record_size(count))
+                dst.write(record)
+                new_index[key] = (offset, count)
+                offset += len(record)
+            dst.flush()
+            os.fsync(dst.fileno())
+
+        os.replace(tmp_path, self.path)
+        self._fsync_dir()
+
+        logger.info(f"Compacted embedding log from {self.size} to {offset} bytes")
+        stat = self.path.stat()
+        self._file_id = (stat.st_dev, stat.st_ino)
+        self.index = new_index
+        self.size = offset
+        self.dead_bytes = 0
+
+    def clear(self) -> None:
+        """Remove every stored embedding, for every process sharing the log."""
+        with file_lock(self.lock_path):
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            open(tmp_path, "wb").close()
+            os.replace(tmp_path, self.path)
+            self._fsync_dir()
+            self._scan()
+
+
+class MemmapEmbeddingStore(EmbeddingStore):
+    """
+    Embedding store backed by a memory-mapped float32 matrix.
+
+    Vectors live in one contiguous ``rows x dimension`` float32 file with a
+    parallel keys file holding the 32-byte md5 key of every row. Lookups return
+    read-only views into the mapping, so nothing is copied onto the Python heap
+    and several processes mapping the same file share one page-cached copy.
+
+    Writers append rows under an exclusive file lock after picking up rows
+    other processes added, so concurrent writers never clobber each other.
+
+    The keys file starts with a header holding a generation number that
+    ``clear`` and ``compact`` bump. Both write a new matrix file and swap it in
+    instead of reusing or truncating rows, so a view handed out earlier keeps
+    the vector it was given, and another process that still maps the old file
+    is never cut short. Readers compare the generation and re-index when it
+    has changed.
+
+    With ``dtype="int8"`` each row is instead a float32 scale followed by one
+    int8 code per dimension (see ``quantize_int8``), about a quarter of the
+    size; lookups then return decoded float32 copies rather than views.
+    """
+
+    _KEY_SIZE = 32
+    # Magic and generation, padded to one key slot
+    _HEADER = struct.Struct("<8sQ16x")
+    _MAGIC = b"EMBKEYS1"
+    DTYPES = ("float32", "int8")
+
+    def __init__(
+        self,
+        path: str,
+        dimension: Optional[int] = None,
+        initial_capacity: int = 1024,
+        dtype: str = "float32",
+    ):
+        """
+        Initialize the store and map any existing matrix file.
+
+        Args:
+            path (str): Path of the matrix file; keys and metadata sit next to it
+            dimension (int, optional): Vector size, taken from the first write if omitted
+            initial_capacity (int): Number of rows preallocated on first write
+            dtype (str): Row encoding, "float32" or "int8"
+        """
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unknown dtype: {dtype}. Expected one of {list(self.DTYPES)}")
+        self.path = Path(path)
+        self.dtype = dtype
+        self.keys_path = self.path.with_suffix(".keys")
+        self.meta_path = self.path.with_suffix(".json")
+        self.lock_path = self.path.with_suffix(".lock")
+        self.initial_capacity = initial_capacity
+        self.dimension = dimension
+        self.index: Dict[str, int] = {}
+        self.rows = 0
+        self.capacity = 0
+        self.generation = -1
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_id: Optional[Tuple[int, int]] = None
+        # Held only while swapping the index and mapping, never during I/O
+        self._view_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            self._init_keys()
+            self._load_meta()
+            self.refresh(truncate=True)
+
+    def _init_keys(self) -> None:
+        """Create the keys file, or add the header to one written without it."""
+        if not self.keys_path.exists() or self.keys_path.stat().st_size == 0:
+            self._write_keys(0, b"")
+            return
+        with open(self.keys_path, "rb") as f:
+            head = f.read(len(self._MAGIC))
+            if head == self._MAGIC:
+                return
+            f.seek(0)
+            raw_keys = f.read()
+        logger.info(f"Adding a generation header to {self.keys_path}")
+        self._write_keys(0, raw_keys[:len(raw_keys) - len(raw_keys) % self._KEY_SIZE])
+
+    def _write_keys(self, generation: int, raw_keys: bytes) -> None:
+        """Atomically replace the keys file."""
+        tmp_path = self.keys_path.with_name(self.keys_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self._HEADER.pack(self._MAGIC, generation) + raw_keys)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.keys_path)
+        self._fsync_dir()
+
+    def _read_generation(self, f) -> int:
+        f.seek(0)
+        magic, generation = self._HEADER.unpack(f.read(self._HEADER.size))
+        if magic != self._MAGIC:
+            raise ValueError(f"{self.keys_path} is not an embedding keys file")
+        return generation
+
+    def _load_meta(self) -> None:
+        if self.meta_path.exists():
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            stored_dimension = meta["dimension"]
+            if self.dimension is not None and self.dimension != stored_dimension:
+                raise ValueError(
+                    f"{self.path} holds {stored_dimension}-d vectors, got dimension={self.dimension}"
+                )
+            if meta.get("dtype", "float32") != self.dtype:
+                raise ValueError(f"{self.path} holds {meta['dtype']} vectors, got dtype={self.dtype}")
+            self.dimension = stored_dimension
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.dimension * 4 if self.dtype == "float32" else self.dimension + 4
+
+    def refresh(self, truncate: bool = False) -> int:
+        """
+        Pick up rows written, and clears or compactions done, by other processes.
+
+        Args:
+            truncate (bool): Repair writes cut short by a crash, i.e. drop a torn tail key
+                and finish an interrupted ``clear``; only pass True while holding the lock
+
+        Returns:
+            int: Change in the number of indexed embeddings
+        """
+        before = len(self.index)
+        if self.dimension is None:
+            self._load_meta()
+
+        while True:
+            with open(self.keys_path, "rb") as f:
+                generation = self._read_generation(f)
+                rows = self.rows if generation == self.generation else 0
+                f.seek(self._HEADER.size + rows * self._KEY_SIZE)
+                raw_keys = f.read()
+            if generation != self.generation or self._matrix_changed():
+                mapping = self._open_matrix()
+            else:
+                mapping = (self._matrix, self.capacity, self._matrix_id)
+            with open(self.keys_path, "rb") as f:
+                if self._read_generation(f) != generation:
+                    continue
+            # The matrix file is replaced before the keys file, so with the
+            # generation unchanged the mapping is either this generation's
+            # matrix or the one a swap has written but not yet published. A
+            # compaction's holds the same rows in the same order; a clear's
+            # holds none, so it is shorter than the keys
+            if mapping[1] >= rows + len(raw_keys) // self._KEY_SIZE:
+                break
+            if not truncate:
+                # Wait for the clear to finish, or finish it if it was cut short
+                with file_lock(self.lock_path):
+                    return self.refresh(truncate=True)
+            logger.warning(f"Finishing an interrupted clear of {self.path}")
+            self._write_keys(generation + 1, b"")
+
+        # Ignore a partially written key at the end
+        new_rows = len(raw_keys) // self._KEY_SIZE
+        with self._view_lock:
+            self._matrix, self.capacity, self._matrix_id = mapping
+            if generation != self.generation:
+                self.index = {}
+                self.generation = generation
+            for i in range(new_rows):
+                key = raw_keys[i * self._KEY_SIZE:(i + 1) * self._KEY_SIZE].decode("ascii")
+                self.index[key] = rows + i
+            self.rows = rows + new_rows
+
+        if truncate and len(raw_keys) % self._KEY_SIZE:
+            with open(self.keys_path, "r+b") as f:
+                f.truncate(self._HEADER.size + self.rows * self._KEY_SIZE)
+        return len(self.index) - before
+
+    def _matrix_changed(self) -> bool:
+        """Whether another process grew or replaced the matrix file since it was mapped."""
+        if self.dimension is None:
+            return False
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return self._matrix is not None
+        return (stat.st_dev, stat.st_ino) != self._matrix_id or stat.st_size // self._row_bytes != self.capacity
+
+    def _open_matrix(self) -> Tuple[Optional[np.ndarray], int, Optional[Tuple[int, int]]]:
+        """Map the matrix file; returns the mapping, its capacity in rows and the file's identity."""
+        if self.dimension is None or not self.path.exists():
+            return None, 0, None
+        with open(self.path, "r+b") as f:
+            stat = os.fstat(f.fileno())
+            capacity = stat.st_size // self._row_bytes
+            if capacity == 0:
+                return None, 0, (stat.st_dev, stat.st_ino)
+            if self.dtype == "float32":
+                matrix = np.memmap(f, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+            else:
+                row = np.dtype([("scale", "<f4"), ("codes", "i1", (self.dimension,))])
+                matrix = np.memmap(f, dtype=row, mode="r+", shape=(capacity,))
+        return matrix, capacity, (stat.st_dev, stat.st_ino)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        new_capacity = max(self.capacity, self.initial_capacity)
+        while new_capacity < rows:
+            new_capacity *= 2
+        if self._matrix is not None:
+            self._matrix.flush()
+        # Grow the file in place; existing views keep their own mapping alive
+        with open(self.path, "ab") as f:
+            f.truncate(new_capacity * self._row_bytes)
+        mapping = self._open_matrix()
+        with self._view_lock:
+            self._matrix, self.capacity, self._matrix_id = mapping
+
+    def _replace_matrix(self, rows: Optional[np.ndarray]) -> None:
+        """Swap in a new matrix file holding ``rows``, leaving the old file to existing mappings."""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            if rows is not None:
+                rows.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._fsync_dir()
+
+    def _write_meta(self) -> None:
+        tmp_path = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"dimension": self.dimension, "dtype": self.dtype}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self.index))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Return a read-only view of a stored embedding, zero-copy for float32 rows.
+
+        Views stay valid, and keep their values, after ``clear`` or ``compact``
+        in this or any other process.
+
+        Args:
+            key (str): Cache key of the embedding
+
+        Returns:
+            Optional[np.ndarray]: 1-D float32 view (a decoded copy for int8 rows),
+                or None if missing
+        """
+        with self._view_lock:
+            row = self.index.get(key)
+            matrix = self._matrix
+        if row is None:
+            return None
+        if self.dtype == "float32":
+            view = matrix[row]
+        else:
+            entry = matrix[row]
+            view = dequantize_int8(entry["codes"], entry["scale"])
+        view.flags.writeable = False
+        return view
+
+    def get_many(self, keys: List[str]) -> np.ndarray:
+        """
+        Gather several stored embeddings into one 2-D float32 array.
+
+        Args:
+            keys (List[str]): Cache keys, all of which must be stored
+
+        Returns:
+            np.ndarray: Array of shape ``(len(keys), dimension)``
+        """
+        if not keys:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        with self._view_lock:
+            rows = [self.index[key] for key in keys]
+            matrix = self._matrix
+        if self.dtype == "float32":
+            return np.asarray(matrix[rows])
+        entries = matrix[rows]
+        return dequantize_int8(entries["codes"], entries["scale"])
+
+    def put_many(self, items: Dict[str, List[float]]) -> int:
+        """
+        Append several embeddings as new matrix rows.
+
+        Rows are written and flushed before their keys are appended, so a crash
+        can never expose a key whose row is incomplete.
+
+        Args:
+            items (Dict[str, List[float]]): Embeddings keyed by cache key
+
+        Returns:
+            int: Number of bytes written to the matrix and keys files
+        """
+        if not items:
+            return 0
+
+        with file_lock(self.lock_path):
+            self.refresh(truncate=True)
+            new_items = [(key, embedding) for key, embedding in items.items() if key not in self.index]
+            if not new_items:
+                return 0
+
+            values = np.asarray([embedding for _, embedding in new_items], dtype=np.float32)
+            if self.dimension is None:
+                self.dimension = values.shape[1]
+                self._write_meta()
+            if values.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-d embeddings, got {values.shape[1]}-d")
+
+            start = self.rows
+            self._ensure_capacity(start + len(new_items))
+            if self.dtype == "float32":
+                self._matrix[start:start + len(new_items)] = values
+            else:
+                codes, scales = quantize_int8(values)
+                self._matrix["codes"][start:start + len(new_items)] = codes
+                self._matrix["scale"][start:start + len(new_items)] = scales
+            self._matrix.flush()
+
+            with open(self.keys_path, "ab") as f:
+                f.write(b"".join(key.encode("ascii") for key, _ in new_items))
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._view_lock:
+                for offset, (key, _) in enumerate(new_items):
+                    self.index[key] = start + offset
+                self.rows = start + len(new_items)
+            return len(new_items) * (self._row_bytes + self._KEY_SIZE)
+
+    def compact(self) -> None:
+        """Release preallocated rows beyond the last stored embedding."""
+        with file_lock(self.lock_path):
+            self.refresh(truncate=True)
+            if self.dimension is None or self.capacity == self.rows:
+                return
+            with open(self.keys_path, "rb") as f:
+                f.seek(self._HEADER.size)
+                raw_keys = f.read(self.rows * self._KEY_SIZE)
+            rows = np.array(self._matrix[:self.rows]) if self._matrix is not None else None
+            self._swap_generation(raw_keys, rows)
+
+    def clear(self) -> None:
+        """
+        Remove every stored embedding, for every process sharing the store.
+
+        New embeddings go to a fresh matrix file, so views handed out before
+        keep their values and other processes' mappings stay valid.
+        """
+        with file_lock(self.lock_path):
+            self.refresh(truncate=True)
+            self._swap_generation(b"", None)
+
+    def _swap_generation(self, raw_keys: bytes, rows: Optional[np.ndarray]) -> None:
+        """
+        Replace the matrix file, then publish the keys file under a new generation.
+
+        See ``refresh`` for why the keys go last.
+        """
+        generation = self.generation + 1
+        self._replace_matrix(rows)
+        self._write_keys(generation, raw_keys)
+        mapping = self._open_matrix()
+        new_rows = len(raw_keys) // self._KEY_SIZE
+        with self._view_lock:
+            self._matrix, self.capacity, self._matrix_id = mapping
+            self.generation = generation
+            self.index = {
+                raw_keys[i * self._KEY_SIZE:(i + 1) * self._KEY_SIZE].decode("ascii"): i
+                for i in range(new_rows)
+            }
+            self.rows = new_rows
@@ -0,0 +1,237 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.services.retrival_engine import RetrivalEngine
+from src.utils.document_loader import iter_load_results
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class _Stopped(Exception):
+    """Raised inside a stage when another stage has failed."""
+
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: load -> split -> embed -> upsert.
+
+    Each stage runs in its own thread(s) and hands work to the next through a
+    bounded queue, so a slow stage blocks the ones before it instead of
+    letting documents, chunks or embeddings pile up. Memory stays roughly
+    ``queue_size`` batches per stage however large the corpus is, and the
+    first chunks are indexed as soon as the first document has been loaded.
+
+    The loader keeps a few downloads in flight per worker, the splitter packs
+    chunks into batches of ``batch_size``, ``embed_workers`` threads embed
+    batches (skipping chunks already indexed) and one thread stores and
+    upserts them. If any stage fails, the others stop and ``run`` re-raises
+    the error.
+    """
+
+    def __init__(
+            self,
+            engine: RetrivalEngine,
+            item_type: str,
+            splitter=None,
+            metadata: Optional[Dict[str, Any]] = None,
+            batch_size: int = 100,
+            queue_size: int = 4,
+            embed_workers: int = 2,
+            loader_options: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Configure the pipeline.
+
+        Args:
+            engine (RetrivalEngine): Engine to embed with and index into
+            item_type (str): Item type of every chunk
+            splitter: LangChain text splitter; 600-token chunks overlapping by 100 if None
+            metadata (Dict[str, Any], optional): Extra metadata added to every chunk
+            batch_size (int): Chunks per embedding and upsert batch
+            queue_size (int): Batches each queue holds before its producer blocks
+            embed_workers (int): Threads embedding batches concurrently
+            loader_options (Dict[str, Any], optional): ``iter_load_results`` settings
+        """
+        if splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(chunk_size=600, chunk_overlap=100)
+        self.engine = engine
+        self.item_type = item_type
+        self.splitter = splitter
+        self.metadata = dict(metadata or {})
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embed_workers = max(1, embed_workers)
+        self.loader_options = dict(loader_options or {})
+
+    def _put(self, target: queue.Queue, item) -> None:
+        # Block while the next stage is busy, but give up once the pipeline is stopping
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, source: queue.Queue):
+        while True:
+            if self._stop.is_set():
+                raise _Stopped()
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _count(self, **increments) -> None:
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def _stage(self, name: str, work: Callable[[], None]) -> threading.Thread:
+        def run():
+            try:
+                work()
+            except _Stopped:
+                pass
+            except Exception as e:
+                logger.error(f"Ingestion {name} stage failed: {e}")
+                with self._stats_lock:
+                    self._errors.append(e)
+                self._stop.set()
+
+        return threading.Thread(target=run, name=f"ingest-{name}", daemon=True)
+
+    def _load(self, urls: List[str], loaded: queue.Queue) -> None:
+        for result in iter_load_results(urls, **self.loader_options):
+            if self._stop.is_set():
+                raise _Stopped()
+            if result["error"] is not None:
+                self._count(failed=1)
+                with self._stats_lock:
+                    self._stats["failed_urls"].append((result["url"], result["error"]))
+                continue
+            self._count(urls=1, documents=len(result["documents"]))
+            self._put(loaded, result["documents"])
+        self._put(loaded, _DONE)
+
+    def _split(self, loaded: queue.Queue, chunks: queue.Queue) -> None:
+        batch = []
+        while True:
+            documents = self._get(loaded)
+            if documents is _DONE:
+                break
+            for chunk in self.splitter.split_documents(documents):
+                batch.append((chunk.page_content, {**chunk.metadata, **self.metadata}))
+                if len(batch) == self.batch_size:
+                    self._count(chunks=len(batch))
+                    self._put(chunks, batch)
+                    batch = []
+        if batch:
+            self._count(chunks=len(batch))
+            self._put(chunks, batch)
+        for _ in range(self.embed_workers):
+            self._put(chunks, _DONE)
+
+    def _embed(self, chunks: queue.Queue, embedded: queue.Queue) -> None:
+        while True:
+            batch = self._get(chunks)
+            if batch is _DONE:
+                break
+            contents = [content for content, _ in batch]
+            metadatas = [metadata for _, metadata in batch]
+            item_types = [self.item_type] * len(batch)
+            ids, positions = self.engine.pending_items(contents, metadatas, item_types)
+            self._count(skipped=len(batch) - len(positions))
+            if not positions:
+                continue
+            new_contents = [contents[p] for p in positions]
+            embeddings = self.engine.embed_items(new_contents)
+            self._put(embedded, (
+                [ids[p] for p in positions],
+                new_contents,
+                [{**metadatas[p], "item_type": self.item_type} for p in positions],
+                embeddings,
+            ))
+        self._put(embedded, _DONE)
+
+    def _upsert(self, embedded: queue.Queue) -> None:
+        finished = 0
+        while finished < self.embed_workers:
+            batch = self._get(embedded)
+            if batch is _DONE:
+                finished += 1
+                continue
+            self.engine.add_embedded_items(*batch, flush=False)
+            with self._stats_lock:
+                if self._stats["first_upsert_seconds"] is None:
+                    self._stats["first_upsert_seconds"] = time.perf_counter() - self._start
+                self._stats["upserted"] += len(batch[0])
+                logger.info(
+                    "Indexed %d chunks (%d loaded documents, %.0fs)",
+                    self._stats["upserted"], self._stats["documents"], time.perf_counter() - self._start,
+                )
+
+    def run(self, urls: List[str]) -> Dict[str, Any]:
+        """
+        Load, split, embed and index the documents at ``urls``.
+
+        URLs that cannot be loaded are logged and reported rather than
+        stopping the run; a failure in splitting, embedding or indexing stops
+        it and is re-raised.
+
+        Args:
+            urls (List[str]): Document URLs
+
+        Returns:
+            Dict[str, Any]: ``urls`` loaded, ``failed`` and ``failed_urls`` as (url, error)
+                pairs, ``documents``, ``chunks``, chunks ``skipped`` as already indexed,
+                chunks ``upserted``, ``first_upsert_seconds`` and total ``seconds``
+        """
+        self._stop = threading.Event()
+        self._errors: List[Exception] = []
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "urls": 0, "failed": 0, "failed_urls": [], "documents": 0, "chunks": 0,
+            "skipped": 0, "upserted": 0, "first_upsert_seconds": None,
+        }
+        self._start = time.perf_counter()
+
+        loaded = queue.Queue(maxsize=self.queue_size)
+        chunks = queue.Queue(maxsize=self.queue_size)
+        embedded = queue.Queue(maxsize=self.queue_size)
+        stages = [
+            self._stage("load", lambda: self._load(urls, loaded)),
+            self._stage("split", lambda: self._split(loaded, chunks)),
+            *(self._stage("embed", lambda: self._embed(chunks, embedded)) for _ in range(self.embed_workers)),
+            self._stage("upsert", lambda: self._upsert(embedded)),
+        ]
+        for stage in stages:
+            stage.start()
+        try:
+            for stage in stages:
+                stage.join()
+        except KeyboardInterrupt:
+            self._stop.set()
+            raise
+
+        # Batches were upserted without saving the local index; save it once
+        self.engine.flush_index()
+        if self._errors:
+            raise self._errors[0]
+        self.engine.retrieval_cache.flush()
+        stats = dict(self._stats, seconds=time.perf_counter() - self._start)
+        logger.info(
+            "Ingested %d URLs (%d failed): %d documents, %d chunks, %d indexed, %d already indexed in %.1fs",
+            stats["urls"], stats["failed"], stats["documents"], stats["chunks"],
+            stats["upserted"], stats["skipped"], stats["seconds"],
+        )
+        return stats
@@ -0,0 +1,951 @@
+import logging
+import os
+import pickle
+import re
+import shutil
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from src.services.ann_index import IVFIndex, normalize_rows
+from src.services.metadata_filter import compile_filter
+from src.services.quantization import ProductQuantizer, int8_scores, quantize_int8, row_chunks
+
+logger = logging.getLogger(__name__)
+
+# Mapped matrix files: vectors.f32, then vectors.1.f32, vectors.2.f32, ... as it is copied on write
+_MAP_FILE_NAME = re.compile(r"vectors(?:\.(\d+))?\.f32")
+
+
+class LocalVectorIndex:
+    """
+    In-process vector index with exact cosine search and Pinecone-style filters.
+
+    Vectors live in one contiguous float32 matrix alongside their ids and
+    metadata, so a query is a single matrix-vector product followed by a
+    partial sort. ``upsert``, ``query``, ``fetch`` and ``delete`` accept and
+    return the same shapes as the Pinecone index client, which lets the
+    retrieval engine use either interchangeably.
+
+    With ``index_type="ivf"`` queries are approximate: once ``ivf_train_size``
+    vectors are stored an ``IVFIndex`` is trained and each query only scores the
+    vectors in its ``nprobe`` nearest clusters. The quantizer is retrained
+    whenever the index has grown ``ivf_retrain_growth`` times past the size it
+    was trained at. Below the training size queries stay exact.
+
+    With ``quantization`` set, candidates are first scored against compact
+    codes of the unit vectors held in memory: "int8" keeps one signed byte per
+    dimension plus a per-row scale (4x smaller than float32), "pq" keeps one
+    byte per ``pq_subvectors`` slice once ``pq_train_size`` vectors have been
+    stored to train its codebooks (about 32x smaller at the default width).
+    The best ``top_k * rescore_factor`` candidates are then rescored against
+    the full-precision vectors, which for a persisted index stay on disk in a
+    memory-mapped ``vectors.f32`` and are only paged in for those rows.
+
+    When ``path`` is given the index is loaded from and saved to that directory
+    as ``vectors.npy`` (or the mapped ``vectors.f32``) plus ``records.pkl``, with
+    ``ivf.npz`` for IVF and ``quantizer.npz`` for the codes; each file except
+    the mapped matrix is written to a temporary file and atomically swapped in.
+    The mapped matrix is written in place, but never in the rows the saved
+    records point at: the first overwrite or delete after a save copies it to
+    a new file, which the next save names in the records, so a crash between
+    saves always reloads the last saved state.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    VECTOR_MAP_FILE = "vectors.f32"
+    RECORDS_FILE = "records.pkl"
+    IVF_FILE = "ivf.npz"
+    QUANTIZER_FILE = "quantizer.npz"
+    INDEX_TYPES = ("flat", "ivf")
+    QUANTIZATIONS = (None, "int8", "pq")
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            dimension: Optional[int] = None,
+            autosave: bool = True,
+            save_interval: Optional[float] = None,
+            index_type: str = "flat",
+            nlist: Optional[int] = None,
+            nprobe: int = 8,
+            ivf_train_size: int = 4096,
+            ivf_retrain_growth: float = 4.0,
+            quantization: Optional[str] = None,
+            pq_subvectors: Optional[int] = None,
+            pq_train_size: int = 4096,
+            rescore_factor: int = 4
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            path (str, optional): Directory to persist the index in, in-memory only if None
+            dimension (int, optional): Vector dimension, inferred from the first upsert if None
+            autosave (bool): Save to ``path`` after mutations
+            save_interval (float, optional): With ``autosave``, save at most once per this
+                many seconds from a background timer rather than after every mutation,
+                which rewrites the whole index; ``flush`` saves pending changes at once
+            index_type (str): "flat" for exact search or "ivf" for approximate search
+            nlist (int, optional): IVF cluster count, 4 * sqrt(n) at training time if None
+            nprobe (int): IVF clusters scored per query unless overridden in ``query``
+            ivf_train_size (int): Number of vectors at which the IVF quantizer is first trained
+            ivf_retrain_growth (float): Growth factor since the last training that triggers a retrain
+            quantization (str, optional): "int8" or "pq" to search compressed codes, None for
+                plain float32 search
+            pq_subvectors (int, optional): PQ bytes per vector, about dimension / 8 if None
+            pq_train_size (int): Number of vectors at which the PQ codebooks are trained
+            rescore_factor (int): Quantized candidates rescored in full precision per
+                requested match; 0 returns the approximate scores as they are
+        """
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. Expected one of {list(self.INDEX_TYPES)}")
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}. Expected one of {list(self.QUANTIZATIONS)}")
+
+        self.path = path
+        self.dimension = dimension
+        self.autosave = autosave
+        self.save_interval = save_interval
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_train_size = ivf_train_size
+        self.ivf_retrain_growth = ivf_retrain_growth
+        self.quantization = quantization
+        self.pq_subvectors = pq_subvectors
+        self.pq_train_size = pq_train_size
+        self.rescore_factor = rescore_factor
+        # Quantized indexes keep full-precision vectors on disk, paged in for rescoring
+        self._mapped = bool(path) and quantization is not None
+        # Mapped matrix file in use, and how many of its rows the saved records index
+        self._map_file = self.VECTOR_MAP_FILE
+        self._persisted_rows = 0
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+
+        # IVF quantizer and the cluster of each row, parallel to the matrix
+        self.ivf: Optional[IVFIndex] = None
+        self._clusters = np.empty(0, dtype=np.int32)
+        self._trained_size = 0
+
+        # Codes of the unit vectors, parallel to the matrix; valid once _encoded is set
+        self.pq: Optional[ProductQuantizer] = None
+        self._codes = np.empty((0, 0), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._encoded = quantization == "int8"
+
+        # Row i of the matrix belongs to ids[i]; rows past len(ids) are spare capacity
+        self._vectors = np.empty((0, dimension or 0), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Live rows of the vector matrix, in ``ids`` order."""
+        return self._vectors[:len(self.ids)]
+
+    def _load(self) -> None:
+        records_file = os.path.join(self.path, self.RECORDS_FILE)
+        if not os.path.exists(records_file):
+            return
+        try:
+            with open(records_file, "rb") as f:
+                records = pickle.load(f)
+            vectors = self._load_vectors(records)
+        except Exception as e:
+            logger.error(f"Error loading local vector index: {e}")
+            return
+        if vectors is None:
+            return
+        if len(vectors) != len(records["ids"]):
+            logger.error("Local vector index files are out of sync, starting fresh")
+            return
+
+        if len(vectors):
+            self.dimension = vectors.shape[1]
+        name = records.get("vectors_file", self.VECTORS_FILE)
+        if self._mapped and _MAP_FILE_NAME.fullmatch(name):
+            self._map_file = name
+        self._vectors = np.empty((0, self.dimension or 0), dtype=np.float32)
+        self._ensure_capacity(len(vectors))
+        self.ids = list(records["ids"])
+        self.metadatas = list(records["metadatas"])
+        self._rows = {item_id: row for row, item_id in enumerate(self.ids)}
+        same_file = getattr(vectors, "filename", None) == getattr(self._vectors, "filename", False)
+        if same_file:
+            self._persisted_rows = len(self.ids)
+        else:
+            for block in row_chunks(len(self.ids)):
+                self._vectors[block] = vectors[block]
+        self._clusters = np.zeros(len(self._vectors), dtype=np.int32)
+
+        if not self._load_quantizer():
+            for block in row_chunks(len(self.ids)):
+                self._norms[block] = np.linalg.norm(self._vectors[block], axis=1)
+            self._encode_rows(0, len(self.ids))
+        if self.index_type == "ivf":
+            self._load_ivf()
+        self._maybe_train()
+        logger.info(f"Loaded {len(self.ids)} vectors into the local index")
+
+    def _load_vectors(self, records: Dict[str, Any]) -> Optional[np.ndarray]:
+        # The records name the matrix file they index; it is copied over if the
+        # storage mode has changed since, and read lazily either way
+        name = records.get("vectors_file", self.VECTORS_FILE)
+        vectors_file = os.path.join(self.path, name)
+        if not os.path.exists(vectors_file):
+            return None
+        if name == self.VECTORS_FILE:
+            return np.load(vectors_file, mmap_mode="r")
+        count, dimension = len(records["ids"]), records["dimension"]
+        if not dimension:
+            return np.empty((0, 0), dtype=np.float32)
+        rows = os.path.getsize(vectors_file) // (dimension * 4)
+        if rows < count:
+            return None
+        return np.memmap(vectors_file, dtype=np.float32, mode="r", shape=(rows, dimension))[:count]
+
+    def _load_quantizer(self) -> bool:
+        """Restore norms and codes saved with the vectors; False if they must be recomputed."""
+        quantizer_file = os.path.join(self.path, self.QUANTIZER_FILE)
+        if not os.path.exists(quantizer_file):
+            return False
+        try:
+            with np.load(quantizer_file) as data:
+                state = {name: data[name] for name in data.files}
+        except Exception as e:
+            logger.error(f"Error loading quantizer, re-encoding: {e}")
+            return False
+        if str(state["quantization"]) != str(self.quantization) or len(state["norms"]) != len(self.ids):
+            return False
+
+        live = len(self.ids)
+        self._norms[:live] = state["norms"]
+        if self.quantization == "int8":
+            self._codes[:live] = state["codes"]
+            self._scales[:live] = state["scales"]
+        elif self.quantization == "pq" and "codebooks" in state:
+            self.pq = ProductQuantizer.from_state(state)
+            self._codes = np.zeros((len(self._vectors), self.pq.code_size), dtype=np.uint8)
+            self._codes[:live] = state["codes"]
+            self._encoded = True
+        return True
+
+    def _load_ivf(self) -> None:
+        ivf_file = os.path.join(self.path, self.IVF_FILE)
+        if not os.path.exists(ivf_file):
+            return
+        try:
+            with np.load(ivf_file) as data:
+                state = {name: data[name] for name in data.files}
+        except Exception as e:
+            logger.error(f"Error loading IVF index, retraining: {e}")
+            return
+
+        self.ivf = IVFIndex.from_state(state)
+        self.ivf.nprobe = self.nprobe
+        self._trained_size = int(state["trained_size"])
+        clusters = state["clusters"].astype(np.int32)
+        if len(clusters) == len(self.ids):
+            self._clusters[:len(self.ids)] = clusters
+        else:
+            # Vectors were saved without their assignments; recompute them
+            self._assign_rows(0, len(self.ids))
+
+    def _changed(self) -> None:
+        """Record a mutation and persist it as ``autosave`` and ``save_interval`` say."""
+        with self._lock:
+            self._dirty = True
+            if not (self.autosave and self.path):
+                return
+            if self.save_interval is not None:
+                if self._save_timer is None:
+                    self._save_timer = threading.Timer(self.save_interval, self._timed_save)
+                    self._save_timer.daemon = True
+                    self._save_timer.start()
+                return
+        self.save()
+
+    def _timed_save(self) -> None:
+        with self._lock:
+            self._save_timer = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Save now if there are unsaved changes."""
+        if self._dirty:
+            self.save()
+
+    def save(self) -> None:
+        """Write the index to ``path``."""
+        if not self.path:
+            return
+        # Saves are serialised so concurrent writers never share temporary files
+        # and a newer snapshot is never overwritten by an older one
+        with self._save_lock:
+            self._save()
+
+    def _save(self) -> None:
+        with self._lock:
+            # Mutations after this snapshot mark the index dirty again
+            self._dirty = False
+            live = len(self.ids)
+            if self._mapped:
+                # Written in place; only needs flushing before the records that index it.
+                # From here on its live rows are only rewritten in a copy
+                if isinstance(self._vectors, np.memmap):
+                    self._vectors.flush()
+                self._persisted_rows = live
+                vectors = None
+            else:
+                vectors = self.vectors.copy()
+            vectors_name = self._map_file if self._mapped else self.VECTORS_FILE
+            records = {
+                "ids": list(self.ids),
+                "metadatas": list(self.metadatas),
+                "dimension": self.dimension,
+                "vectors_file": vectors_name,
+            }
+            ivf_state = None
+            if self.ivf is not None:
+                ivf_state = dict(self.ivf.state())
+                ivf_state["clusters"] = self._clusters[:live].copy()
+                ivf_state["trained_size"] = self._trained_size
+            quantizer_state = None
+            if self.quantization is not None:
+                quantizer_state = {"quantization": self.quantization, "norms": self._norms[:live].copy()}
+                if self._encoded:
+                    quantizer_state["codes"] = self._codes[:live].copy()
+                if self.quantization == "int8":
+                    quantizer_state["scales"] = self._scales[:live].copy()
+                elif self.pq is not None:
+                    quantizer_state.update(self.pq.state())
+
+        records_file = os.path.join(self.path, self.RECORDS_FILE)
+        if vectors is not None:
+            vectors_file = os.path.join(self.path, self.VECTORS_FILE)
+            with open(vectors_file + ".tmp", "wb") as f:
+                np.save(f, vectors)
+        with open(records_file + ".tmp", "wb") as f:
+            pickle.dump(records, f)
+        if vectors is not None:
+            os.replace(vectors_file + ".tmp", vectors_file)
+        os.replace(records_file + ".tmp", records_file)
+
+        # Drop the matrix files the records no longer name: the other storage
+        # mode's once migrated, and mapped files since copied on write
+        with self._lock:
+            keep = {vectors_name, self._map_file} if self._mapped else set()
+        if self._mapped:
+            self._write_state(self.VECTORS_FILE, None)
+        for name in os.listdir(self.path):
+            if _MAP_FILE_NAME.fullmatch(name) and name not in keep:
+                self._write_state(name, None)
+        self._write_state(self.IVF_FILE, ivf_state)
+        self._write_state(self.QUANTIZER_FILE, quantizer_state)
+
+    def _write_state(self, name: str, state: Optional[Dict[str, Any]]) -> None:
+        state_file = os.path.join(self.path, name)
+        if state is None:
+            if os.path.exists(state_file):
+                os.remove(state_file)
+            return
+        with open(state_file + ".tmp", "wb") as f:
+            np.savez(f, **state)
+        os.replace(state_file + ".tmp", state_file)
+
+    def _map_vectors(self, capacity: int) -> np.ndarray:
+        # Grow the mapped file in place; existing views keep their own mapping alive
+        map_file = os.path.join(self.path, self._map_file)
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+        size = max(capacity * self.dimension * 4, os.path.getsize(map_file) if os.path.exists(map_file) else 0)
+        with open(map_file, "ab") as f:
+            f.truncate(size)
+        rows = size // (self.dimension * 4)
+        return np.memmap(map_file, dtype=np.float32, mode="r+", shape=(rows, self.dimension))
+
+    def _before_rewrite(self, row: int) -> None:
+        """
+        Make rows from ``row`` on safe to overwrite.
+
+        The saved records map ids to the first ``_persisted_rows`` rows of the
+        mapped file; rewriting those in place and crashing before the next save
+        would reload them under the wrong ids. The matrix is copied to a file
+        the records do not name instead, and the next save names it.
+        """
+        if not self._mapped or row >= self._persisted_rows:
+            return
+        self._vectors.flush()
+        generation = int(_MAP_FILE_NAME.fullmatch(self._map_file).group(1) or 0) + 1
+        name = f"vectors.{generation}.f32"
+        shutil.copyfile(os.path.join(self.path, self._map_file), os.path.join(self.path, name))
+        self._map_file = name
+        self._vectors = np.memmap(os.path.join(self.path, name), dtype=np.float32, mode="r+", shape=self._vectors.shape)
+        self._persisted_rows = 0
+
+    @staticmethod
+    def _grown(array: np.ndarray, capacity: int, live: int) -> np.ndarray:
+        grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        grown[:live] = array[:live]
+        return grown
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = len(self._vectors)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 1024)
+        live = len(self.ids)
+        if self._mapped:
+            self._vectors = self._map_vectors(capacity)
+            capacity = len(self._vectors)
+        else:
+            self._vectors = self._grown(self._vectors, capacity, live)
+        self._norms = self._grown(self._norms, capacity, live)
+        self._clusters = self._grown(self._clusters, capacity, live)
+        if self.quantization == "int8":
+            if self._codes.shape[1:] != (self.dimension,):
+                self._codes = np.zeros((0, self.dimension), dtype=np.int8)
+            self._codes = self._grown(self._codes, capacity, live)
+            self._scales = self._grown(self._scales, capacity, live)
+        elif self.pq is not None:
+            self._codes = self._grown(self._codes, capacity, live)
+
+    def _normalized(self, rows) -> np.ndarray:
+        return normalize_rows(np.asarray(self._vectors[rows], dtype=np.float32))
+
+    def _encode_rows(self, start: int, stop: int) -> None:
+        # Recompute the codes of a contiguous range of rows
+        for block in row_chunks(stop - start):
+            rows = slice(start + block.start, start + block.stop)
+            if self.quantization == "int8":
+                self._codes[rows], self._scales[rows] = quantize_int8(self._normalized(rows))
+            elif self.pq is not None:
+                self._codes[rows] = self.pq.encode(self._normalized(rows))
+
+    def _assign_rows(self, start: int, stop: int) -> None:
+        for block in row_chunks(stop - start):
+            rows = slice(start + block.start, start + block.stop)
+            self._clusters[rows] = self.ivf.assign(self._normalized(rows))
+
+    def _sample(self, size: int) -> np.ndarray:
+        # Unit vectors of up to ``size`` random rows, read in row order
+        live = len(self.ids)
+        if live <= size:
+            return self._normalized(slice(0, live))
+        rows = np.sort(np.random.default_rng(0).choice(live, size, replace=False))
+        return self._normalized(rows)
+
+    def _maybe_train(self) -> None:
+        live = len(self.ids)
+        if self.quantization == "pq" and self.pq is None and live >= self.pq_train_size:
+            self._train_pq()
+        if self.index_type != "ivf" or live < self.ivf_train_size:
+            return
+        if self.ivf is not None and live < self._trained_size * self.ivf_retrain_growth:
+            return
+        self._train_ivf()
+
+    def train(self) -> None:
+        """(Re)train the IVF quantizer and PQ codebooks on the stored vectors and re-encode every row."""
+        with self._lock:
+            if not self.ids:
+                return
+            if self.quantization == "pq":
+                self._train_pq()
+            if self.index_type == "ivf":
+                self._train_ivf()
+
+    def _train_ivf(self) -> None:
+        with self._lock:
+            nlist = min(self.nlist or IVFIndex.default_nlist(len(self.ids)), len(self.ids))
+            ivf = IVFIndex(nlist=nlist, nprobe=self.nprobe)
+            ivf.train(self._sample(nlist * 256))
+            self.ivf = ivf
+            self._assign_rows(0, len(self.ids))
+            self._trained_size = len(self.ids)
+        logger.info(f"Trained IVF index with {ivf.nlist} clusters on {self._trained_size} vectors")
+
+    def _train_pq(self) -> None:
+        with self._lock:
+            pq = ProductQuantizer(subvectors=self.pq_subvectors)
+            pq.train(self._sample(ProductQuantizer.CENTROIDS * 64))
+            self.pq = pq
+            self._codes = np.zeros((len(self._vectors), pq.code_size), dtype=np.uint8)
+            self._encode_rows(0, len(self.ids))
+            self._encoded = True
+        logger.info(f"Trained product quantizer with {pq.subvectors} subvectors on {len(self.ids)} vectors")
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Bytes held per live vector by the search structures, ids and metadata excluded.
+
+        Returns:
+            Dict[str, int]: ``resident_bytes`` kept in memory, ``mapped_bytes`` of
+                full-precision vectors left on disk, and ``bytes_per_vector`` resident
+        """
+        live = len(self.ids)
+        vector_bytes = live * (self.dimension or 0) * 4
+        resident = live * (self._norms.itemsize + self._clusters.itemsize)
+        if self._encoded:
+            resident += live * self._codes.itemsize * int(np.prod(self._codes.shape[1:]))
+        if self.quantization == "int8":
+            resident += live * self._scales.itemsize
+        if not self._mapped:
+            resident += vector_bytes
+        return {
+            "resident_bytes": resident,
+            "mapped_bytes": vector_bytes if self._mapped else 0,
+            "bytes_per_vector": resident // live if live else 0,
+        }
+
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> Dict[str, int]:
+        """
+        Insert or replace vectors.
+
+        Args:
+            vectors (List[Dict[str, Any]]): Items with ``id``, ``values`` and optional ``metadata``
+
+        Returns:
+            Dict[str, int]: ``{"upserted_count": n}``, as returned by Pinecone
+        """
+        if not vectors:
+            return {"upserted_count": 0}
+
+        values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = values.shape[1]
+                self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+            if values.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-d vectors, got {values.shape[1]}-d")
+
+            self._ensure_capacity(len(self.ids) + len(vectors))
+            self._before_rewrite(min(
+                (self._rows[vector["id"]] for vector in vectors if vector["id"] in self._rows),
+                default=len(self.ids)
+            ))
+            norms = np.linalg.norm(values, axis=1)
+            units = normalize_rows(values)
+            rows = []
+            for vector, row_values, norm in zip(vectors, values, norms):
+                item_id = vector["id"]
+                metadata = dict(vector.get("metadata") or {})
+                row = self._rows.get(item_id)
+                if row is None:
+                    row = len(self.ids)
+                    self._rows[item_id] = row
+                    self.ids.append(item_id)
+                    self.metadatas.append(metadata)
+                else:
+                    self.metadatas[row] = metadata
+                self._vectors[row] = row_values
+                self._norms[row] = norm
+                rows.append(row)
+
+            if self.ivf is not None:
+                self._clusters[rows] = self.ivf.assign(units)
+            if self.quantization == "int8":
+                self._codes[rows], self._scales[rows] = quantize_int8(units)
+            elif self.pq is not None:
+                self._codes[rows] = self.pq.encode(units)
+            self._maybe_train()
+
+        self._changed()
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: Iterable[str], **kwargs) -> int:
+        """
+        Delete vectors by id; unknown ids are ignored.
+
+        The last row is moved into each freed slot, so deletes are O(1) per id
+        and the matrix stays contiguous.
+
+        Returns:
+            int: Number of vectors deleted
+        """
+        deleted = 0
+        with self._lock:
+            ids = list(ids)
+            # Freed rows are refilled from the end of the matrix
+            self._before_rewrite(min((self._rows[item_id] for item_id in ids if item_id in self._rows), default=len(self.ids)))
+            for item_id in ids:
+                row = self._rows.pop(item_id, None)
+                if row is None:
+                    continue
+                last = len(self.ids) - 1
+                if row != last:
+                    moved_id = self.ids[last]
+                    self._vectors[row] = self._vectors[last]
+                    self._norms[row] = self._norms[last]
+                    self._clusters[row] = self._clusters[last]
+                    if self._encoded:
+                        self._codes[row] = self._codes[last]
+                    if self.quantization == "int8":
+                        self._scales[row] = self._scales[last]
+                    self.ids[row] = moved_id
+                    self.metadatas[row] = self.metadatas[last]
+                    self._rows[moved_id] = row
+                self.ids.pop()
+                self.metadatas.pop()
+                deleted += 1
+
+        if deleted:
+            self._changed()
+        return deleted
+
+    def clear(self) -> None:
+        """Delete every vector."""
+        with self._lock:
+            self.ids = []
+            self.metadatas = []
+            self._rows = {}
+            self.ivf = None
+            self._trained_size = 0
+            if self.quantization == "pq":
+                self.pq = None
+                self._encoded = False
+        self._changed()
+
+    def fetch(self, ids: Iterable[str], **kwargs) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Look up vectors by id.
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, Any]]]: ``{"vectors": {id: {"id", "values", "metadata"}}}``
+                for the ids that exist
+        """
+        found = {}
+        with self._lock:
+            for item_id in ids:
+                row = self._rows.get(item_id)
+                if row is not None:
+                    found[item_id] = {
+                        "id": item_id,
+                        "values": self._vectors[row].tolist(),
+                        "metadata": self.metadatas[row],
+                    }
+        return {"vectors": found}
+
+    def find_ids(self, filter: Dict[str, Any]) -> List[str]:
+        """Return the ids of the vectors whose metadata matches a Pinecone-style filter."""
+        predicate = compile_filter(filter)
+        with self._lock:
+            return [item_id for item_id, metadata in zip(self.ids, self.metadatas) if predicate(metadata)]
+
+    def _candidate_rows(
+            self,
+            query: np.ndarray,
+            filter_criteria: Optional[Dict[str, Any]],
+            nprobe: Optional[int],
+            exact: bool
+    ) -> Optional[np.ndarray]:
+        # None means every live row is a candidate
+        rows = None
+        if self.ivf is not None and not exact:
+            probed = self.ivf.probe(query / np.linalg.norm(query), nprobe)
+            if len(probed) < self.ivf.nlist:
+                rows = np.flatnonzero(np.isin(self._clusters[:len(self.ids)], probed))
+        if filter_criteria:
+            predicate = compile_filter(filter_criteria)
+            candidates = range(len(self.ids)) if rows is None else rows.tolist()
+            rows = np.fromiter(
+                (row for row in candidates if predicate(self.metadatas[row])),
+                dtype=np.int64,
+            )
+        return rows
+
+    def query(
+            self,
+            vector: List[float],
+            top_k: int = 5,
+            filter: Optional[Dict[str, Any]] = None,
+            include_metadata: bool = True,
+            include_values: bool = False,
+            nprobe: Optional[int] = None,
+            exact: bool = False,
+            **kwargs
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Return the ``top_k`` vectors most cosine-similar to ``vector``.
+
+        Args:
+            vector (List[float]): Query vector
+            top_k (int): Number of matches to return
+            filter (Dict[str, Any], optional): Pinecone-style metadata filter
+            include_metadata (bool): Include each match's metadata
+            include_values (bool): Include each match's vector
+            nprobe (int, optional): IVF clusters to score, overriding the index default
+            exact (bool): Score every vector even if an IVF quantizer is trained
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: ``{"matches": [{"id", "score", ...}]}``,
+                best match first
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query))
+
+        with self._lock:
+            live = len(self.ids)
+            if live == 0 or top_k <= 0 or query_norm == 0.0:
+                return {"matches": []}
+            if query.shape[0] != self.dimension:
+                raise ValueError(f"Expected a {self.dimension}-d query vector, got {query.shape[0]}-d")
+
+            rows = self._candidate_rows(query, filter, nprobe, exact)
+            if rows is not None and len(rows) == 0:
+                return {"matches": []}
+            if self._encoded and not exact:
+                return self._quantized_matches(query, query_norm, rows, top_k, include_metadata, include_values)
+            if rows is None:
+                vectors, norms = self._vectors[:live], self._norms[:live]
+            else:
+                vectors, norms = self._vectors[rows], self._norms[rows]
+            return self._top_matches(
+                self._exact_scores(vectors, norms, query, query_norm), rows, top_k, include_metadata, include_values
+            )
+
+    @staticmethod
+    def _exact_scores(vectors: np.ndarray, norms: np.ndarray, query: np.ndarray, query_norm: float) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (vectors @ query) / (norms * query_norm)
+        return np.nan_to_num(scores, nan=0.0)
+
+    def _quantized_matches(
+            self,
+            query: np.ndarray,
+            query_norm: float,
+            rows: Optional[np.ndarray],
+            top_k: int,
+            include_metadata: bool,
+            include_values: bool
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        # Approximate cosine against the codes of the unit vectors, then exact
+        # cosine for the shortlist, read from the (possibly mapped) matrix
+        live = len(self.ids)
+        unit = query / query_norm
+        if self.quantization == "int8":
+            scores = int8_scores(self._codes[:live], self._scales[:live], unit, rows)
+        else:
+            scores = self.pq.scores(self._codes[:live], unit, rows)
+        if self.rescore_factor <= 0:
+            return self._top_matches(scores, rows, top_k, include_metadata, include_values)
+
+        shortlist = min(len(scores), top_k * self.rescore_factor)
+        best = np.argpartition(-scores, shortlist - 1)[:shortlist] if shortlist < len(scores) else np.arange(len(scores))
+        # Sorted rows turn the reads from a mapped matrix into a forward scan
+        candidates = np.sort(best if rows is None else rows[best])
+        exact = self._exact_scores(self._vectors[candidates], self._norms[candidates], query, query_norm)
+        return self._top_matches(exact, candidates, top_k, include_metadata, include_values)
+
+    def _top_matches(
+            self,
+            scores: np.ndarray,
+            rows: Optional[np.ndarray],
+            top_k: int,
+            include_metadata: bool,
+            include_values: bool
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        # scores[i] belongs to rows[i], or to row i when rows is None
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind="stable")]
+
+        matches = []
+        for position in best:
+            row = int(position if rows is None else rows[position])
+            match = {"id": self.ids[row], "score": float(scores[position])}
+            if include_metadata:
+                match["metadata"] = self.metadatas[row]
+            if include_values:
+                match["values"] = self._vectors[row].tolist()
+            matches.append(match)
+        return {"matches": matches}
+
+    def query_many(
+            self,
+            vectors: List[List[float]],
+            top_k: int = 5,
+            filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+            include_metadata: bool = True,
+            include_values: bool = False,
+            exact: bool = False
+    ) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Run several queries at once.
+
+        Unfiltered queries against an unquantized flat (or untrained IVF) index
+        are scored together with one matrix product; filtered, IVF or quantized
+        queries fall back to ``query`` one by one.
+
+        Args:
+            vectors (List[List[float]]): Query vectors
+            top_k (int): Number of matches per query
+            filters (List[Dict[str, Any]], optional): Per-query Pinecone-style filters
+            include_metadata (bool): Include each match's metadata
+            include_values (bool): Include each match's vector
+            exact (bool): Score every vector even if an IVF quantizer is trained
+
+        Returns:
+            List[Dict[str, List[Dict[str, Any]]]]: One ``{"matches": [...]}`` per query, in input order
+        """
+        filters = filters or [None] * len(vectors)
+        results: List[Optional[Dict[str, List[Dict[str, Any]]]]] = [None] * len(vectors)
+
+        with self._lock:
+            live = len(self.ids)
+            batched = [
+                position for position, filter_criteria in enumerate(filters)
+                if not filter_criteria and ((self.ivf is None and not self._encoded) or exact)
+            ]
+            if len(batched) > 1 and live and top_k > 0:
+                queries = np.asarray([vectors[position] for position in batched], dtype=np.float32)
+                if queries.shape[1] != self.dimension:
+                    raise ValueError(f"Expected {self.dimension}-d query vectors, got {queries.shape[1]}-d")
+                query_norms = np.linalg.norm(queries, axis=1)
+                scores = self._exact_scores(self._vectors[:live], self._norms[:live, None], queries.T, query_norms)
+                for column, position in enumerate(batched):
+                    if query_norms[column] == 0.0:
+                        results[position] = {"matches": []}
+                    else:
+                        results[position] = self._top_matches(
+                            scores[:, column], None, top_k, include_metadata, include_values
+                        )
+
+            for position, vector in enumerate(vectors):
+                if results[position] is None:
+                    results[position] = self.query(
+                        vector, top_k=top_k, filter=filters[position], include_metadata=include_metadata,
+                        include_values=include_values, exact=exact
+                    )
+        return results
+
+
+class NamespacedLocalIndex:
+    """
+    Pinecone-style namespaces over one ``LocalVectorIndex`` per namespace.
+
+    Every data-plane method takes the same ``namespace`` argument as the
+    Pinecone client and runs against that namespace's index, which is created
+    on first write. The default namespace ``""`` lives directly in ``path``, so
+    an index saved before namespaces were used opens as the default namespace;
+    the others live in ``path/ns_<quoted name>``.
+    """
+
+    NAMESPACE_PREFIX = "ns_"
+
+    def __init__(self, path: Optional[str] = None, **options):
+        """
+        Open every namespace found under ``path``.
+
+        Args:
+            path (str, optional): Directory of the default namespace, in-memory only if None
+            **options: ``LocalVectorIndex`` settings shared by every namespace
+        """
+        self.path = path
+        self.options = options
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, LocalVectorIndex] = {"": LocalVectorIndex(path, **options)}
+        if path:
+            for entry in sorted(os.listdir(path)):
+                if entry.startswith(self.NAMESPACE_PREFIX) and os.path.isdir(os.path.join(path, entry)):
+                    self.namespace(unquote(entry[len(self.NAMESPACE_PREFIX):]))
+
+    def namespace(self, name: str = "", create: bool = True) -> Optional[LocalVectorIndex]:
+        """Return the index of namespace ``name``, creating it unless ``create`` is False."""
+        index = self._indexes.get(name)
+        if index is None and create:
+            with self._lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    path = None
+                    if self.path:
+                        path = os.path.join(self.path, self.NAMESPACE_PREFIX + quote(name, safe=""))
+                    index = self._indexes[name] = LocalVectorIndex(path, **self.options)
+        return index
+
+    def namespaces(self) -> List[str]:
+        """Names of the namespaces holding at least one vector."""
+        return [name for name, index in list(self._indexes.items()) if len(index)]
+
+    def __len__(self) -> int:
+        return sum(len(index) for index in list(self._indexes.values()))
+
+    def __contains__(self, item_id: str) -> bool:
+        return self.contains(item_id)
+
+    def contains(self, item_id: str, namespace: Optional[str] = None) -> bool:
+        """Whether ``item_id`` is stored in ``namespace``, or in any namespace if None."""
+        if namespace is not None:
+            index = self.namespace(namespace, create=False)
+            return index is not None and item_id in index
+        return any(item_id in index for index in list(self._indexes.values()))
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "", **kwargs) -> Dict[str, int]:
+        return self.namespace(namespace).upsert(vectors)
+
+    def query(self, vector: List[float], namespace: str = "", **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+        index = self.namespace(namespace, create=False)
+        return {"matches": []} if index is None else index.query(vector, **kwargs)
+
+    def query_many(self, vectors: List[List[float]], namespace: str = "", **kwargs) -> List[Dict[str, List[Dict[str, Any]]]]:
+        index = self.namespace(namespace, create=False)
+        return [{"matches": []} for _ in vectors] if index is None else index.query_many(vectors, **kwargs)
+
+    def fetch(self, ids: Iterable[str], namespace: str = "", **kwargs) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        index = self.namespace(namespace, create=False)
+        return {"vectors": {}} if index is None else index.fetch(ids)
+
+    def delete(self, ids: Iterable[str], namespace: str = "", **kwargs) -> int:
+        index = self.namespace(namespace, create=False)
+        return 0 if index is None else index.delete(ids)
+
+    def find_ids(self, filter: Dict[str, Any], namespace: Optional[str] = None) -> List[str]:
+        """Ids matching a Pinecone-style filter in ``namespace``, or in every namespace if None."""
+        names = list(self._indexes) if namespace is None else [namespace]
+        ids = []
+        for name in names:
+            index = self.namespace(name, create=False)
+            if index is not None:
+                ids.extend(index.find_ids(filter))
+        return ids
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        """Vector counts per namespace, shaped like Pinecone's response."""
+        namespaces = {name: {"vector_count": len(index)} for name, index in list(self._indexes.items()) if len(index)}
+        return {
+            "namespaces": namespaces,
+            "dimension": next((index.dimension for index in self._indexes.values() if index.dimension), None),
+            "total_vector_count": sum(entry["vector_count"] for entry in namespaces.values()),
+        }
+
+    def save(self) -> None:
+        for index in list(self._indexes.values()):
+            index.save()
+
+    def flush(self) -> None:
+        """Save the namespaces with unsaved changes."""
+        for index in list(self._indexes.values()):
+            index.flush()
+
+    def clear(self) -> None:
+        """Delete every vector in every namespace."""
+        for index in list(self._indexes.values()):
+            index.clear()
@@ -0,0 +1,140 @@
+from typing import Any, Callable, Dict, List, Optional
+
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+COMPARISONS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin", "$exists")
+
+
+def _as_values(value: Any) -> List[Any]:
+    # Pinecone list metadata matches an operator if any element does
+    return value if isinstance(value, list) else [value]
+
+
+def _ordered(op: str, operand: Any) -> Callable[[Any], bool]:
+    if not isinstance(operand, (int, float)) or isinstance(operand, bool):
+        raise ValueError(f"{op} expects a number, got {operand!r}")
+
+    def compare(value: Any) -> bool:
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        if op == "$gt":
+            return value > operand
+        if op == "$gte":
+            return value >= operand
+        if op == "$lt":
+            return value < operand
+        return value <= operand
+
+    return compare
+
+
+def _compile_operator(field: str, op: str, operand: Any) -> Predicate:
+    missing = object()
+
+    if op == "$exists":
+        return lambda metadata: (field in metadata) == bool(operand)
+    if op == "$eq":
+        return lambda metadata: operand in _as_values(metadata.get(field, missing))
+    if op == "$ne":
+        return lambda metadata: operand not in _as_values(metadata.get(field, missing))
+    if op in ("$in", "$nin"):
+        if not isinstance(operand, list):
+            raise ValueError(f"{op} expects a list, got {operand!r}")
+        candidates = list(operand)
+        if op == "$in":
+            return lambda metadata: any(value in candidates for value in _as_values(metadata.get(field, missing)))
+        return lambda metadata: not any(value in candidates for value in _as_values(metadata.get(field, missing)))
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        compare = _ordered(op, operand)
+        return lambda metadata: field in metadata and compare(metadata[field])
+    raise ValueError(f"Unknown filter operator: {op}. Expected one of {list(COMPARISONS)}")
+
+
+def _compile_field(field: str, condition: Any) -> Predicate:
+    if not isinstance(condition, dict):
+        return _compile_operator(field, "$eq", condition)
+    predicates = [_compile_operator(field, op, operand) for op, operand in condition.items()]
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda metadata: all(predicate(metadata) for predicate in predicates)
+
+
+def compile_filter(filter_criteria: Optional[Dict[str, Any]]) -> Predicate:
+    """
+    Compile a Pinecone-style metadata filter into a predicate over metadata dicts.
+
+    Supports the comparison operators ``$eq``, ``$ne``, ``$gt``, ``$gte``, ``$lt``,
+    ``$lte``, ``$in``, ``$nin`` and ``$exists``, the logical operators ``$and``
+    and ``$or``, and the ``{"field": value}`` shorthand for ``$eq``. Fields
+    holding a list match when any element does, as in Pinecone.
+
+    Args:
+        filter_criteria (Dict[str, Any], optional): Filter in Pinecone syntax
+
+    Returns:
+        Predicate: Function returning whether a metadata dict passes the filter
+    """
+    if not filter_criteria:
+        return lambda metadata: True
+
+    predicates = []
+    for key, condition in filter_criteria.items():
+        if key in ("$and", "$or"):
+            if not isinstance(condition, list):
+                raise ValueError(f"{key} expects a list of filters, got {condition!r}")
+            clauses = [compile_filter(clause) for clause in condition]
+            if key == "$and":
+                predicates.append(lambda metadata, clauses=clauses: all(clause(metadata) for clause in clauses))
+            else:
+                predicates.append(lambda metadata, clauses=clauses: any(clause(metadata) for clause in clauses))
+        elif key.startswith("$"):
+            raise ValueError(f"Unknown top-level filter operator: {key}")
+        else:
+            predicates.append(_compile_field(key, condition))
+
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda metadata: all(predicate(metadata) for predicate in predicates)
+
+
+def matches_filter(metadata: Dict[str, Any], filter_criteria: Optional[Dict[str, Any]]) -> bool:
+    """Whether ``metadata`` passes a Pinecone-style filter."""
+    return compile_filter(filter_criteria)(metadata)
+
+
+def pinned_values(filter_criteria: Optional[Dict[str, Any]], field: str) -> Optional[List[Any]]:
+    """
+    Values a Pinecone-style filter restricts ``field`` to, if it restricts it at all.
+
+    Only constraints every match must satisfy count: a top-level ``$eq`` (or
+    shorthand) or ``$in`` on the field, including inside a top-level ``$and``.
+    ``$or`` branches and negations leave the field unrestricted.
+
+    Returns:
+        List[Any], optional: The allowed values, or None if any value can match
+    """
+    if not filter_criteria:
+        return None
+
+    allowed: Optional[List[Any]] = None
+
+    def restrict(values: List[Any]) -> None:
+        nonlocal allowed
+        allowed = list(values) if allowed is None else [value for value in allowed if value in values]
+
+    for key, condition in filter_criteria.items():
+        if key == "$and" and isinstance(condition, list):
+            for clause in condition:
+                values = pinned_values(clause, field)
+                if values is not None:
+                    restrict(values)
+        elif key == field:
+            if not isinstance(condition, dict):
+                restrict([condition])
+            else:
+                if "$eq" in condition:
+                    restrict([condition["$eq"]])
+                if isinstance(condition.get("$in"), list):
+                    restrict(condition["$in"])
+    return allowed
@@ -0,0 +1,207 @@
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Rows decoded or scored per step, so temporaries stay a few tens of MB
+CHUNK_ROWS = 4096
+
+
+def row_chunks(total: int) -> Iterator[slice]:
+    """Slices covering ``range(total)`` in steps of ``CHUNK_ROWS``."""
+    for start in range(0, total, CHUNK_ROWS):
+        yield slice(start, min(start + CHUNK_ROWS, total))
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-row int8 scalar quantization.
+
+    Each row is scaled so its largest magnitude maps to 127. No training is
+    needed, so rows can be quantized one batch at a time as they arrive.
+
+    Args:
+        vectors (np.ndarray): Float vectors, one per row
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: int8 codes of the same shape and the float32
+            scale of each row, with ``vectors ~= codes * scales[:, None]``
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Invert ``quantize_int8``."""
+    return codes.astype(np.float32) * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+def int8_scores(codes: np.ndarray, scales: np.ndarray, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Approximate dot products of ``query`` with int8-quantized rows.
+
+    Args:
+        codes (np.ndarray): int8 codes, one row per vector
+        scales (np.ndarray): Per-row scales from ``quantize_int8``
+        query (np.ndarray): Float query vector
+        rows (np.ndarray, optional): Rows to score, all ``len(codes)`` rows if None
+
+    Returns:
+        np.ndarray: One float32 score per scored row
+    """
+    query = np.asarray(query, dtype=np.float32)
+    total = len(codes) if rows is None else len(rows)
+    scores = np.empty(total, dtype=np.float32)
+    for block in row_chunks(total):
+        selected = block if rows is None else rows[block]
+        scores[block] = (codes[selected].astype(np.float32) @ query) * scales[selected]
+    return scores
+
+
+def default_subvectors(dimension: int, target_width: int = 8) -> int:
+    """Number of PQ subvectors that divides ``dimension`` into pieces closest to ``target_width`` wide."""
+    divisors = [count for count in range(1, dimension + 1) if dimension % count == 0]
+    return min(divisors, key=lambda count: (abs(dimension / count - target_width), -count))
+
+
+class ProductQuantizer:
+    """
+    Product quantizer for approximate inner-product search.
+
+    Vectors are split into ``subvectors`` equal slices and each slice is
+    replaced by the nearest of 256 centroids learned by k-means on that slice,
+    so a vector costs one byte per subvector. A query is scored against every
+    code through a per-query lookup table of slice-centroid dot products
+    (asymmetric distance computation), without decoding.
+
+    Like ``IVFIndex``, the quantizer only owns the codebooks; callers store
+    the codes.
+    """
+
+    CENTROIDS = 256
+
+    def __init__(self, subvectors: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """
+        Initialize an untrained quantizer.
+
+        Args:
+            subvectors (int, optional): Number of slices, about dimension / 8 at training
+                time if None; must divide the dimension
+            iterations (int): k-means iterations per slice when training
+            seed (int): Random seed for centroid initialisation and sampling
+        """
+        self.subvectors = subvectors
+        self.iterations = iterations
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.codebooks is not None
+
+    @property
+    def code_size(self) -> int:
+        """Bytes per encoded vector."""
+        return self.subvectors
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        # (n, dimension) -> (n, subvectors, width)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.subvectors, -1)
+
+    def train(self, vectors: np.ndarray, max_training_points: int = 64) -> None:
+        """
+        Learn one codebook per slice with k-means.
+
+        Args:
+            vectors (np.ndarray): Training vectors, one per row
+            max_training_points (int): Sample size per centroid
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) == 0:
+            raise ValueError("Cannot train a product quantizer on no vectors")
+        dimension = vectors.shape[1]
+        self.subvectors = self.subvectors or default_subvectors(dimension)
+        if dimension % self.subvectors:
+            raise ValueError(f"{self.subvectors} subvectors do not divide dimension {dimension}")
+
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > self.CENTROIDS * max_training_points:
+            vectors = vectors[rng.choice(len(vectors), self.CENTROIDS * max_training_points, replace=False)]
+        centroids = min(self.CENTROIDS, len(vectors))
+        slices = self._split(vectors)
+
+        codebooks = np.zeros((self.subvectors, self.CENTROIDS, dimension // self.subvectors), dtype=np.float32)
+        for part in range(self.subvectors):
+            sample = slices[:, part, :]
+            book = sample[rng.choice(len(sample), centroids, replace=False)].copy()
+            for _ in range(self.iterations):
+                labels = self._nearest(sample, book)
+                sums = np.zeros_like(book)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=centroids)
+                # Empty clusters keep their previous centroid
+                filled = counts > 0
+                book[filled] = sums[filled] / counts[filled, None]
+            codebooks[part, :centroids] = book
+            # Unused codes (tiny training sets) repeat the first centroid and are never chosen
+            codebooks[part, centroids:] = book[0]
+        self.codebooks = codebooks
+
+    @staticmethod
+    def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (centroids * centroids).sum(axis=1)[None, :] - 2.0 * (points @ centroids.T)
+        return np.argmin(distances, axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the uint8 code of each row of ``vectors``, shape ``(n, subvectors)``."""
+        if not self.trained:
+            raise RuntimeError("Product quantizer is not trained")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for block in row_chunks(len(vectors)):
+            slices = self._split(vectors[block])
+            for part in range(self.subvectors):
+                codes[block, part] = self._nearest(slices[:, part, :], self.codebooks[part])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate vectors from their codes."""
+        parts = self.codebooks[np.arange(self.subvectors)[None, :], codes]
+        return parts.reshape(len(codes), -1)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate dot products of ``query`` with encoded rows.
+
+        Args:
+            codes (np.ndarray): uint8 codes from ``encode``
+            query (np.ndarray): Float query vector
+            rows (np.ndarray, optional): Rows to score, all ``len(codes)`` rows if None
+
+        Returns:
+            np.ndarray: One float32 score per scored row
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(self.subvectors, -1)
+        table = np.einsum("pcw,pw->pc", self.codebooks, query)
+        parts = np.arange(self.subvectors)[None, :]
+        total = len(codes) if rows is None else len(rows)
+        scores = np.empty(total, dtype=np.float32)
+        for block in row_chunks(total):
+            selected = codes[block] if rows is None else codes[rows[block]]
+            scores[block] = table[parts, selected].sum(axis=1)
+        return scores
+
+    def state(self) -> Dict[str, Any]:
+        """Arrays and settings needed to restore the quantizer with ``from_state``."""
+        return {"codebooks": self.codebooks, "iterations": self.iterations, "seed": self.seed}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ProductQuantizer":
+        codebooks = np.asarray(state["codebooks"], dtype=np.float32)
+        quantizer = cls(subvectors=len(codebooks), iterations=int(state["iterations"]), seed=int(state["seed"]))
+        quantizer.codebooks = codebooks
+        return quantizer
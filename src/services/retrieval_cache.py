@@ -0,0 +1,346 @@
+import atexit
+import logging
+import os
+import pickle
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from src.services.cache_tier import BoundedCache
+from src.services.metrics import BYTES_PERSISTED
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalCache:
+    """
+    Bounded LRU/TTL cache of retrieval results with O(1) invalidation.
+
+    Every entry records the index generation it was computed at. Adding items
+    can change any query's top-k, so ``invalidate`` just bumps the generation
+    and older entries are treated as misses (and dropped) when next read.
+    Deleting items can only change results that contain them, so ``discard_ids``
+    drops exactly those entries through an id -> cache keys reverse index and
+    leaves the rest valid.
+
+    Writes mark the cache dirty instead of rewriting the file. It is persisted
+    once ``flush_every`` writes have accumulated or ``flush_interval`` seconds
+    have passed since the last flush (checked by ``maybe_flush``), and at
+    interpreter exit.
+    """
+
+    FORMAT_VERSION = 2
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            max_entries: Optional[int] = 10_000,
+            ttl: Optional[float] = 24 * 60 * 60,
+            flush_every: int = 100,
+            flush_interval: float = 30.0
+    ):
+        """
+        Initialize the cache, loading ``path`` if it exists.
+
+        Args:
+            path (str, optional): Pickle file to persist to, in-memory only if None
+            max_entries (int, optional): Maximum number of cached queries, unbounded if None
+            ttl (float, optional): Seconds a result stays valid, forever if None
+            flush_every (int): Number of unsaved writes that triggers a flush
+            flush_interval (float): Seconds after which unsaved writes are flushed
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.generation = 0
+
+        self._lock = threading.RLock()
+        self._keys_by_id: Dict[str, Set[str]] = {}
+        self._entries = BoundedCache(max_entries=max_entries, ttl=ttl, on_evict=self._forget)
+        self._dirty = 0
+        self._last_flush = time.monotonic()
+
+        if path:
+            self._load()
+            # Bound through a weak reference so the hook does not keep the cache alive
+            ref = weakref.ref(self)
+            atexit.register(lambda: ref() is not None and ref().flush())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.peek(key)
+        return entry is not None and entry[0] == self.generation
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.info("No existing retrieval cache found, starting fresh")
+            return
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Error loading retrieval cache: {e}")
+            return
+
+        now = self._entries.clock()
+        if isinstance(data, dict) and data.get("version") == self.FORMAT_VERSION:
+            self.generation = data["generation"]
+            entries = data["entries"]
+        else:
+            # Legacy {key: results} dict; it was wiped on every index change, so it is current
+            entries = [(key, self.generation, None, results) for key, results in data.items()]
+
+        with self._lock:
+            for key, generation, expires_at, results in entries:
+                if generation == self.generation and (expires_at is None or expires_at > now):
+                    self._store(key, results, expires_at)
+        logger.info(f"Loaded {len(self._entries)} cached retrieval results")
+
+    def _store(self, key: str, results: List[Dict[str, Any]], expires_at: Optional[float] = None) -> None:
+        self._entries.put(key, (self.generation, results), expires_at=expires_at)
+        if key in self._entries:
+            for item_id in self._result_ids(results):
+                self._keys_by_id.setdefault(item_id, set()).add(key)
+
+    @staticmethod
+    def _result_ids(results: List[Dict[str, Any]]) -> Iterable[str]:
+        return (result["id"] for result in results if "id" in result)
+
+    def _forget(self, key: str, entry: tuple) -> None:
+        # Keep the reverse index in step with evictions and expirations
+        for item_id in self._result_ids(entry[1]):
+            keys = self._keys_by_id.get(item_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_id[item_id]
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached results for ``key`` if present, unexpired and current."""
+        with self._lock:
+            entry = self._entries.peek(key)
+            if entry is not None and entry[0] != self.generation:
+                self._entries.pop(key)
+                self._forget(key, entry)
+            entry = self._entries.get(key)
+            return None if entry is None else entry[1]
+
+    def put(self, key: str, results: List[Dict[str, Any]]) -> None:
+        """Cache ``results`` for ``key`` at the current generation."""
+        with self._lock:
+            previous = self._entries.peek(key)
+            if previous is not None:
+                self._forget(key, previous)
+            self._store(key, results)
+            self._dirty += 1
+
+    def invalidate(self) -> None:
+        """Mark every cached result stale, e.g. after items were added to the index."""
+        with self._lock:
+            self.generation += 1
+            self._dirty += 1
+
+    def discard_ids(self, ids: Iterable[str]) -> int:
+        """
+        Drop the cached results that contain any of ``ids``.
+
+        Returns:
+            int: Number of entries dropped
+        """
+        dropped = 0
+        with self._lock:
+            for item_id in ids:
+                for key in self._keys_by_id.pop(item_id, ()):
+                    entry = self._entries.peek(key)
+                    if entry is not None:
+                        self._entries.pop(key)
+                        self._forget(key, entry)
+                        dropped += 1
+            if dropped:
+                self._dirty += 1
+        return dropped
+
+    def clear(self) -> None:
+        """Drop every entry and persist the empty cache."""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+            self._dirty += 1
+        self.flush()
+
+    def flush_due(self) -> bool:
+        """Whether enough unsaved writes or time have accumulated to persist."""
+        if not self.path or not self._dirty:
+            return False
+        return self._dirty >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval
+
+    def maybe_flush(self) -> None:
+        """Persist the cache if ``flush_due``."""
+        if self.flush_due():
+            self.flush()
+
+    def flush(self) -> None:
+        """Persist unsaved changes to ``path``."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": self.FORMAT_VERSION,
+                "generation": self.generation,
+                "entries": [
+                    (key, generation, expires_at, results)
+                    for key, (generation, results), expires_at in self._entries.items()
+                    if generation == self.generation
+                ],
+            }
+            self._dirty = 0
+            self._last_flush = time.monotonic()
+
+        try:
+            with open(self.path + ".tmp", "wb") as f:
+                pickle.dump(data, f)
+                written = f.tell()
+            os.replace(self.path + ".tmp", self.path)
+            BYTES_PERSISTED.inc(written, cache="retrieval")
+            logger.debug("Saved %d retrieval results to cache", len(data["entries"]))
+        except Exception as e:
+            logger.error(f"Error saving retrieval cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the underlying cache counters plus the current generation."""
+        with self._lock:
+            stats = self._entries.stats()
+            stats["generation"] = self.generation
+            stats["unsaved_writes"] = self._dirty
+        return stats
+
+
+class _Scope:
+    """Ring buffer of unit query embeddings with the cache key of each row."""
+
+    __slots__ = ("vectors", "keys", "slots", "cursor", "filled")
+
+    def __init__(self, capacity: int, dimension: int):
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.slots: Dict[str, int] = {}
+        # Next row to write, and the number of rows ever written (up to capacity)
+        self.cursor = 0
+        self.filled = 0
+
+    def grow(self, capacity: int) -> None:
+        vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:len(self.keys)] = self.vectors
+        self.vectors = vectors
+        self.keys.extend([None] * (capacity - len(self.keys)))
+
+
+class SemanticQueryCache:
+    """
+    Map a query embedding to the cache key of a near-identical earlier query.
+
+    Queries are grouped by a scope string (top_k plus filter), since results
+    are only interchangeable when both match. Within a scope, unit-normalised
+    embeddings are kept in a ring buffer matrix that grows by doubling up to
+    ``max_entries`` rows and then overwrites its oldest row, and a lookup is
+    one matrix-vector product. The results themselves stay in
+    ``RetrievalCache``, so they are invalidated and evicted exactly like
+    exact-match entries; links to keys that have gone are discarded when found.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold (float): Minimum cosine similarity for two queries to share results
+            max_entries (int): Maximum number of remembered queries per scope; the oldest
+                are forgotten first
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, _Scope] = {}
+
+    def __len__(self) -> int:
+        return sum(len(entry.slots) for entry in self._scopes.values())
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def candidates(self, embedding, scope: str) -> List[str]:
+        """
+        Return the cache keys of remembered queries in ``scope`` within ``threshold``, most similar first.
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if vector is None or entry is None or not entry.slots:
+                return []
+            similarities = entry.vectors[:entry.filled] @ vector
+            rows = np.flatnonzero(similarities >= self.threshold)
+            rows = rows[np.argsort(-similarities[rows], kind="stable")]
+            # Discarded rows are zeroed and hold no key
+            return [entry.keys[row] for row in rows if entry.keys[row] is not None]
+
+    def lookup(self, embedding, scope: str) -> Optional[str]:
+        """
+        Return the cache key of the most similar remembered query in ``scope``.
+
+        Returns:
+            str, optional: The key, or None if no query is within ``threshold``
+        """
+        keys = self.candidates(embedding, scope)
+        return keys[0] if keys else None
+
+    def add(self, embedding, scope: str, cache_key: str) -> None:
+        """Remember that ``embedding`` in ``scope`` has results under ``cache_key``."""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            entry = self._scopes.get(scope)
+            if entry is None:
+                entry = self._scopes[scope] = _Scope(min(self.INITIAL_CAPACITY, self.max_entries), len(vector))
+            if cache_key in entry.slots:
+                return
+            if entry.cursor == len(entry.keys):
+                if len(entry.keys) < self.max_entries:
+                    entry.grow(min(2 * len(entry.keys), self.max_entries))
+                else:
+                    entry.cursor = 0
+            slot = entry.cursor
+            entry.cursor += 1
+            evicted = entry.keys[slot]
+            if evicted is not None:
+                del entry.slots[evicted]
+            entry.vectors[slot] = vector
+            entry.keys[slot] = cache_key
+            entry.slots[cache_key] = slot
+            entry.filled = max(entry.filled, slot + 1)
+
+    def discard(self, scope: str, cache_key: str) -> None:
+        """Forget the link to ``cache_key``, e.g. once its results are no longer cached."""
+        with self._lock:
+            entry = self._scopes.get(scope)
+            slot = entry.slots.pop(cache_key, None) if entry is not None else None
+            if slot is None:
+                return
+            entry.keys[slot] = None
+            entry.vectors[slot] = 0.0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
@@ -1,135 +1,505 @@
+import asyncio
+import logging
 import os
-import pickle
-import uuid
 import hashlib
-from typing import List, Dict, Any, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
 import dotenv
 
-from pinecone import Pinecone
 
-from src.services.embedding_cache import EmbeddingCache
-from src.config.pinecone_config import initialize_pinecone
+from src.services.embedding_batcher import acall_with_retry, call_with_retry
+from src.services.document_store import DocumentStore, filterable_metadata
+from src.services.embedding_cache import DEFAULT_EMBEDDING_MODEL, MODEL_DIMENSIONS, EmbeddingCache, embedding_variant
+from src.services.metadata_filter import pinned_values
+from src.services.retrieval_cache import RetrievalCache, SemanticQueryCache
+from src.services.upsert_batcher import ParallelUpserter
+from src.services.vector_backend import LocalBackend, PineconeBackend, VectorBackend
+from src.services.metrics import (
+    PINECONE_LATENCY,
+    RETRIEVAL_CACHE_HITS,
+    RETRIEVAL_CACHE_MISSES,
+    SEMANTIC_CACHE_HITS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Engines returned by RetrivalEngine.shared, keyed by constructor arguments
+_shared_lock = threading.Lock()
+_shared_engines: Dict[str, "RetrivalEngine"] = {}
 
 
 class RetrivalEngine:
     """
     Recommendation engine using Pinecone vector database and cached embeddings.
+
+    Outside production, or when ``use_pinecone`` is False, vectors are kept in a
+    ``LocalBackend`` persisted under ``cache_dir`` instead. Any other
+    ``VectorBackend`` can be passed as ``vector_backend``.
     """
 
-    def __init__(self, index_name: str = "recommendation-index", cache_dir: str = "./embedding_cache"):
+    # IDs per existence check; Pinecone fetch takes IDs in the query string
+    FETCH_BATCH_SIZE = 100
+
+    # Pinecone deletes at most 1000 IDs per request
+    DELETE_BATCH_SIZE = 1000
+
+    # Namespaces queried at once when a query fans out
+    MAX_NAMESPACE_FANOUT = 8
+
+    # Seconds between background saves of the local index; bulk calls save at the end
+    LOCAL_SAVE_INTERVAL = 30.0
+
+    def __init__(
+            self,
+            index_name: str = "recommendation-index",
+            cache_dir: str = "./embedding_cache",
+            embedding_storage: str = "log",
+            embedding_quantization: Optional[str] = None,
+            embedding_model: Optional[str] = None,
+            embedding_dimensions: Optional[int] = None,
+            use_pinecone: Optional[bool] = None,
+            vector_backend: Optional[Union[str, VectorBackend]] = None,
+            local_index_type: str = "flat",
+            local_index_options: Optional[Dict[str, Any]] = None,
+            retrieval_cache_size: Optional[int] = 10_000,
+            retrieval_cache_ttl: Optional[float] = 24 * 60 * 60,
+            semantic_cache_threshold: Optional[float] = None,
+            upsert_concurrency: int = 4,
+            filterable_fields: Optional[List[str]] = None,
+            namespace_key: Optional[str] = None
+    ):
         """
         Initialize the recommendation engine.
 
         Args:
             index_name (str): Name of the Pinecone index to use
             cache_dir (str): Directory to store the embedding cache
+            embedding_storage (str): Embedding cache storage mode, "log" or "mmap"
+            embedding_quantization (str, optional): "int8" to store "mmap" cache vectors as
+                int8 codes
+            embedding_model (str, optional): OpenAI embedding model, text-embedding-ada-002 if None
+            embedding_dimensions (int, optional): Embedding size, e.g. 256 or 512 with a
+                text-embedding-3 model; the model's native size if None. The Pinecone index
+                is created at this size, and an existing index of another size is
+                rejected: move the corpus with ``src.utils.migrate_embeddings``.
+            use_pinecone (bool, optional): Force the Pinecone (True) or local (False)
+                backend; by default Pinecone is used when ENVIRONMENT is "production"
+            vector_backend (str or VectorBackend, optional): "pinecone", "local", or a
+                backend instance such as ``PineconeBackend(host=...)`` pointed at the
+                local stand-in server; overrides ``use_pinecone``
+            local_index_type (str): Local index search mode, "flat" (exact) or "ivf" (approximate)
+            local_index_options (Dict[str, Any], optional): Extra ``LocalVectorIndex`` settings,
+                e.g. ``nlist``, ``nprobe``, ``quantization`` and ``rescore_factor``
+            retrieval_cache_size (int, optional): Maximum number of cached queries, unbounded if None
+            retrieval_cache_ttl (float, optional): Seconds a cached result stays valid, forever if None
+            semantic_cache_threshold (float, optional): Reuse cached results of an earlier query
+                with the same top_k and filter whose embedding has at least this cosine
+                similarity (e.g. 0.95); disabled if None
+            upsert_concurrency (int): Maximum number of Pinecone upsert batches in flight
+            filterable_fields (List[str], optional): Metadata keys sent to the vector index
+                (``item_type`` is always included); by default every short scalar field.
+                Chunk text and the full metadata are kept in the local document store.
+            namespace_key (str, optional): Metadata key, e.g. "item_type", whose value picks
+                the namespace each item is stored in. Queries whose filter pins the key
+                (``$eq`` or ``$in``) only search those namespaces; others fan out across
+                every namespace in parallel and merge. None keeps everything in the
+                default namespace. Items indexed before routing was enabled stay in the
+                default namespace until re-added.
         """
         self.index_name = index_name
         self.cache_dir = cache_dir
-        self.use_pinecone = True  # Default to True, will be updated based on environment
 
         # Ensure cache directory exists
         os.makedirs(cache_dir, exist_ok=True)
 
         # Check environment
-        # env = os.getenv("ENVIRONMENT", "development").lower()
-        env = "production"
+        self.environment = os.getenv("ENVIRONMENT", "production").lower()
 
         # Only use Pinecone in production or if forced
-        self.use_pinecone = env == "production"
+        if isinstance(vector_backend, VectorBackend):
+            use_pinecone = vector_backend.remote
+        elif vector_backend is not None:
+            if vector_backend not in ("pinecone", "local"):
+                raise ValueError(f"Unknown vector backend: {vector_backend!r}; expected 'pinecone' or 'local'")
+            use_pinecone = vector_backend == "pinecone"
+        self.use_pinecone = self.environment == "production" if use_pinecone is None else use_pinecone
+        if self.use_pinecone:
+            logger.info("Using Pinecone for retrieval")
+        else:
+            logger.info("Using the local vector index for retrieval")
 
-        # Initialize embedding cache
-        try:
-            self.embedding_cache = EmbeddingCache(cache_dir=cache_dir)
-            # Check if cache file exists
-            cache_file = os.path.join(cache_dir, "embedding_cache.pkl")
-            cache_exists = os.path.exists(cache_file)
-
-            # If we're not in production and cache exists, use cached version
-            if not self.use_pinecone and cache_exists:
-                print("Using cached embeddings in development environment")
-                self._load_cache()
-            else:
-                # In production or if cache doesn't exist, use Pinecone
-                self.use_pinecone = True
-                print(
-                    f"Using Pinecone for embeddings. Reason: {'Production environment' if env == 'production' else 'Cache not found'}")
-        except Exception as e:
-            print(f"Error initializing embedding cache: {e}")
-            raise
+        # The embedding cache, vector index, document store and retrieval cache
+        # are opened on first use (or by warm_up), so constructing an engine is cheap
+        self._lazy_lock = threading.RLock()
+        self._embedding_cache: Optional[EmbeddingCache] = None
+        self._index: Optional[VectorBackend] = vector_backend if isinstance(vector_backend, VectorBackend) else None
+        self._document_store: Optional[DocumentStore] = None
+        self._retrieval_cache: Optional[RetrievalCache] = None
+        self.embedding_storage = embedding_storage
+        self.embedding_quantization = embedding_quantization
+        self.embedding_model = embedding_model
+        self.embedding_dimensions = embedding_dimensions
+        self.embedding_variant = embedding_variant(embedding_model, embedding_dimensions)
+        self.embedding_dimension = embedding_dimensions or MODEL_DIMENSIONS.get(embedding_model or DEFAULT_EMBEDDING_MODEL)
+        self.local_index_type = local_index_type
+        self.local_index_options = local_index_options or {}
+        self.retrieval_cache_size = retrieval_cache_size
+        self.retrieval_cache_ttl = retrieval_cache_ttl
+
+        # Pinecone upserts are split by payload size and sent in parallel
+        self.upserter = ParallelUpserter(
+            self._upsert_batch,
+            aupsert=self._aupsert_batch,
+            max_concurrency=upsert_concurrency
+        )
+        self.last_upsert_stats: Optional[Dict[str, float]] = None
+
+        # Chunk text and full metadata; the vector index only gets filterable fields
+        self.namespace_key = namespace_key
+        self._known_namespaces: Optional[Set[str]] = None
+        self.filterable_fields = (
+            None if filterable_fields is None
+            else list(dict.fromkeys([*filterable_fields, "item_type", *([namespace_key] if namespace_key else [])]))
+        )
 
-        # Initialize Pinecone if needed
+        # Results of another embedding model or size come from another index
+        self.retrieval_cache_file = os.path.join(
+            cache_dir, "retrieval_cache.pkl" if self.embedding_variant is None
+            else f"retrieval_cache-{self.embedding_variant}.pkl"
+        )
+        self.semantic_cache = (
+            SemanticQueryCache(threshold=semantic_cache_threshold)
+            if semantic_cache_threshold is not None else None
+        )
+
+    @classmethod
+    def shared(cls, **kwargs) -> "RetrivalEngine":
+        """
+        Return the process-wide engine for these constructor arguments.
+
+        Request handlers should use this instead of constructing an engine per
+        request, so caches and connections are loaded once and then reused.
+        """
+        key = repr(sorted(kwargs.items()))
+        with _shared_lock:
+            engine = _shared_engines.get(key)
+            if engine is None:
+                engine = _shared_engines[key] = cls(**kwargs)
+            return engine
+
+    def _lazy(self, attribute: str, factory):
+        value = getattr(self, attribute)
+        if value is None:
+            with self._lazy_lock:
+                value = getattr(self, attribute)
+                if value is None:
+                    value = factory()
+                    setattr(self, attribute, value)
+        return value
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        """Embedding cache, loaded from ``cache_dir`` on first use."""
+        def load():
+            try:
+                return EmbeddingCache(
+                    cache_dir=self.cache_dir,
+                    storage=self.embedding_storage,
+                    quantization=self.embedding_quantization,
+                    model=self.embedding_model,
+                    dimensions=self.embedding_dimensions
+                )
+            except Exception as e:
+                logger.error(f"Error initializing embedding cache: {e}")
+                raise
+        return self._lazy("_embedding_cache", load)
+
+    @property
+    def index(self) -> VectorBackend:
+        """Vector backend: Pinecone or the local index, opened on first use."""
+        return self._lazy("_index", self._open_index)
+
+    def _open_index(self) -> VectorBackend:
         if self.use_pinecone:
             try:
-                initialize_pinecone(index_name)
-                pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-                self.index = pc.Index(index_name)
+                return PineconeBackend(self.index_name, dimension=self.embedding_dimension)
             except Exception as e:
-                print(f"Error initializing Pinecone: {e}")
+                logger.error(f"Error initializing Pinecone: {e}")
                 # Fall back to cache in case of Pinecone initialization failure
-                if not env == "production":
-                    print("Falling back to cache due to Pinecone initialization failure")
-                    self.use_pinecone = False
-                    self._load_cache()
-                else:
+                if self.environment == "production":
                     # In production, we should fail if Pinecone is unavailable
                     raise
+                logger.warning("Falling back to the local vector index due to Pinecone initialization failure")
+                self.use_pinecone = False
 
-        # Initialize retrieval results cache
-        self.retrieval_cache_file = os.path.join(cache_dir, "retrieval_cache.pkl")
-        self.retrieval_cache = self._load_retrieval_cache()
+        # Vectors of another model or size live in their own local index
+        local_index = "local_index" if self.embedding_variant is None else f"local_index-{self.embedding_variant}"
+        # Writes are saved in batches: each save rewrites the whole local index
+        return LocalBackend(
+            os.path.join(self.cache_dir, local_index),
+            index_type=self.local_index_type,
+            **{"save_interval": self.LOCAL_SAVE_INTERVAL, **self.local_index_options}
+        )
 
-    def _load_cache(self):
-        cache_file = os.path.join(self.cache_dir, "embedding_cache.pkl")
-        try:
-            with open(cache_file, "rb") as f:
-                self.embedding_cache = pickle.load(f)
-            print(f"Successfully loaded embedding cache from {cache_file}")
-        except (FileNotFoundError, EOFError):
-            print("No embedding cache found or empty file, initializing empty cache")
-            self.embedding_cache = {}
-
-    def _save_cache(self):
-        cache_file = os.path.join(self.cache_dir, "embedding_cache.pkl")
-        try:
-            with open(cache_file, "wb") as f:
-                pickle.dump(self.embedding_cache, f)
-            print(f"Successfully saved embedding cache to {cache_file}")
-        except Exception as e:
-            print(f"Error saving cache: {e}")
+    @property
+    def document_store(self) -> DocumentStore:
+        """Chunk text and full metadata, opened on first use."""
+        return self._lazy(
+            "_document_store",
+            lambda: DocumentStore(os.path.join(self.cache_dir, "documents.sqlite3"))
+        )
 
-    def _load_retrieval_cache(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Load the retrieval results cache from disk."""
-        try:
-            if os.path.exists(self.retrieval_cache_file):
-                with open(self.retrieval_cache_file, "rb") as f:
-                    cache = pickle.load(f)
-                print(f"Loaded {len(cache)} cached retrieval results")
-                return cache
-            else:
-                print("No existing retrieval cache found, starting fresh")
-                return {}
-        except Exception as e:
-            print(f"Error loading retrieval cache: {e}")
-            return {}
+    @property
+    def retrieval_cache(self) -> RetrievalCache:
+        """Retrieval results cache, loaded on first use."""
+        return self._lazy(
+            "_retrieval_cache",
+            lambda: RetrievalCache(
+                self.retrieval_cache_file,
+                max_entries=self.retrieval_cache_size,
+                ttl=self.retrieval_cache_ttl
+            )
+        )
 
-    def _save_retrieval_cache(self) -> None:
-        """Save the retrieval results cache to disk."""
-        try:
-            with open(self.retrieval_cache_file, "wb") as f:
-                pickle.dump(self.retrieval_cache, f)
-            print(f"Saved {len(self.retrieval_cache)} retrieval results to cache")
-        except Exception as e:
-            print(f"Error saving retrieval cache: {e}")
+    def warm_up(self) -> Dict[str, float]:
+        """
+        Open everything a first request would otherwise pay for.
 
-    def _generate_retrieval_key(self, query: str, top_k: int, filter_criteria: Optional[Dict[str, Any]]) -> str:
-        """Generate a unique key for a retrieval query."""
+        Loads the embedding cache and tokenizer, the retrieval cache and the
+        document store, and resolves the vector index; with Pinecone one stats
+        call is made so the connection pool is established. Call it at server
+        start.
+
+        Returns:
+            Dict[str, float]: Seconds spent on each component
+        """
+        timings = {}
+
+        def timed(name: str, action) -> None:
+            start = time.perf_counter()
+            action()
+            timings[name] = time.perf_counter() - start
+
+        timed("embedding_cache", lambda: self.embedding_cache.batcher.count_tokens(""))
+        timed("retrieval_cache", lambda: self.retrieval_cache)
+        timed("document_store", lambda: len(self.document_store))
+        timed("index", self.index.describe_index_stats)
+        logger.info(
+            "Warmed up retrieval engine in %.2fs (%s)",
+            sum(timings.values()),
+            ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+        )
+        return timings
+
+    @staticmethod
+    def _to_list(embedding) -> List[float]:
+        """Convert NumPy embeddings from the mmap cache into plain lists for Pinecone."""
+        return embedding.tolist() if hasattr(embedding, "tolist") else embedding
+
+    @staticmethod
+    def _retrieval_scope(top_k: int, filter_criteria: Optional[Dict[str, Any]]) -> str:
+        """Describe the parameters under which two queries' results are interchangeable."""
         # Convert filter_criteria to a stable string representation
         filter_str = str(sorted(filter_criteria.items())) if filter_criteria else "None"
+        return f"{top_k}|{filter_str}"
+
+    def _generate_retrieval_key(self, query: str, top_k: int, filter_criteria: Optional[Dict[str, Any]]) -> str:
+        """Generate a unique key for a retrieval query."""
         # Combine query parameters into a string and hash it
-        key_str = f"{query}|{top_k}|{filter_str}"
+        key_str = f"{query}|{self._retrieval_scope(top_k, filter_criteria)}"
         return hashlib.md5(key_str.encode('utf-8')).hexdigest()
 
+    def _semantic_lookup(self, query_embedding, scope: str, cache_key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results of a similar earlier query, if the semantic cache is enabled."""
+        if self.semantic_cache is None:
+            return None
+        for similar_key in self.semantic_cache.candidates(query_embedding, scope):
+            cached = self.retrieval_cache.get(similar_key)
+            if cached is None:
+                # Its results were evicted or invalidated; a less similar query may still do
+                self.semantic_cache.discard(scope, similar_key)
+                continue
+            SEMANTIC_CACHE_HITS.inc()
+            # Also cache under this query's own key so repeats skip the embedding lookup
+            self.retrieval_cache.put(cache_key, cached)
+            return cached
+        return None
+
+    def _cache_results(self, query_embedding, scope: str, cache_key: str, recommendations) -> None:
+        self.retrieval_cache.put(cache_key, recommendations)
+        if self.semantic_cache is not None:
+            self.semantic_cache.add(query_embedding, scope, cache_key)
+
+    def _namespace_of(self, metadata: Dict[str, Any]) -> str:
+        """Namespace an item with this (full) metadata is stored in."""
+        if self.namespace_key is None:
+            return ""
+        value = metadata.get(self.namespace_key)
+        return "" if value is None else str(value)
+
+    def _namespaces(self) -> List[str]:
+        """Every namespace that may hold items; read from the index once, then kept up to date."""
+        if self.namespace_key is None:
+            return [""]
+        if not self.use_pinecone:
+            return self.index.namespaces() or [""]
+        with self._lazy_lock:
+            if self._known_namespaces is None:
+                with PINECONE_LATENCY.time(operation="describe_index_stats"):
+                    stats = self.index.describe_index_stats()
+                self._known_namespaces = set(stats["namespaces"])
+            return sorted(self._known_namespaces) or [""]
+
+    def _remember_namespaces(self, namespaces: List[str]) -> None:
+        with self._lazy_lock:
+            if self._known_namespaces is not None:
+                self._known_namespaces.update(namespaces)
+
+    def _route(self, filter_criteria: Optional[Dict[str, Any]]) -> List[str]:
+        """Namespaces a query with this filter has to search."""
+        if self.namespace_key is None:
+            return [""]
+        pinned = pinned_values(filter_criteria, self.namespace_key)
+        if pinned is None:
+            return self._namespaces()
+        return list(dict.fromkeys(str(value) for value in pinned))
+
+    @staticmethod
+    def _merge_matches(responses: list, top_k: int) -> Dict[str, List[Any]]:
+        """Merge query responses from several namespaces into one, best match first."""
+        matches = [match for response in responses for match in response["matches"]]
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return {"matches": matches[:top_k]}
+
+    def _upsert_batch(self, vectors: List[Dict[str, Any]], namespace: str = "") -> None:
+        with PINECONE_LATENCY.time(operation="upsert"):
+            self.index.upsert(vectors, namespace=namespace)
+
+    async def _aupsert_batch(self, vectors: List[Dict[str, Any]], namespace: str = "") -> None:
+        with PINECONE_LATENCY.time(operation="upsert"):
+            await self.index.aupsert(vectors, namespace=namespace)
+
+    def _upsert(self, vectors: List[Dict[str, Any]], namespaces: Optional[List[str]] = None) -> None:
+        namespaces = namespaces if self.namespace_key is not None else None
+        if self.use_pinecone:
+            self.last_upsert_stats = self.upserter.upsert(vectors, namespaces)
+        elif namespaces is None:
+            # One call, so the local index persists once
+            self.index.upsert(vectors)
+        else:
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for vector, namespace in zip(vectors, namespaces):
+                groups.setdefault(namespace, []).append(vector)
+            for namespace, group in groups.items():
+                self.index.upsert(group, namespace=namespace)
+        if namespaces is not None:
+            self._remember_namespaces(namespaces)
+
+    def _query_namespace(
+            self,
+            vector: List[float],
+            top_k: int,
+            filter_criteria: Optional[Dict[str, Any]],
+            namespace: str = ""
+    ):
+        if self.use_pinecone:
+            with PINECONE_LATENCY.time(operation="query"):
+                return self.index.query(vector, top_k=top_k, filter=filter_criteria, namespace=namespace)
+        return self.index.query(vector, top_k=top_k, filter=filter_criteria, namespace=namespace)
+
+    def _query(self, vector: List[float], top_k: int, filter_criteria: Optional[Dict[str, Any]]):
+        namespaces = self._route(filter_criteria)
+        if not namespaces:
+            # The filter pins the namespace key to no value at all, e.g. an empty $in
+            return {"matches": []}
+        if len(namespaces) == 1:
+            return self._query_namespace(vector, top_k, filter_criteria, namespaces[0])
+        with ThreadPoolExecutor(max_workers=min(self.MAX_NAMESPACE_FANOUT, len(namespaces))) as executor:
+            responses = list(executor.map(
+                lambda namespace: self._query_namespace(vector, top_k, filter_criteria, namespace), namespaces
+            ))
+        return self._merge_matches(responses, top_k)
+
+    async def _aquery(self, vector: List[float], top_k: int, filter_criteria: Optional[Dict[str, Any]]):
+        """Async version of ``_query`` for remote backends."""
+        namespaces = await asyncio.to_thread(self._route, filter_criteria)
+
+        async def query_namespace(namespace: str):
+            with PINECONE_LATENCY.time(operation="query"):
+                return await self.index.aquery(vector, top_k=top_k, filter=filter_criteria, namespace=namespace)
+
+        if not namespaces:
+            return {"matches": []}
+        if len(namespaces) == 1:
+            return await query_namespace(namespaces[0])
+        semaphore = asyncio.Semaphore(self.MAX_NAMESPACE_FANOUT)
+
+        async def bounded(namespace: str):
+            async with semaphore:
+                return await query_namespace(namespace)
+
+        return self._merge_matches(await asyncio.gather(*(bounded(namespace) for namespace in namespaces)), top_k)
+
+    @staticmethod
+    def _generate_item_id(content: str, item_type: str) -> str:
+        """Derive a deterministic ID from an item's type and content."""
+        return f"{item_type}_{hashlib.md5(content.encode('utf-8')).hexdigest()}"
+
+    def _fetch_existing(self, ids: List[str], namespace: str = "") -> List[str]:
+        with PINECONE_LATENCY.time(operation="fetch"):
+            response = call_with_retry(lambda: self.index.fetch(ids, namespace=namespace), label="Fetch request")
+        return list(response["vectors"])
+
+    def _id_chunks(
+            self,
+            ids: List[str],
+            namespaces: Optional[List[str]],
+            size: int
+    ) -> List[Tuple[str, List[str]]]:
+        """Split ``ids`` into ``(namespace, ids)`` requests of at most ``size`` distinct IDs."""
+        groups: Dict[str, Dict[str, None]] = {}
+        for item_id, namespace in zip(ids, namespaces or [""] * len(ids)):
+            groups.setdefault(namespace, {})[item_id] = None
+        return [
+            (namespace, list(group)[i:i + size])
+            for namespace, group in groups.items()
+            for i in range(0, len(group), size)
+        ]
+
+    def _existing_ids(
+            self,
+            ids: List[str],
+            namespaces: Optional[List[str]] = None,
+            max_concurrency: int = 8
+    ) -> Set[str]:
+        """Return which of ``ids`` are already in the vector index (in their namespace), checked in batches."""
+        chunks = self._id_chunks(ids, namespaces, self.FETCH_BATCH_SIZE)
+        if not self.use_pinecone:
+            return {item_id for namespace, chunk in chunks for item_id in chunk if self.index.contains(item_id, namespace)}
+        existing: Set[str] = set()
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chunks)))) as executor:
+            for found in executor.map(lambda args: self._fetch_existing(args[1], args[0]), chunks):
+                existing.update(found)
+        return existing
+
+    @staticmethod
+    def _unique_positions(ids: List[str], existing: Set[str]) -> List[int]:
+        """Positions of the first occurrence of each ID not in ``existing``."""
+        seen = set(existing)
+        positions = []
+        for position, item_id in enumerate(ids):
+            if item_id not in seen:
+                seen.add(item_id)
+                positions.append(position)
+        return positions
+
+    def flush_index(self) -> None:
+        """Save buffered local index writes now; nothing to do for Pinecone."""
+        if self._index is not None:
+            self._index.flush()
+
     def add_item(self, content: str, metadata: Dict[str, Any], item_type: str) -> str:
         """
         Add a single item to the recommendation engine.
@@ -140,100 +510,186 @@ class RetrivalEngine:
             item_type (str): Type of the item (e.g., 'article', 'product')
 
         Returns:
-            str: ID of the added item
+            str: ID of the added item, derived from its type and content
+        """
+        return self.bulk_add_items([content], [metadata], [item_type])[0]
+
+    def _prepare_vectors(
+            self,
+            ids: List[str],
+            contents: List[str],
+            metadatas: List[Dict[str, Any]],
+            item_types: List[str],
+            embeddings
+    ) -> List[Dict[str, Any]]:
+        """
+        Build Pinecone upsert payloads for a batch of items and store their documents.
+
+        The chunk text and full metadata go to the document store; the payloads
+        only carry the filterable metadata.
+        """
+        vectors = []
+        documents = []
+        for item_id, content, metadata, item_type, embedding in zip(ids, contents, metadatas, item_types, embeddings):
+            metadata = {**metadata, "item_type": item_type}
+            documents.append((item_id, content, metadata))
+            vectors.append({
+                "id": item_id,
+                "values": self._to_list(embedding),
+                "metadata": filterable_metadata(metadata, self.filterable_fields)
+            })
+        # Stored first so a query can never return an item that cannot be hydrated
+        self.document_store.put_many(documents)
+        return vectors
+
+    def pending_items(
+            self,
+            contents: List[str],
+            metadatas: List[Dict[str, Any]],
+            item_types: List[str],
+            skip_existing: bool = True
+    ) -> Tuple[List[str], List[int]]:
         """
-        # Add content to metadata for retrieval
-        metadata["content"] = content
-        metadata["item_type"] = item_type
+        Work out which items of a batch still need to be embedded and indexed.
 
-        # Generate embedding using the cache
-        embedding = self.embedding_cache.get_embedding(content)
+        Args:
+            contents (List[str]): Text content of each item
+            metadatas (List[Dict[str, Any]]): Metadata of each item
+            item_types (List[str]): Type of each item
+            skip_existing (bool): Treat items already in the index as done
 
-        # Generate a unique ID
-        item_id = str(uuid.uuid4())
+        Returns:
+            Tuple[List[str], List[int]]: The ID of every item, and the positions of
+                the first occurrence of each ID that is not indexed yet
+        """
+        ids = [self._generate_item_id(content, item_type) for content, item_type in zip(contents, item_types)]
+        namespaces = [
+            self._namespace_of({**metadata, "item_type": item_type})
+            for metadata, item_type in zip(metadatas, item_types)
+        ]
+        existing = self._existing_ids(ids, namespaces) if skip_existing else set()
+        positions = self._unique_positions(ids, existing)
+        if len(positions) < len(ids):
+            logger.info(f"Skipping {len(ids) - len(positions)} of {len(ids)} items that are already indexed")
+        return ids, positions
 
-        # Upsert into Pinecone if using it
-        if self.use_pinecone:
-            self.index.upsert(vectors=[
-                {
-                    "id": item_id,
-                    "values": embedding,
-                    "metadata": metadata
-                }
-            ])
-        else:
-            # Otherwise save to cache
-            self._save_cache()
+    def embed_items(self, contents: List[str]):
+        """
+        Embed item contents with this engine's model, going through the embedding cache.
 
-        # Clear retrieval cache since the index has been modified
-        self.retrieval_cache = {}
-        self._save_retrieval_cache()
+        Args:
+            contents (List[str]): Text content of each item
 
-        return item_id
+        Returns:
+            One embedding per item, in input order; misses are embedded in batched requests
+        """
+        return self.embedding_cache.get_embeddings(contents)
 
     def bulk_add_items(
             self,
             contents: List[str],
             metadatas: List[Dict[str, Any]],
-            item_types: List[str]
+            item_types: List[str],
+            skip_existing: bool = True
     ) -> List[str]:
         """
         Add multiple items to the recommendation engine.
 
+        IDs are derived from each item's type and content, so adding the same
+        chunk again maps to the same vector. Unless ``skip_existing`` is False,
+        items already in the index are skipped before they are embedded or
+        upserted, which makes re-ingesting an unchanged corpus nearly free.
+
         Args:
             contents (List[str]): List of text contents to embed
             metadatas (List[Dict[str, Any]]): List of metadata dicts for each content
             item_types (List[str]): List of item types
+            skip_existing (bool): Skip items whose ID is already indexed; pass False
+                to overwrite their metadata
 
         Returns:
-            List[str]: List of IDs for the added items
+            List[str]: List of IDs for the items, in input order
         """
         if not (len(contents) == len(metadatas) == len(item_types)):
             raise ValueError("Contents, metadatas, and item_types must have the same length")
 
         try:
-            # Get embeddings for all contents
-            embeddings = []
-            for content in contents:
-                embedding = self.embedding_cache.get_embedding(content)
-                embeddings.append(embedding)
-
-            # Generate IDs and prepare vectors for Pinecone
-            vectors = []
-            ids = []
-            for i, (content, metadata, embedding) in enumerate(zip(contents, metadatas, embeddings)):
-                item_id = str(uuid.uuid4())
-                ids.append(item_id)
-                metadata["content"] = content
-                metadata["item_type"] = item_types[i]
-                vectors.append({
-                    "id": item_id,
-                    "values": embedding,
-                    "metadata": metadata
-                })
-
-            # Upsert to Pinecone if using it
-            if self.use_pinecone:
-                self.index.upsert(vectors=vectors)
-            else:
-                # Otherwise save to cache
-                self._save_cache()
+            ids, positions = self.pending_items(contents, metadatas, item_types, skip_existing)
+            if not positions:
+                return ids
+            namespaces = [
+                self._namespace_of({**metadata, "item_type": item_type})
+                for metadata, item_type in zip(metadatas, item_types)
+            ]
+
+            new_contents = [contents[p] for p in positions]
+
+            embeddings = self.embed_items(new_contents)
 
-            # Clear retrieval cache since the index has been modified
-            self.retrieval_cache = {}
-            self._save_retrieval_cache()
+            # Prepare vectors for the index
+            vectors = self._prepare_vectors(
+                [ids[p] for p in positions], new_contents, [metadatas[p] for p in positions],
+                [item_types[p] for p in positions], embeddings
+            )
+
+            # Upsert to the vector index; the embedding cache persists itself
+            self._upsert(vectors, [namespaces[p] for p in positions])
+            self.flush_index()
+
+            # New items can change any result; stale cached results are dropped lazily
+            self.retrieval_cache.invalidate()
+            self.retrieval_cache.maybe_flush()
 
             return ids
 
         except Exception as e:
-            print(f"Error in bulk_add_items: {e}")
+            logger.error(f"Error in bulk_add_items: {e}")
             raise
 
+    def add_embedded_items(
+            self,
+            ids: List[str],
+            contents: List[str],
+            metadatas: List[Dict[str, Any]],
+            embeddings,
+            flush: bool = True
+    ) -> None:
+        """
+        Index items whose embeddings were computed elsewhere, e.g. when migrating an index.
+
+        Documents are stored and vectors upserted as ``bulk_add_items`` would, but
+        nothing is embedded and existing IDs are overwritten.
+
+        Args:
+            ids (List[str]): Item IDs
+            contents (List[str]): Text content of each item
+            metadatas (List[Dict[str, Any]]): Full metadata of each item, ``item_type`` included
+            embeddings: One embedding per item, of this engine's dimension
+            flush (bool): Save the local index before returning; callers adding many
+                batches pass False and call ``flush_index`` once at the end
+        """
+        if not (len(ids) == len(contents) == len(metadatas) == len(embeddings)):
+            raise ValueError("ids, contents, metadatas, and embeddings must have the same length")
+        if not ids:
+            return
+        if self.embedding_dimension is not None and len(embeddings[0]) != self.embedding_dimension:
+            raise ValueError(f"Expected {self.embedding_dimension}-d embeddings, got {len(embeddings[0])}-d")
+
+        item_types = [metadata.get("item_type") for metadata in metadatas]
+        vectors = self._prepare_vectors(ids, contents, metadatas, item_types, embeddings)
+        self._upsert(vectors, [self._namespace_of(metadata) for metadata in metadatas])
+        if flush:
+            self.flush_index()
+
+        self.retrieval_cache.invalidate()
+        self.retrieval_cache.maybe_flush()
+
     def get_retrivals(
             self,
             query: str,
             top_k: int = 5,
-            filter_criteria: Optional[Dict[str, Any]] = None
+            filter_criteria: Optional[Dict[str, Any]] = None,
+            fields: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Get recommendations based on a query.
@@ -242,6 +698,8 @@ class RetrivalEngine:
             query (str): The query text
             top_k (int): Number of recommendations to return
             filter_criteria (Dict[str, Any], optional): Criteria to filter results
+            fields (List[str], optional): Metadata keys to return, ``content`` included;
+                every key if None
 
         Returns:
             List[Dict[str, Any]]: Recommended items with scores and metadata
@@ -250,44 +708,408 @@ class RetrivalEngine:
         cache_key = self._generate_retrieval_key(query, top_k, filter_criteria)
 
         # Check if this query is already cached
-        if cache_key in self.retrieval_cache:
-            print(f"Using cached retrieval results for: {query[:30]}...")
-            return self.retrieval_cache[cache_key]
+        cached = self.retrieval_cache.get(cache_key)
+        if cached is not None:
+            RETRIEVAL_CACHE_HITS.inc()
+            logger.debug("Using cached retrieval results for: %.30s...", query)
+            return self._hydrate(cached, fields)
 
         # Not in cache, proceed with normal retrieval
-        print(f"Performing new retrieval for: {query[:30]}...")
+        RETRIEVAL_CACHE_MISSES.inc()
+        logger.debug("Performing new retrieval for: %.30s...", query)
 
         # Generate embedding for query using cache
         query_embedding = self.embedding_cache.get_embedding(query)
 
-        # Query Pinecone if using it
-        if self.use_pinecone:
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True,
-                filter=filter_criteria
+        # A near-identical earlier query may already have results
+        scope = self._retrieval_scope(top_k, filter_criteria)
+        cached = self._semantic_lookup(query_embedding, scope, cache_key)
+        if cached is not None:
+            logger.debug("Using semantically cached retrieval results for: %.30s...", query)
+            return self._hydrate(cached, fields)
+
+        # Query the vector index
+        results = self._query(self._to_list(query_embedding), top_k, filter_criteria)
+        recommendations = self._format_matches(results)
+
+        # Cache the results; the cache is persisted in batches
+        self._cache_results(query_embedding, scope, cache_key, recommendations)
+        self.retrieval_cache.maybe_flush()
+
+        return self._hydrate(recommendations, fields)
+
+    def _hydrate_many(
+            self,
+            result_lists: List[List[Dict[str, Any]]],
+            fields: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Replace the slim index metadata of each match with its stored document.
+
+        All ids are looked up in one batched query. Matches without a stored
+        document (e.g. indexed before the document store existed) keep their
+        index metadata.
+
+        Args:
+            result_lists (List[List[Dict[str, Any]]]): Formatted matches per query
+            fields (List[str], optional): Metadata keys to return, ``content`` included;
+                every key if None
+
+        Returns:
+            List[List[Dict[str, Any]]]: New match dicts; the inputs are not modified
+        """
+        ids = [match["id"] for results in result_lists for match in results]
+        documents = self.document_store.get_many(ids, fields) if ids else {}
+        hydrated = []
+        for results in result_lists:
+            matches = []
+            for match in results:
+                metadata = documents.get(match["id"])
+                if metadata is None:
+                    metadata = match.get("metadata") or {}
+                    if fields is not None:
+                        metadata = {key: metadata[key] for key in fields if key in metadata}
+                matches.append({"id": match["id"], "score": match["score"], "metadata": metadata})
+            hydrated.append(matches)
+        return hydrated
+
+    def _hydrate(self, results: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        return self._hydrate_many([results], fields)[0]
+
+    @staticmethod
+    def _format_matches(results) -> List[Dict[str, Any]]:
+        """Convert a Pinecone or local index query response into recommendation dicts."""
+        recommendations = []
+        for match in results["matches"]:
+            recommendations.append({
+                "id": match["id"],
+                "score": match["score"],
+                "metadata": match["metadata"]
+            })
+        return recommendations
+
+    def _batch_lookup(
+            self,
+            queries: List[str],
+            top_k: int,
+            filters: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]]
+    ) -> Tuple[List[Optional[List[Dict[str, Any]]]], List[Optional[Dict[str, Any]]], Dict[str, List[int]]]:
+        """
+        Serve what the exact-match cache can for a batch of queries.
+
+        Returns:
+            Tuple: Results by position (None for misses), the filter of each
+                query, and the positions of each missing cache key; repeated
+                queries share one key
+        """
+        if filters is None or isinstance(filters, dict):
+            filters = [filters] * len(queries)
+        elif len(filters) != len(queries):
+            raise ValueError("filters must be a single filter or one per query")
+
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(queries)
+        pending: Dict[str, List[int]] = {}
+        for position, (query, filter_criteria) in enumerate(zip(queries, filters)):
+            cache_key = self._generate_retrieval_key(query, top_k, filter_criteria)
+            cached = None if cache_key in pending else self.retrieval_cache.get(cache_key)
+            if cached is not None:
+                RETRIEVAL_CACHE_HITS.inc()
+                results[position] = cached
+            else:
+                pending.setdefault(cache_key, []).append(position)
+        RETRIEVAL_CACHE_MISSES.inc(len(pending))
+        return results, filters, pending
+
+    def _batch_semantic_lookup(
+            self,
+            results: List[Optional[List[Dict[str, Any]]]],
+            filters: List[Optional[Dict[str, Any]]],
+            pending: Dict[str, List[int]],
+            embeddings: list,
+            top_k: int
+    ) -> List[Tuple[str, List[int], Any, str]]:
+        """Fill semantic cache hits into ``results`` and return what still needs a vector query."""
+        to_query = []
+        for (cache_key, positions), embedding in zip(pending.items(), embeddings):
+            scope = self._retrieval_scope(top_k, filters[positions[0]])
+            cached = self._semantic_lookup(embedding, scope, cache_key)
+            if cached is not None:
+                for position in positions:
+                    results[position] = cached
+            else:
+                to_query.append((cache_key, positions, embedding, scope))
+        return to_query
+
+    def _batch_store(
+            self,
+            results: List[Optional[List[Dict[str, Any]]]],
+            to_query: List[Tuple[str, List[int], Any, str]],
+            responses: list
+    ) -> None:
+        for (cache_key, positions, embedding, scope), response in zip(to_query, responses):
+            recommendations = self._format_matches(response)
+            self._cache_results(embedding, scope, cache_key, recommendations)
+            for position in positions:
+                results[position] = recommendations
+
+    def get_retrivals_batch(
+            self,
+            queries: List[str],
+            top_k: int = 5,
+            filters: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]] = None,
+            max_concurrency: int = 8,
+            fields: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Get recommendations for several queries at once.
+
+        Cached queries are served from the retrieval cache, all remaining query
+        texts are embedded in one batched request, and the vector queries run
+        concurrently on a thread pool (Pinecone) or as one matrix product
+        (local index).
+
+        Args:
+            queries (List[str]): The query texts
+            top_k (int): Number of recommendations per query
+            filters (Dict[str, Any] or List[Dict[str, Any]], optional): One filter for
+                every query, or one per query
+            max_concurrency (int): Maximum number of Pinecone queries in flight
+            fields (List[str], optional): Metadata keys to return, ``content`` included;
+                every key if None
+
+        Returns:
+            List[List[Dict[str, Any]]]: Recommendations for each query, in input order
+        """
+        results, filters, pending = self._batch_lookup(queries, top_k, filters)
+        if not pending:
+            return self._hydrate_many(results, fields)
+
+        embeddings = self.embedding_cache.get_embeddings([queries[positions[0]] for positions in pending.values()])
+        to_query = self._batch_semantic_lookup(results, filters, pending, embeddings, top_k)
+
+        if to_query:
+            vectors = [self._to_list(embedding) for _, _, embedding, _ in to_query]
+            query_filters = [filters[positions[0]] for _, positions, _, _ in to_query]
+            if self.use_pinecone or self.namespace_key is not None:
+                with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(vectors)))) as executor:
+                    responses = list(executor.map(
+                        lambda args: self._query(args[0], top_k, args[1]), zip(vectors, query_filters)
+                    ))
+            else:
+                responses = self.index.query_many(vectors, top_k=top_k, filters=query_filters)
+            self._batch_store(results, to_query, responses)
+
+        self.retrieval_cache.maybe_flush()
+        return self._hydrate_many(results, fields)
+
+    async def _aopen(self) -> None:
+        """
+        Open the components still waiting for first use in a worker thread.
+
+        Loading a large embedding cache or local index takes seconds; done
+        inline, the first async call would stall every other coroutine on the loop.
+        """
+        if None in (self._embedding_cache, self._retrieval_cache, self._document_store, self._index):
+            await asyncio.to_thread(self.warm_up)
+
+    async def aclose(self) -> None:
+        """Close the backend's asyncio resources, if it was opened."""
+        if self._index is not None:
+            await self._index.aclose()
+
+    async def _aexisting_ids(
+            self,
+            ids: List[str],
+            namespaces: Optional[List[str]] = None,
+            max_concurrency: int = 8
+    ) -> Set[str]:
+        """Async version of ``_existing_ids``."""
+        if not self.use_pinecone:
+            return self._existing_ids(ids, namespaces)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(namespace: str, chunk: List[str]) -> List[str]:
+            async with semaphore:
+                with PINECONE_LATENCY.time(operation="fetch"):
+                    response = await acall_with_retry(
+                        lambda: self.index.afetch(chunk, namespace=namespace), label="Fetch request"
+                    )
+            return list(response["vectors"])
+
+        chunks = self._id_chunks(ids, namespaces, self.FETCH_BATCH_SIZE)
+        existing: Set[str] = set()
+        for found in await asyncio.gather(*(fetch(namespace, chunk) for namespace, chunk in chunks)):
+            existing.update(found)
+        return existing
+
+    async def abulk_add_items(
+            self,
+            contents: List[str],
+            metadatas: List[Dict[str, Any]],
+            item_types: List[str],
+            skip_existing: bool = True
+    ) -> List[str]:
+        """
+        Async version of ``bulk_add_items`` using the asyncio embedding and Pinecone clients.
+
+        Args:
+            contents (List[str]): List of text contents to embed
+            metadatas (List[Dict[str, Any]]): List of metadata dicts for each content
+            item_types (List[str]): List of item types
+            skip_existing (bool): Skip items whose ID is already indexed
+
+        Returns:
+            List[str]: List of IDs for the items, in input order
+        """
+        if not (len(contents) == len(metadatas) == len(item_types)):
+            raise ValueError("Contents, metadatas, and item_types must have the same length")
+
+        try:
+            await self._aopen()
+            ids = [self._generate_item_id(content, item_type) for content, item_type in zip(contents, item_types)]
+            namespaces = [
+                self._namespace_of({**metadata, "item_type": item_type})
+                for metadata, item_type in zip(metadatas, item_types)
+            ]
+            existing = await self._aexisting_ids(ids, namespaces) if skip_existing else set()
+            positions = self._unique_positions(ids, existing)
+            if len(positions) < len(ids):
+                logger.info(f"Skipping {len(ids) - len(positions)} of {len(ids)} items that are already indexed")
+            if not positions:
+                return ids
+
+            new_contents = [contents[p] for p in positions]
+            embeddings = await self.embedding_cache.aget_embeddings(new_contents)
+            # Stores the documents in SQLite, so keep it off the event loop
+            vectors = await asyncio.to_thread(
+                self._prepare_vectors,
+                [ids[p] for p in positions], new_contents, [metadatas[p] for p in positions],
+                [item_types[p] for p in positions], embeddings
             )
 
-            # Format results
-            recommendations = []
-            for match in results["matches"]:
-                recommendations.append({
-                    "id": match["id"],
-                    "score": match["score"],
-                    "metadata": match["metadata"]
-                })
+            new_namespaces = [namespaces[p] for p in positions]
+            if self.use_pinecone:
+                self.last_upsert_stats = await self.upserter.aupsert(
+                    vectors, new_namespaces if self.namespace_key is not None else None
+                )
+                if self.namespace_key is not None:
+                    self._remember_namespaces(new_namespaces)
+            else:
+                await asyncio.to_thread(self._upsert, vectors, new_namespaces)
+                await asyncio.to_thread(self.flush_index)
+
+            self.retrieval_cache.invalidate()
+            if self.retrieval_cache.flush_due():
+                await asyncio.to_thread(self.retrieval_cache.flush)
+
+            return ids
+
+        except Exception as e:
+            logger.error(f"Error in abulk_add_items: {e}")
+            raise
+
+    async def aget_retrivals(
+            self,
+            query: str,
+            top_k: int = 5,
+            filter_criteria: Optional[Dict[str, Any]] = None,
+            fields: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async version of ``get_retrivals``.
+
+        Cache lookups run inline, the embedding and Pinecone calls are awaited and
+        opening the engine's components on first use and flushing the retrieval
+        cache run in a worker thread, so many retrievals can share one event loop.
+
+        Args:
+            query (str): The query text
+            top_k (int): Number of recommendations to return
+            filter_criteria (Dict[str, Any], optional): Criteria to filter results
+            fields (List[str], optional): Metadata keys to return, ``content`` included;
+                every key if None
+
+        Returns:
+            List[Dict[str, Any]]: Recommended items with scores and metadata
+        """
+        await self._aopen()
+        cache_key = self._generate_retrieval_key(query, top_k, filter_criteria)
+
+        cached = self.retrieval_cache.get(cache_key)
+        if cached is not None:
+            RETRIEVAL_CACHE_HITS.inc()
+            logger.debug("Using cached retrieval results for: %.30s...", query)
+            return await asyncio.to_thread(self._hydrate, cached, fields)
+
+        RETRIEVAL_CACHE_MISSES.inc()
+        logger.debug("Performing new retrieval for: %.30s...", query)
+
+        query_embedding = await self.embedding_cache.aget_embedding(query)
+
+        scope = self._retrieval_scope(top_k, filter_criteria)
+        cached = self._semantic_lookup(query_embedding, scope, cache_key)
+        if cached is not None:
+            logger.debug("Using semantically cached retrieval results for: %.30s...", query)
+            return await asyncio.to_thread(self._hydrate, cached, fields)
+
+        if self.use_pinecone:
+            results = await self._aquery(self._to_list(query_embedding), top_k, filter_criteria)
         else:
-            # Implement a local fallback retrieval mechanism
-            # This is a placeholder - would need to be implemented with proper vector similarity
-            print("WARNING: Local retrieval not fully implemented, returning empty results")
-            recommendations = []
+            # Local scoring is CPU-bound and fast; run it inline
+            results = self._query(self._to_list(query_embedding), top_k, filter_criteria)
+        recommendations = self._format_matches(results)
 
-        # Cache the results
-        self.retrieval_cache[cache_key] = recommendations
-        self._save_retrieval_cache()
+        self._cache_results(query_embedding, scope, cache_key, recommendations)
+        if self.retrieval_cache.flush_due():
+            await asyncio.to_thread(self.retrieval_cache.flush)
 
-        return recommendations
+        return await asyncio.to_thread(self._hydrate, recommendations, fields)
+
+    async def aget_retrivals_batch(
+            self,
+            queries: List[str],
+            top_k: int = 5,
+            filters: Optional[Union[Dict[str, Any], List[Optional[Dict[str, Any]]]]] = None,
+            max_concurrency: int = 8,
+            fields: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Async version of ``get_retrivals_batch``; Pinecone queries are awaited
+        concurrently, at most ``max_concurrency`` at a time.
+        """
+        await self._aopen()
+        results, filters, pending = self._batch_lookup(queries, top_k, filters)
+        if not pending:
+            return await asyncio.to_thread(self._hydrate_many, results, fields)
+
+        embeddings = await self.embedding_cache.aget_embeddings(
+            [queries[positions[0]] for positions in pending.values()]
+        )
+        to_query = self._batch_semantic_lookup(results, filters, pending, embeddings, top_k)
+
+        if to_query:
+            vectors = [self._to_list(embedding) for _, _, embedding, _ in to_query]
+            query_filters = [filters[positions[0]] for _, positions, _, _ in to_query]
+            if self.use_pinecone:
+                semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+                async def query_one(vector, filter_criteria):
+                    async with semaphore:
+                        return await self._aquery(vector, top_k, filter_criteria)
+
+                responses = await asyncio.gather(*(
+                    query_one(vector, filter_criteria) for vector, filter_criteria in zip(vectors, query_filters)
+                ))
+            elif self.namespace_key is not None:
+                responses = [self._query(vector, top_k, filter_criteria)
+                             for vector, filter_criteria in zip(vectors, query_filters)]
+            else:
+                responses = self.index.query_many(vectors, top_k=top_k, filters=query_filters)
+            self._batch_store(results, to_query, responses)
+
+        if self.retrieval_cache.flush_due():
+            await asyncio.to_thread(self.retrieval_cache.flush)
+        return await asyncio.to_thread(self._hydrate_many, results, fields)
 
     def delete_item(self, item_id: str) -> None:
         """
@@ -296,18 +1118,94 @@ class RetrivalEngine:
         Args:
             item_id (str): ID of the item to delete
         """
+        self.delete_items([item_id])
+
+    def _delete_batch(self, ids: List[str], namespace: str = "") -> None:
+        with PINECONE_LATENCY.time(operation="delete"):
+            call_with_retry(lambda: self.index.delete(ids, namespace=namespace), label="Delete request")
+
+    def _namespaces_of_ids(self, ids: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Pair each ID with the namespace it was stored in, as recorded in the document store.
+
+        IDs without a stored document could be in any namespace and are paired
+        with every one.
+        """
+        if self.namespace_key is None:
+            return ids, [""] * len(ids)
+        documents = self.document_store.get_many(ids, fields=[self.namespace_key])
+        everywhere = self._namespaces()
+        paired_ids, namespaces = [], []
+        for item_id in ids:
+            document = documents.get(item_id)
+            for namespace in [self._namespace_of(document)] if document is not None else everywhere:
+                paired_ids.append(item_id)
+                namespaces.append(namespace)
+        return paired_ids, namespaces
+
+    def delete_items(self, ids: List[str], max_concurrency: int = 4) -> int:
+        """
+        Delete several items with batched index requests.
+
+        Only the cached retrievals that contained one of the items are dropped;
+        every other cached result stays valid.
+
+        Args:
+            ids (List[str]): IDs of the items to delete; unknown IDs are ignored
+            max_concurrency (int): Maximum number of Pinecone delete requests in flight
+
+        Returns:
+            int: Number of items deleted; with Pinecone, which does not report it,
+                the number of distinct IDs sent
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return 0
+
+        chunks = self._id_chunks(*self._namespaces_of_ids(ids), self.DELETE_BATCH_SIZE)
         if self.use_pinecone:
-            self.index.delete(ids=[item_id])
+            with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chunks)))) as executor:
+                list(executor.map(lambda args: self._delete_batch(args[1], args[0]), chunks))
+            deleted = len(ids)
         else:
-            # Local deletion logic would go here
-            print(f"Local deletion for {item_id} not implemented")
+            deleted = sum(self.index.delete(chunk, namespace=namespace) for namespace, chunk in chunks)
+            self.flush_index()
+
+        self.document_store.delete_many(ids)
 
-        # Clear retrieval cache since the index has been modified
-        self.retrieval_cache = {}
-        self._save_retrieval_cache()
+        # Only cached results that contained a deleted item can change
+        dropped = self.retrieval_cache.discard_ids(ids)
+        self.retrieval_cache.maybe_flush()
+        logger.info("Deleted %d items, dropped %d cached retrievals", deleted, dropped)
+        return deleted
+
+    def delete_by_filter(self, filter_criteria: Dict[str, Any], max_concurrency: int = 4) -> int:
+        """
+        Delete every item whose metadata matches a Pinecone-style filter.
+
+        Matching IDs are resolved from the document store, which holds the full
+        metadata of every item (and, for the local index, from the index itself),
+        then deleted with ``delete_items``. Pinecone serverless indexes cannot
+        delete by filter, and resolving the IDs first is what lets cached
+        retrievals be invalidated selectively.
+
+        Args:
+            filter_criteria (Dict[str, Any]): Metadata filter, e.g. ``{"source": "https://..."}``
+            max_concurrency (int): Maximum number of Pinecone delete requests in flight
+
+        Returns:
+            int: Number of items deleted
+        """
+        if not filter_criteria:
+            raise ValueError("delete_by_filter needs a non-empty filter")
+        ids = self.document_store.find_ids(filter_criteria)
+        if not self.use_pinecone:
+            ids = list(dict.fromkeys([*ids, *self.index.find_ids(filter_criteria)]))
+        return self.delete_items(ids, max_concurrency=max_concurrency)
 
     def clear_retrieval_cache(self) -> None:
         """Clear the retrieval results cache."""
-        self.retrieval_cache = {}
-        self._save_retrieval_cache()
-        print("Retrieval cache cleared.")
\ No newline at end of file
+        self.retrieval_cache.clear()
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+        logger.info("Retrieval cache cleared.")
\ No newline at end of file
@@ -0,0 +1,226 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+
+class _Abandoned(Exception):
+    """Set on a shared call whose leader was cancelled; waiters run it again."""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into a single execution.
+
+    The first caller for a key runs the work; callers that arrive while it is in
+    flight wait for and share its result (or exception). Nothing is cached once
+    the call completes. Threads and asyncio tasks share one registry, so a sync
+    caller and an async caller asking for the same key also coalesce.
+
+    Cancellation stays with the task it was aimed at: a cancelled waiter stops
+    waiting without affecting the call, and when the leader is cancelled one
+    of the waiters takes over and runs the work itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call for ``key`` is currently running."""
+        with self._lock:
+            return key in self._calls
+
+    def _claim(self, keys: List[Hashable]) -> Tuple[Dict[Hashable, Future], Dict[Hashable, Future]]:
+        """Register a call for every key nobody is computing; returns the owned and the awaited futures."""
+        owned: Dict[Hashable, Future] = {}
+        waiting: Dict[Hashable, Future] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._calls.get(key)
+                if future is None:
+                    future = Future()
+                    self._calls[key] = future
+                    owned[key] = future
+                else:
+                    waiting[key] = future
+        return owned, waiting
+
+    def _release(self, owned: Dict[Hashable, Future]) -> None:
+        # A waiter may already have taken over an abandoned key; leave its call alone
+        with self._lock:
+            for key, future in owned.items():
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def _abandon(self, owned: Dict[Hashable, Future]) -> None:
+        """Hand the keys of a cancelled leader back, so a waiter runs them instead."""
+        self._release(owned)
+        for future in owned.values():
+            if not future.done():
+                future.set_exception(_Abandoned())
+
+    @staticmethod
+    async def _wait(future: Future) -> Any:
+        # Shielded, so cancelling one waiter does not cancel the shared call
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run ``fn`` for ``key`` unless a call for it is already in flight.
+
+        Args:
+            key (Hashable): Deduplication key
+            fn (Callable[[], Any]): Work to run if this caller is the leader
+
+        Returns:
+            Any: The result of the single execution for ``key``
+        """
+        while True:
+            owned, waiting = self._claim([key])
+            if owned:
+                break
+            try:
+                return waiting[key].result()
+            except _Abandoned:
+                continue
+
+        future = owned[key]
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._release(owned)
+
+    def do_many(
+        self,
+        keys: List[Hashable],
+        fn: Callable[[List[Hashable]], Dict[Hashable, Any]],
+    ) -> Dict[Hashable, Any]:
+        """
+        Batch version of ``do``.
+
+        Keys nobody else is computing are claimed and computed with a single call
+        to ``fn``; keys already in flight are awaited. Duplicate keys are
+        collapsed.
+
+        Args:
+            keys (List[Hashable]): Keys to compute
+            fn (Callable[[List[Hashable]], Dict[Hashable, Any]]): Computes the
+                claimed keys and returns their results keyed by key
+
+        Returns:
+            Dict[Hashable, Any]: Results for every unique key
+        """
+        owned, waiting = self._claim(keys)
+
+        results: Dict[Hashable, Any] = {}
+        if owned:
+            try:
+                computed = fn(list(owned))
+                for key, future in owned.items():
+                    future.set_result(computed[key])
+                    results[key] = computed[key]
+            except BaseException as e:
+                for future in owned.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                self._release(owned)
+
+        abandoned = []
+        for key, future in waiting.items():
+            try:
+                results[key] = future.result()
+            except _Abandoned:
+                abandoned.append(key)
+        if abandoned:
+            results.update(self.do_many(abandoned, fn))
+        return results
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async version of ``do``; waiting never blocks the event loop.
+
+        Args:
+            key (Hashable): Deduplication key
+            fn (Callable[[], Awaitable[Any]]): Coroutine factory run if this caller is the leader
+
+        Returns:
+            Any: The result of the single execution for ``key``
+        """
+        while True:
+            owned, waiting = self._claim([key])
+            if owned:
+                break
+            try:
+                return await self._wait(waiting[key])
+            except _Abandoned:
+                continue
+
+        future = owned[key]
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._abandon(owned)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._release(owned)
+
+    async def ado_many(
+        self,
+        keys: List[Hashable],
+        fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+    ) -> Dict[Hashable, Any]:
+        """
+        Async version of ``do_many``.
+
+        Args:
+            keys (List[Hashable]): Keys to compute
+            fn (Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]): Computes
+                the claimed keys and returns their results keyed by key
+
+        Returns:
+            Dict[Hashable, Any]: Results for every unique key
+        """
+        owned, waiting = self._claim(keys)
+
+        results: Dict[Hashable, Any] = {}
+        if owned:
+            try:
+                computed = await fn(list(owned))
+                for key, future in owned.items():
+                    future.set_result(computed[key])
+                    results[key] = computed[key]
+            except asyncio.CancelledError:
+                self._abandon(owned)
+                raise
+            except BaseException as e:
+                for future in owned.values():
+                    if not future.done():
+                        future.set_exception(e)
+                raise
+            finally:
+                self._release(owned)
+
+        abandoned = []
+        for key, future in waiting.items():
+            try:
+                results[key] = await self._wait(future)
+            except _Abandoned:
+                abandoned.append(key)
+        if abandoned:
+            results.update(await self.ado_many(abandoned, fn))
+        return results
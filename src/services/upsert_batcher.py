@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.services.embedding_batcher import acall_with_retry, call_with_retry
+from src.services.metrics import UPSERT_PAYLOAD_BYTES, VECTORS_UPSERTED
+
+logger = logging.getLogger(__name__)
+
+
+# Pinecone rejects upsert requests over 2MB or 1000 vectors; leave headroom
+DEFAULT_MAX_PAYLOAD_BYTES = 2 * 1024 * 1024 - 64 * 1024
+DEFAULT_MAX_VECTORS = 1000
+
+# A float32 value serialises to about 20 JSON characters including the separator
+BYTES_PER_VALUE = 20
+
+
+def estimate_payload_size(vector: Dict[str, Any]) -> int:
+    """
+    Estimate the serialised size of one upsert record in bytes.
+
+    Values are estimated from their count rather than serialised, which would
+    cost more than the upsert itself for high-dimensional vectors; metadata is
+    serialised since its size varies the most.
+    """
+    metadata = vector.get("metadata")
+    metadata_size = len(json.dumps(metadata, default=str).encode("utf-8")) if metadata else 0
+    return len(vector["values"]) * BYTES_PER_VALUE + metadata_size + len(str(vector["id"])) + 64
+
+
+def pack_upserts(
+    vectors: List[Dict[str, Any]],
+    max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES,
+    max_vectors: int = DEFAULT_MAX_VECTORS,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Greedily pack upsert records into batches under a payload size and count limit.
+
+    A single record larger than ``max_payload_bytes`` is sent on its own and
+    left for the server to accept or reject.
+
+    Args:
+        vectors (List[Dict[str, Any]]): Records with ``id``, ``values`` and optional ``metadata``
+        max_payload_bytes (int): Estimated request size budget per batch
+        max_vectors (int): Maximum number of records per batch
+
+    Returns:
+        List[List[Dict[str, Any]]]: Batches in input order
+    """
+    batches: List[List[Dict[str, Any]]] = []
+    batch: List[Dict[str, Any]] = []
+    batch_bytes = 0
+
+    for vector in vectors:
+        size = estimate_payload_size(vector)
+        if batch and (batch_bytes + size > max_payload_bytes or len(batch) >= max_vectors):
+            batches.append(batch)
+            batch = []
+            batch_bytes = 0
+        batch.append(vector)
+        batch_bytes += size
+
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class ParallelUpserter:
+    """
+    Upsert records as size-bounded batches sent with bounded concurrency.
+
+    Each batch is retried on its own on rate limits and transient errors, and
+    its throughput is logged so batch size and concurrency can be tuned.
+
+    When records belong to different namespaces, each namespace is packed
+    separately and its batches are sent with a ``namespace`` keyword argument,
+    all through the same pool.
+    """
+
+    def __init__(
+        self,
+        upsert: Callable[[List[Dict[str, Any]]], Any],
+        aupsert: Optional[Callable[[List[Dict[str, Any]]], Awaitable[Any]]] = None,
+        max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES,
+        max_vectors: int = DEFAULT_MAX_VECTORS,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+    ):
+        """
+        Initialize the upserter.
+
+        Args:
+            upsert (Callable[[List[Dict[str, Any]]], Any]): Sends one batch to the index
+            aupsert (Callable[[List[Dict[str, Any]]], Awaitable[Any]], optional): Async
+                version of ``upsert``, used by ``aupsert``
+            max_payload_bytes (int): Estimated request size budget per batch
+            max_vectors (int): Maximum number of records per batch
+            max_concurrency (int): Maximum number of batches in flight
+            max_retries (int): Retries per batch on rate limits and transient errors
+        """
+        self.upsert_batch = upsert
+        self.aupsert_batch = aupsert
+        self.max_payload_bytes = max_payload_bytes
+        self.max_vectors = max_vectors
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+    def _pack(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespaces: Optional[List[str]] = None,
+    ) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        # (keyword arguments of the batch call, batch)
+        if namespaces is None:
+            return [({}, batch) for batch in pack_upserts(vectors, self.max_payload_bytes, self.max_vectors)]
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for vector, namespace in zip(vectors, namespaces):
+            groups.setdefault(namespace, []).append(vector)
+        return [
+            ({"namespace": namespace}, batch)
+            for namespace, group in groups.items()
+            for batch in pack_upserts(group, self.max_payload_bytes, self.max_vectors)
+        ]
+
+    def _record(self, number: int, total: int, batch: List[Dict[str, Any]], seconds: float) -> Dict[str, float]:
+        size = sum(estimate_payload_size(vector) for vector in batch)
+        VECTORS_UPSERTED.inc(len(batch))
+        UPSERT_PAYLOAD_BYTES.inc(size)
+        rate = len(batch) / seconds if seconds > 0 else float("inf")
+        logger.log(
+            logging.INFO if total > 1 else logging.DEBUG,
+            "Upserted batch %d/%d: %d vectors, %.0f KB in %.2fs (%.0f vectors/s)",
+            number, total, len(batch), size / 1024, seconds, rate,
+        )
+        return {"vectors": len(batch), "bytes": size, "seconds": seconds}
+
+    @staticmethod
+    def _summary(batches: List[Dict[str, float]], elapsed: float) -> Dict[str, float]:
+        vectors = sum(batch["vectors"] for batch in batches)
+        size = sum(batch["bytes"] for batch in batches)
+        summary = {
+            "batches": len(batches),
+            "vectors": vectors,
+            "bytes": size,
+            "seconds": elapsed,
+            "vectors_per_second": vectors / elapsed if elapsed > 0 else 0.0,
+        }
+        if len(batches) > 1:
+            logger.info(
+                "Upserted %d vectors in %d batches, %.0f KB in %.2fs (%.0f vectors/s)",
+                vectors, len(batches), size / 1024, elapsed, summary["vectors_per_second"],
+            )
+        return summary
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespaces: Optional[List[str]] = None) -> Dict[str, float]:
+        """
+        Upsert ``vectors`` in parallel batches.
+
+        Args:
+            vectors (List[Dict[str, Any]]): Records with ``id``, ``values`` and optional ``metadata``
+            namespaces (List[str], optional): Namespace of each record; the batch callable
+                is not given a namespace if None
+
+        Returns:
+            Dict[str, float]: Totals for the call: ``batches``, ``vectors``, ``bytes``,
+                ``seconds`` and ``vectors_per_second``
+        """
+        start = time.perf_counter()
+        batches = self._pack(vectors, namespaces)
+
+        def send(number: int, kwargs: Dict[str, Any], batch: List[Dict[str, Any]]) -> Dict[str, float]:
+            batch_start = time.perf_counter()
+            call_with_retry(
+                lambda: self.upsert_batch(batch, **kwargs), max_retries=self.max_retries, label="Upsert request"
+            )
+            return self._record(number, len(batches), batch, time.perf_counter() - batch_start)
+
+        if len(batches) <= 1 or self.max_concurrency <= 1:
+            reports = [send(number, kwargs, batch) for number, (kwargs, batch) in enumerate(batches, 1)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                futures = [
+                    executor.submit(send, number, kwargs, batch) for number, (kwargs, batch) in enumerate(batches, 1)
+                ]
+                reports = [future.result() for future in as_completed(futures)]
+        return self._summary(reports, time.perf_counter() - start)
+
+    async def aupsert(self, vectors: List[Dict[str, Any]], namespaces: Optional[List[str]] = None) -> Dict[str, float]:
+        """Async version of ``upsert``, with at most ``max_concurrency`` batches awaiting at once."""
+        start = time.perf_counter()
+        batches = self._pack(vectors, namespaces)
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def send(number: int, kwargs: Dict[str, Any], batch: List[Dict[str, Any]]) -> Dict[str, float]:
+            async with semaphore:
+                batch_start = time.perf_counter()
+                await acall_with_retry(
+                    lambda: self.aupsert_batch(batch, **kwargs), max_retries=self.max_retries, label="Upsert request"
+                )
+                return self._record(number, len(batches), batch, time.perf_counter() - batch_start)
+
+        reports = await asyncio.gather(*(
+            send(number, kwargs, batch) for number, (kwargs, batch) in enumerate(batches, 1)
+        ))
+        return self._summary(list(reports), time.perf_counter() - start)
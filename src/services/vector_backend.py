@@ -0,0 +1,347 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.config.pinecone_config import (
+    DEFAULT_DIMENSION,
+    DEFAULT_INDEX_NAME,
+    get_pinecone_client,
+    get_pinecone_index,
+    get_pinecone_index_host,
+)
+from src.services.local_vector_store import NamespacedLocalIndex
+
+logger = logging.getLogger(__name__)
+
+
+class VectorBackend:
+    """
+    Pinecone-style data-plane interface the retrieval services talk to.
+
+    Every method takes a ``namespace``, with ``""`` meaning the default one,
+    and returns plain dicts shaped like Pinecone's responses:
+
+    - ``query``: ``{"matches": [{"id", "score", "metadata"[, "values"]}]}``
+    - ``fetch``: ``{"vectors": {id: {"id", "values", "metadata"}}}``
+    - ``describe_index_stats``: ``{"namespaces": {name: {"vector_count"}},
+      "dimension", "total_vector_count"}``
+
+    ``remote`` tells callers whether requests cross the network, in which case
+    they are batched, retried and sent concurrently. The async methods run the
+    sync ones in a worker thread unless a backend has a native async client.
+    """
+
+    remote = False
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> Dict[str, int]:
+        """Insert or overwrite ``{"id", "values", "metadata"}`` records."""
+        raise NotImplementedError
+
+    def query(
+            self,
+            vector: List[float],
+            top_k: int = 5,
+            filter: Optional[Dict[str, Any]] = None,
+            namespace: str = "",
+            include_metadata: bool = True,
+            include_values: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Return the ``top_k`` best matches of ``vector``, best first."""
+        raise NotImplementedError
+
+    def query_many(
+            self,
+            vectors: List[List[float]],
+            top_k: int = 5,
+            filters: Optional[List[Optional[Dict[str, Any]]]] = None,
+            namespace: str = "",
+            include_metadata: bool = True,
+            include_values: bool = False
+    ) -> List[Dict[str, List[Dict[str, Any]]]]:
+        """Run several queries; one request per query unless a backend can batch them."""
+        return [
+            self.query(vector, top_k=top_k, filter=filter, namespace=namespace,
+                       include_metadata=include_metadata, include_values=include_values)
+            for vector, filter in zip(vectors, filters or [None] * len(vectors))
+        ]
+
+    def fetch(self, ids: Iterable[str], namespace: str = "") -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Return the stored records of ``ids``; unknown ids are left out."""
+        raise NotImplementedError
+
+    def delete(
+            self,
+            ids: Optional[Iterable[str]] = None,
+            namespace: str = "",
+            filter: Optional[Dict[str, Any]] = None,
+            delete_all: bool = False
+    ) -> int:
+        """
+        Delete records by id, by metadata filter or all of them.
+
+        Returns:
+            int: Number of records deleted, or of ids sent if the backend does not report it
+        """
+        raise NotImplementedError
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        """Vector counts per namespace and in total, and the dimension."""
+        raise NotImplementedError
+
+    def namespaces(self) -> List[str]:
+        """Names of the namespaces holding at least one vector."""
+        return list(self.describe_index_stats()["namespaces"])
+
+    def contains(self, item_id: str, namespace: Optional[str] = "") -> bool:
+        """Whether ``item_id`` is stored in ``namespace``."""
+        return item_id in self.fetch([item_id], namespace=namespace or "")["vectors"]
+
+    def find_ids(self, filter: Dict[str, Any], namespace: Optional[str] = None) -> List[str]:
+        """Ids matching a metadata filter; backends that cannot list by filter return none."""
+        return []
+
+    def flush(self) -> None:
+        """Persist buffered writes; nothing to do for backends that write through."""
+
+    async def aupsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> Dict[str, int]:
+        return await asyncio.to_thread(self.upsert, vectors, namespace)
+
+    async def aquery(self, vector: List[float], **kwargs) -> Dict[str, List[Dict[str, Any]]]:
+        return await asyncio.to_thread(lambda: self.query(vector, **kwargs))
+
+    async def afetch(self, ids: Iterable[str], namespace: str = "") -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return await asyncio.to_thread(self.fetch, ids, namespace)
+
+    async def adelete(self, ids: Optional[Iterable[str]] = None, **kwargs) -> int:
+        return await asyncio.to_thread(lambda: self.delete(ids, **kwargs))
+
+    async def aclose(self) -> None:
+        """Release async resources; nothing to do unless a backend holds a session."""
+
+
+class LocalBackend(NamespacedLocalIndex, VectorBackend):
+    """
+    In-process backend over ``NamespacedLocalIndex``, persisted under ``path``.
+
+    Queries are plain NumPy, so ``query_many`` scores unfiltered flat queries
+    with one matrix product.
+    """
+
+    def delete(
+            self,
+            ids: Optional[Iterable[str]] = None,
+            namespace: str = "",
+            filter: Optional[Dict[str, Any]] = None,
+            delete_all: bool = False
+    ) -> int:
+        index = self.namespace(namespace, create=False)
+        if index is None:
+            return 0
+        if delete_all:
+            deleted = len(index)
+            index.clear()
+            return deleted
+        if filter is not None:
+            ids = [*(ids or []), *index.find_ids(filter)]
+        return index.delete(ids or [])
+
+
+def _namespace_arg(namespace: str) -> Dict[str, str]:
+    # The default namespace is addressed by leaving the argument out
+    return {"namespace": namespace} if namespace else {}
+
+
+def _as_dict(response) -> Dict[str, Any]:
+    return response if isinstance(response, dict) else response.to_dict()
+
+
+class PineconeBackend(VectorBackend):
+    """
+    Backend on a Pinecone index, or on anything that speaks its data-plane API.
+
+    By default the pooled handle of ``index_name`` is used. With ``host`` (or
+    ``PINECONE_INDEX_HOST``) the client connects to that data-plane URL
+    directly, e.g. ``http://localhost:5081`` for the stand-in server in
+    ``src.utils.pinecone_standin``, so retrieval can be load-tested offline
+    through the real client.
+    """
+
+    remote = True
+
+    def __init__(
+            self,
+            index_name: str = DEFAULT_INDEX_NAME,
+            host: Optional[str] = None,
+            api_key: Optional[str] = None,
+            dimension: Optional[int] = DEFAULT_DIMENSION
+    ):
+        """
+        Open the index.
+
+        Args:
+            index_name (str): Pinecone index to use when no host is given
+            host (str, optional): Data-plane URL to connect to instead of looking the index up
+            api_key (str, optional): API key, ``PINECONE_API_KEY`` if None
+            dimension (int, optional): Dimension to create ``index_name`` with if it does not
+                exist; an existing index of another dimension is rejected
+        """
+        self.index_name = index_name
+        self.dimension = dimension
+        self.host = host or os.getenv("PINECONE_INDEX_HOST")
+        self.api_key = api_key
+        if self.host:
+            logger.info("Using the Pinecone data-plane API at %s", self.host)
+            self.index = get_pinecone_client(api_key).Index(host=self.host)
+        else:
+            self.index = get_pinecone_index(index_name, dimension)
+
+        # asyncio index handle, created on first async call
+        self._async_index = None
+        self._async_index_loop = None
+
+    @staticmethod
+    def _matches(response, include_values: bool) -> Dict[str, List[Dict[str, Any]]]:
+        matches = []
+        for match in _as_dict(response).get("matches") or []:
+            result = {"id": match["id"], "score": match["score"], "metadata": match.get("metadata") or {}}
+            if include_values:
+                result["values"] = match.get("values") or []
+            matches.append(result)
+        return {"matches": matches}
+
+    @staticmethod
+    def _vectors(response) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        vectors = response["vectors"] if isinstance(response, dict) else response.vectors
+        return {
+            "vectors": {
+                item_id: {"id": item_id, "values": list(vector["values"]), "metadata": vector["metadata"] or {}}
+                for item_id, vector in vectors.items()
+            }
+        }
+
+    @staticmethod
+    def _stats(response) -> Dict[str, Any]:
+        stats = _as_dict(response)
+        # Newer Pinecone versions report the default namespace as "__default__"
+        namespaces = {
+            "" if name == "__default__" else name: {"vector_count": entry.get("vector_count", 0)}
+            for name, entry in (stats.get("namespaces") or {}).items()
+        }
+        return {
+            "namespaces": namespaces,
+            "dimension": stats.get("dimension"),
+            "total_vector_count": stats.get("total_vector_count", 0),
+        }
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> Dict[str, int]:
+        self.index.upsert(vectors=vectors, **_namespace_arg(namespace))
+        return {"upserted_count": len(vectors)}
+
+    def query(
+            self,
+            vector: List[float],
+            top_k: int = 5,
+            filter: Optional[Dict[str, Any]] = None,
+            namespace: str = "",
+            include_metadata: bool = True,
+            include_values: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        response = self.index.query(
+            vector=vector, top_k=top_k, filter=filter, include_metadata=include_metadata,
+            include_values=include_values, **_namespace_arg(namespace)
+        )
+        return self._matches(response, include_values)
+
+    def fetch(self, ids: Iterable[str], namespace: str = "") -> Dict[str, Dict[str, Dict[str, Any]]]:
+        return self._vectors(self.index.fetch(ids=list(ids), **_namespace_arg(namespace)))
+
+    def delete(
+            self,
+            ids: Optional[Iterable[str]] = None,
+            namespace: str = "",
+            filter: Optional[Dict[str, Any]] = None,
+            delete_all: bool = False
+    ) -> int:
+        ids = None if ids is None else list(ids)
+        self.index.delete(ids=ids, filter=filter, delete_all=delete_all or None, **_namespace_arg(namespace))
+        return len(ids or [])
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        return self._stats(self.index.describe_index_stats())
+
+    async def _get_async_index(self):
+        """
+        Return an asyncio index handle bound to the running event loop.
+
+        The handle owns an aiohttp session, so one is created per event loop; the
+        index host is resolved once and reused.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_index is None or self._async_index_loop is not loop:
+            host = self.host or await asyncio.to_thread(get_pinecone_index_host, self.index_name, self.dimension)
+            self._async_index = get_pinecone_client(self.api_key).IndexAsyncio(host=host)
+            self._async_index_loop = loop
+        return self._async_index
+
+    async def aupsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> Dict[str, int]:
+        index = await self._get_async_index()
+        await index.upsert(vectors=vectors, show_progress=False, **_namespace_arg(namespace))
+        return {"upserted_count": len(vectors)}
+
+    async def aquery(
+            self,
+            vector: List[float],
+            top_k: int = 5,
+            filter: Optional[Dict[str, Any]] = None,
+            namespace: str = "",
+            include_metadata: bool = True,
+            include_values: bool = False
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        index = await self._get_async_index()
+        response = await index.query(
+            vector=vector, top_k=top_k, filter=filter, include_metadata=include_metadata,
+            include_values=include_values, **_namespace_arg(namespace)
+        )
+        return self._matches(response, include_values)
+
+    async def afetch(self, ids: Iterable[str], namespace: str = "") -> Dict[str, Dict[str, Dict[str, Any]]]:
+        index = await self._get_async_index()
+        return self._vectors(await index.fetch(ids=list(ids), **_namespace_arg(namespace)))
+
+    async def adelete(
+            self,
+            ids: Optional[Iterable[str]] = None,
+            namespace: str = "",
+            filter: Optional[Dict[str, Any]] = None,
+            delete_all: bool = False
+    ) -> int:
+        index = await self._get_async_index()
+        ids = None if ids is None else list(ids)
+        await index.delete(ids=ids, filter=filter, delete_all=delete_all or None, **_namespace_arg(namespace))
+        return len(ids or [])
+
+    async def aclose(self) -> None:
+        """Close the asyncio index handle, if one was opened."""
+        if self._async_index is not None:
+            await self._async_index.close()
+            self._async_index = None
+            self._async_index_loop = None
+
+
+def open_backend(kind: str, **options) -> VectorBackend:
+    """
+    Create a backend by name.
+
+    Args:
+        kind (str): "pinecone" or "local"
+        **options: Constructor arguments of the backend
+
+    Returns:
+        VectorBackend: The opened backend
+    """
+    if kind == "pinecone":
+        return PineconeBackend(**options)
+    if kind == "local":
+        return LocalBackend(**options)
+    raise ValueError(f"Unknown vector backend: {kind!r}; expected 'pinecone' or 'local'")
@@ -1,12 +1,35 @@
 import hashlib
-import json
-from typing import List, Dict, Any, Optional, Union
-from src.config.pinecone_config import get_pinecone_index
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set, Tuple
+from src.services.document_store import DocumentStore, filterable_metadata
+from src.services.embedding_batcher import call_with_retry
+from src.services.upsert_batcher import ParallelUpserter
+from src.services.vector_backend import PineconeBackend, VectorBackend
 
 class PineconeVectorStore:
-    def __init__(self):
-        """Initialize Pinecone vector store"""
-        self.index = get_pinecone_index()
+    # IDs per fetch request; Pinecone fetch takes IDs in the query string
+    FETCH_BATCH_SIZE = 100
+    # IDs per delete request
+    DELETE_BATCH_SIZE = 1000
+
+    def __init__(self, document_store: Optional[DocumentStore] = None, backend: Optional[VectorBackend] = None):
+        """
+        Initialize Pinecone vector store
+
+        Args:
+            document_store: Store for content and full metadata; Pinecone only gets
+                the filterable fields. Defaults to its own file under ./embedding_cache,
+                apart from the engine's, whose deletes and migrations go by every row
+            backend: Vector backend to use instead of the default Pinecone index, e.g. a
+                ``LocalBackend`` or a ``PineconeBackend`` pointed at the local stand-in server
+        """
+        self.index = backend if backend is not None else PineconeBackend()
+        if document_store is None:
+            os.makedirs("./embedding_cache", exist_ok=True)
+            document_store = DocumentStore("./embedding_cache/vector_store_documents.sqlite3")
+        self.document_store = document_store
     
     def _generate_id(self, content: str, namespace: Optional[str] = None) -> str:
         """Generate a deterministic ID based on content"""
@@ -15,6 +38,12 @@ class PineconeVectorStore:
             return f"{namespace}_{content_hash}"
         return content_hash
     
+    @staticmethod
+    def _in_namespace(vector_id: str, namespace: Optional[str] = None) -> bool:
+        """Whether ``vector_id`` was generated for ``namespace`` by ``_generate_id``"""
+        prefix = f"{namespace}_" if namespace else ""
+        return vector_id.startswith(prefix) and re.fullmatch(r"[0-9a-f]{32}", vector_id[len(prefix):]) is not None
+    
     def store_embedding(
         self, 
         content: str, 
@@ -34,38 +63,136 @@ class PineconeVectorStore:
         Returns:
             vector_id: ID of the stored vector
         """
-        vector_id = self._generate_id(content, namespace)
+        return self.store_embeddings([content], [embedding], [metadata], namespace)[0]
+    
+    def store_embeddings(
+        self,
+        contents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        namespace: str = "default",
+        max_concurrency: int = 4
+    ) -> List[str]:
+        """
+        Store several embeddings with batched, concurrent upserts
         
-        # Add content to metadata for future reference
-        metadata["content"] = content
+        Batches are sized to Pinecone's request limits by ``ParallelUpserter`` and
+        each is retried on its own on rate limits and transient errors.
         
-        # Upsert the vector into Pinecone
-        self.index.upsert(
-            vectors=[(vector_id, embedding, metadata)],
-            namespace=namespace
-        )
+        Args:
+            contents: The original contents
+            embeddings: One vector embedding per content
+            metadatas: One metadata dict per content
+            namespace: Optional namespace for organizing embeddings
+            max_concurrency: Maximum number of upsert requests in flight
+            
+        Returns:
+            vector_ids: IDs of the stored vectors, in input order
+        """
+        if not (len(contents) == len(embeddings) == len(metadatas)):
+            raise ValueError("Contents, embeddings, and metadatas must have the same length")
+        vector_ids = [self._generate_id(content, namespace) for content in contents]
         
-        return vector_id
+        # Keep content and full metadata locally; Pinecone only needs filterable fields
+        self.document_store.put_many(list(zip(vector_ids, contents, metadatas)))
+        
+        vectors = [
+            {
+                "id": vector_id,
+                "values": embedding.tolist() if hasattr(embedding, "tolist") else embedding,
+                "metadata": filterable_metadata(metadata)
+            }
+            for vector_id, embedding, metadata in zip(vector_ids, embeddings, metadatas)
+        ]
+        if self.index.remote:
+            ParallelUpserter(
+                lambda batch: self.index.upsert(batch, namespace=namespace),
+                max_concurrency=max_concurrency
+            ).upsert(vectors)
+        elif vectors:
+            self.index.upsert(vectors, namespace=namespace)
+        
+        return vector_ids
     
     def get_embedding_by_id(self, vector_id: str, namespace: str = "default") -> Optional[Dict[str, Any]]:
         """Retrieve a specific embedding by ID"""
-        result = self.index.fetch(ids=[vector_id], namespace=namespace)
+        found, _ = self.get_embeddings_by_ids([vector_id], namespace)
+        return found.get(vector_id)
+    
+    def _fetch_batch(self, ids: List[str], namespace: str) -> Dict[str, Dict[str, Any]]:
+        return call_with_retry(lambda: self.index.fetch(ids, namespace=namespace), label="Fetch request")['vectors']
+    
+    def get_embeddings_by_ids(
+        self,
+        vector_ids: List[str],
+        namespace: str = "default",
+        max_concurrency: int = 8
+    ) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        Retrieve several embeddings with batched, concurrent fetches
         
-        if not result.get('vectors', {}):
-            return None
+        Args:
+            vector_ids: IDs to look up; duplicates are fetched once
+            namespace: Namespace to look in
+            max_concurrency: Maximum number of fetch requests in flight
             
-        vector_data = result['vectors'][vector_id]
-        return {
-            "id": vector_id,
-            "embedding": vector_data.values,
-            "metadata": vector_data.metadata
+        Returns:
+            (found, missing): ``{id: {"id", "embedding", "metadata"}}`` for the stored IDs,
+                and the set of IDs that are not stored
+        """
+        unique_ids = list(dict.fromkeys(vector_ids))
+        chunks = [unique_ids[i:i + self.FETCH_BATCH_SIZE] for i in range(0, len(unique_ids), self.FETCH_BATCH_SIZE)]
+        
+        vectors: Dict[str, Dict[str, Any]] = {}
+        if len(chunks) > 1 and self.index.remote:
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as executor:
+                for fetched in executor.map(lambda chunk: self._fetch_batch(chunk, namespace), chunks):
+                    vectors.update(fetched)
+        else:
+            for chunk in chunks:
+                vectors.update(self._fetch_batch(chunk, namespace))
+        
+        documents = self.document_store.get_many(list(vectors)) if vectors else {}
+        found = {
+            vector_id: {
+                "id": vector_id,
+                "embedding": vector_data['values'],
+                "metadata": documents.get(vector_id, vector_data['metadata'])
+            }
+            for vector_id, vector_data in vectors.items()
         }
+        return found, set(unique_ids) - found.keys()
     
     def get_embedding_by_content(self, content: str, namespace: str = "default") -> Optional[Dict[str, Any]]:
         """Check if content already has an embedding and retrieve it"""
         vector_id = self._generate_id(content, namespace)
         return self.get_embedding_by_id(vector_id, namespace)
     
+    def get_embeddings_by_contents(
+        self,
+        contents: List[str],
+        namespace: str = "default",
+        max_concurrency: int = 8
+    ) -> Tuple[Dict[str, Dict[str, Any]], Set[str]]:
+        """
+        Check which contents already have embeddings, with batched, concurrent fetches
+        
+        Args:
+            contents: Contents to look up
+            namespace: Namespace to look in
+            max_concurrency: Maximum number of fetch requests in flight
+            
+        Returns:
+            (found, missing): The stored embeddings keyed by content, and the set of
+                contents without one, i.e. the ones still to embed
+        """
+        ids_by_content = {content: self._generate_id(content, namespace) for content in contents}
+        found, missing_ids = self.get_embeddings_by_ids(list(ids_by_content.values()), namespace, max_concurrency)
+        return (
+            {content: found[vector_id] for content, vector_id in ids_by_content.items() if vector_id in found},
+            {content for content, vector_id in ids_by_content.items() if vector_id in missing_ids}
+        )
+    
     def find_similar(
         self, 
         embedding: List[float], 
@@ -88,39 +215,56 @@ class PineconeVectorStore:
             List of similar vectors with metadata and similarity scores
         """
         query_result = self.index.query(
-            vector=embedding,
+            embedding,
             namespace=namespace,
             top_k=top_k,
             include_metadata=include_metadata,
             filter=filter
         )
         
+        documents = (
+            self.document_store.get_many([match['id'] for match in query_result['matches']])
+            if include_metadata else {}
+        )
         results = []
-        for match in query_result.matches:
+        for match in query_result['matches']:
             result = {
-                "id": match.id,
-                "score": match.score,
+                "id": match['id'],
+                "score": match['score'],
             }
-            if include_metadata and match.metadata:
-                result["metadata"] = match.metadata
+            metadata = documents.get(match['id'], match.get('metadata'))
+            if include_metadata and metadata:
+                result["metadata"] = metadata
             results.append(result)
             
         return results
     
     def delete_embedding(self, vector_id: str, namespace: str = "default") -> bool:
         """Delete an embedding by ID"""
-        self.index.delete(ids=[vector_id], namespace=namespace)
+        self.index.delete([vector_id], namespace=namespace)
+        self.document_store.delete_many([vector_id])
         return True
         
     def delete_embeddings_by_filter(self, filter: Dict[str, Any], namespace: str = "default") -> bool:
-        """Delete embeddings matching a metadata filter"""
-        self.index.delete(filter=filter, namespace=namespace)
+        """
+        Delete embeddings in ``namespace`` matching a metadata filter, and their stored documents
+        
+        The document store holds the full metadata, so it resolves the filter to IDs,
+        which are deleted in batches; Pinecone serverless indexes cannot delete by filter.
+        The store is shared by every namespace, so only the IDs generated for this
+        namespace are deleted.
+        """
+        ids = [vector_id for vector_id in self.document_store.find_ids(filter) if self._in_namespace(vector_id, namespace)]
+        for i in range(0, len(ids), self.DELETE_BATCH_SIZE):
+            chunk = ids[i:i + self.DELETE_BATCH_SIZE]
+            call_with_retry(lambda: self.index.delete(chunk, namespace=namespace), label="Delete request")
+        self.document_store.delete_many(ids)
         return True
         
     def get_total_vector_count(self, namespace: str = "default") -> int:
         """Get the total number of vectors in the index"""
         stats = self.index.describe_index_stats()
-        namespaces = stats.get('namespaces', {})
+        namespaces = stats['namespaces']
         if namespace in namespaces:
             return namespaces[namespace].get('vector_count', 0)
         return 0
@@ -0,0 +1,189 @@
+"""
+Recall@k and latency of the IVF local index against exact search.
+
+Usage:
+    python -m src.utils.ann_recall_report --index-dir ./embedding_cache/local_index
+    python -m src.utils.ann_recall_report --count 200000 --dimension 1536 --nprobe 1 4 8 16 32
+    python -m src.utils.ann_recall_report --quantization none int8 pq --rescore 0 4 10
+
+With ``--index-dir`` the vectors of a saved ``LocalVectorIndex`` are used and
+queries are drawn from them with a little noise added; otherwise a synthetic
+clustered corpus is generated.
+
+With ``--quantization`` the flat index is measured instead, once per
+quantization and rescore factor, alongside the memory each setting keeps
+resident per vector, so the setting can be picked to fit a deployment.
+"""
+import argparse
+import tempfile
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from src.services.local_vector_store import LocalVectorIndex
+
+
+def synthetic_corpus(count: int, dimension: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Gaussian mixture around random unit centres, roughly the shape of text embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    centres /= np.linalg.norm(centres, axis=1, keepdims=True)
+    labels = rng.integers(0, clusters, count)
+    noise = rng.standard_normal((count, dimension)).astype(np.float32) * (0.6 / np.sqrt(dimension))
+    return centres[labels] + noise
+
+
+def build_index(vectors: np.ndarray, nlist: Optional[int]) -> LocalVectorIndex:
+    index = LocalVectorIndex(index_type="ivf", nlist=nlist, autosave=False, ivf_train_size=len(vectors) + 1)
+    batch = 10_000
+    for start in range(0, len(vectors), batch):
+        chunk = vectors[start:start + batch]
+        index.upsert([{"id": str(start + i), "values": row} for i, row in enumerate(chunk)])
+    index.train()
+    return index
+
+
+def _timed_ids(index: LocalVectorIndex, queries: np.ndarray, k: int, **options) -> tuple:
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append([match["id"] for match in index.query(query, top_k=k, include_metadata=False, **options)["matches"]])
+    return results, (time.perf_counter() - start) / len(queries)
+
+
+def recall_report(
+        index: LocalVectorIndex,
+        queries: np.ndarray,
+        k: int = 10,
+        nprobes: List[int] = (1, 2, 4, 8, 16, 32, 64)
+) -> List[dict]:
+    """
+    Measure recall@k and mean query latency for each ``nprobe`` against exact search.
+
+    Returns:
+        List[dict]: One row per setting with ``nprobe``, ``recall`` and ``latency_ms``;
+            the exact baseline has ``nprobe`` None and recall 1.0
+    """
+    exact, exact_latency = _timed_ids(index, queries, k, exact=True)
+    rows = [{"nprobe": None, "recall": 1.0, "latency_ms": exact_latency * 1000}]
+    for nprobe in nprobes:
+        if nprobe > index.ivf.nlist:
+            break
+        approximate, latency = _timed_ids(index, queries, k, nprobe=nprobe)
+        hits = sum(len(set(truth) & set(found)) for truth, found in zip(exact, approximate))
+        rows.append({
+            "nprobe": nprobe,
+            "recall": hits / sum(len(truth) for truth in exact),
+            "latency_ms": latency * 1000,
+        })
+    return rows
+
+
+def quantization_report(
+        vectors: np.ndarray,
+        queries: np.ndarray,
+        k: int = 10,
+        quantizations: List[Optional[str]] = (None, "int8", "pq"),
+        rescore_factors: List[int] = (0, 4),
+        pq_subvectors: Optional[int] = None
+) -> List[dict]:
+    """
+    Measure recall@k, latency and memory of flat search for each quantization setting.
+
+    Indexes are built in a temporary directory so quantized settings keep their
+    full-precision vectors on disk, as they would in a deployment.
+
+    Returns:
+        List[dict]: One row per setting with ``quantization``, ``rescore_factor``,
+            ``recall``, ``latency_ms``, ``bytes_per_vector`` (resident) and
+            ``mapped_bytes`` (on disk)
+    """
+    rows = []
+    exact = None
+    with tempfile.TemporaryDirectory() as work_dir:
+        for number, quantization in enumerate(quantizations):
+            index = LocalVectorIndex(
+                f"{work_dir}/{number}", autosave=False, quantization=quantization,
+                pq_subvectors=pq_subvectors, pq_train_size=len(vectors) + 1
+            )
+            batch = 10_000
+            for start in range(0, len(vectors), batch):
+                chunk = vectors[start:start + batch]
+                index.upsert([{"id": str(start + i), "values": row} for i, row in enumerate(chunk)])
+            index.train()
+            if exact is None:
+                exact, _ = _timed_ids(index, queries, k, exact=True)
+
+            memory = index.memory_usage()
+            for rescore_factor in (rescore_factors if quantization else [None]):
+                if rescore_factor is not None:
+                    index.rescore_factor = rescore_factor
+                found, latency = _timed_ids(index, queries, k)
+                hits = sum(len(set(truth) & set(ids)) for truth, ids in zip(exact, found))
+                rows.append({
+                    "quantization": quantization,
+                    "rescore_factor": rescore_factor,
+                    "recall": hits / sum(len(truth) for truth in exact),
+                    "latency_ms": latency * 1000,
+                    "bytes_per_vector": memory["bytes_per_vector"],
+                    "mapped_bytes": memory["mapped_bytes"],
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", help="Directory of a saved LocalVectorIndex")
+    parser.add_argument("--count", type=int, default=100_000, help="Synthetic corpus size")
+    parser.add_argument("--dimension", type=int, default=1536, help="Synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Recall@k cut-off")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF clusters, 4 * sqrt(n) if omitted")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument("--quantization", nargs="+", choices=["none", "int8", "pq"],
+                        help="Report flat search per quantization instead of IVF per nprobe")
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 4],
+                        help="Rescore factors to measure for quantized settings")
+    parser.add_argument("--pq-subvectors", type=int, default=None, help="PQ bytes per vector")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.index_dir:
+        vectors = LocalVectorIndex(args.index_dir).vectors.copy()
+    else:
+        vectors = synthetic_corpus(args.count, args.dimension, seed=args.seed)
+    if len(vectors) == 0:
+        raise SystemExit("No vectors to evaluate")
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = queries + rng.standard_normal(queries.shape).astype(np.float32) * queries.std() * 0.1
+
+    if args.quantization:
+        print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+        print(f"{'quant':>6} {'rescore':>8} {'recall@k':>10} {'ms/query':>10} {'B/vector':>9} {'resident MB':>12}")
+        settings = [None if name == "none" else name for name in args.quantization]
+        for row in quantization_report(vectors, queries, args.k, settings, args.rescore, args.pq_subvectors):
+            rescore = "-" if row["rescore_factor"] is None else str(row["rescore_factor"])
+            resident = row["bytes_per_vector"] * len(vectors) / 2 ** 20
+            print(f"{row['quantization'] or 'none':>6} {rescore:>8} {row['recall']:>10.3f} "
+                  f"{row['latency_ms']:>10.2f} {row['bytes_per_vector']:>9} {resident:>12.1f}")
+        return
+
+    start = time.perf_counter()
+    index = build_index(vectors, args.nlist)
+    build_seconds = time.perf_counter() - start
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, nlist={index.ivf.nlist}, "
+          f"built in {build_seconds:.1f}s, {len(queries)} queries, k={args.k}")
+    print(f"{'nprobe':>8} {'recall@k':>10} {'ms/query':>10} {'speedup':>9}")
+    rows = recall_report(index, queries, args.k, args.nprobe)
+    exact_latency = rows[0]["latency_ms"]
+    for row in rows:
+        label = "exact" if row["nprobe"] is None else str(row["nprobe"])
+        print(f"{label:>8} {row['recall']:>10.3f} {row['latency_ms']:>10.2f} {exact_latency / row['latency_ms']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """
+    Hold an advisory lock on ``path`` for the duration of the block.
+
+    Locks are taken with flock(2), so they coordinate every process on the host
+    that uses the same lock file and are released automatically if a process dies.
+    On platforms without fcntl the lock is a no-op.
+
+    Args:
+        path (Path): Lock file, created if missing
+        shared (bool): Take a shared (reader) lock instead of an exclusive one
+    """
+    if fcntl is None:
+        yield
+        return
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
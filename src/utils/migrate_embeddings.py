@@ -0,0 +1,172 @@
+"""
+Move the indexed corpus to another embedding model or dimension.
+
+Every document in the source engine's document store is given a target
+embedding and upserted into the target index in batches, with progress and
+an ETA logged as it goes. The source index is never touched, so it keeps
+serving until the application is switched over.
+
+Modes:
+    reembed  Embed every chunk again with the target model and size. Works for
+             any change; the target embedding cache lets an interrupted run
+             resume without paying for the same chunks twice.
+    project  Shorten the source embeddings: keep the first N dimensions and
+             re-normalise. This is how text-embedding-3 models shorten their
+             output, so the vectors match what the API returns for queries at
+             that size. Only valid with the same text-embedding-3 model on both
+             sides; no embedding calls are made for chunks in the source cache.
+
+Usage:
+    python -m src.utils.migrate_embeddings --target-index recommendation-index-256 \\
+        --model text-embedding-3-small --dimensions 256
+    python -m src.utils.migrate_embeddings --mode project --source-model text-embedding-3-large \\
+        --target-index recommendation-index-512 --model text-embedding-3-large --dimensions 512
+    python -m src.utils.migrate_embeddings --backend local --model text-embedding-3-small --dimensions 256
+
+With the local backend the target vectors go to their own local index under
+the same cache directory, next to the current one.
+"""
+import argparse
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.services.embedding_cache import DEFAULT_EMBEDDING_MODEL, FIXED_DIMENSION_MODELS
+from src.services.retrival_engine import RetrivalEngine
+
+logger = logging.getLogger(__name__)
+
+
+def shorten(vectors, dimension: int) -> np.ndarray:
+    """Keep the first ``dimension`` values of each row and rescale the rows to unit length."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.shape[1] < dimension:
+        raise ValueError(f"Cannot shorten {vectors.shape[1]}-d embeddings to {dimension} dimensions")
+    shortened = vectors[:, :dimension]
+    norms = np.linalg.norm(shortened, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return shortened / norms
+
+
+def _check_projection(source: RetrivalEngine, target: RetrivalEngine) -> None:
+    source_model = source.embedding_model or DEFAULT_EMBEDDING_MODEL
+    target_model = target.embedding_model or DEFAULT_EMBEDDING_MODEL
+    if source_model != target_model:
+        raise ValueError(f"Cannot project {source_model} embeddings into {target_model}; use --mode reembed")
+    if source_model in FIXED_DIMENSION_MODELS:
+        raise ValueError(f"{source_model} embeddings cannot be shortened; use --mode reembed")
+    if not target.embedding_dimension or target.embedding_dimension >= (source.embedding_dimension or 0):
+        raise ValueError("Projection needs a target dimension smaller than the source dimension")
+
+
+def migrate(
+        source: RetrivalEngine,
+        target: RetrivalEngine,
+        mode: str = "reembed",
+        batch_size: int = 256,
+        limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Copy every document of ``source`` into ``target`` with target-sized embeddings.
+
+    Args:
+        source (RetrivalEngine): Engine whose document store lists the corpus
+        target (RetrivalEngine): Engine configured with the new model, dimension and index
+        mode (str): "reembed" or "project", see the module docstring
+        batch_size (int): Documents per embedding and upsert batch
+        limit (int, optional): Stop after this many documents, e.g. for a trial run
+
+    Returns:
+        Dict[str, Any]: ``documents`` migrated, ``seconds`` taken and the ``mode``
+    """
+    if mode not in ("reembed", "project"):
+        raise ValueError(f"Unknown migration mode: {mode!r}; expected 'reembed' or 'project'")
+    if mode == "project":
+        _check_projection(source, target)
+
+    total = len(source.document_store)
+    if limit is not None:
+        total = min(total, limit)
+    logger.info(
+        "Migrating %d documents to %s (%s, %s dimensions) by %s",
+        total, target.index_name, target.embedding_model or DEFAULT_EMBEDDING_MODEL,
+        target.embedding_dimension, mode,
+    )
+
+    start = time.perf_counter()
+    done = 0
+    for batch in source.document_store.iter_documents(batch_size):
+        batch = batch[:total - done]
+        if not batch:
+            break
+        ids = [doc_id for doc_id, _, _ in batch]
+        contents = [content for _, content, _ in batch]
+        # The stored metadata includes the content itself
+        metadatas = [{key: value for key, value in metadata.items() if key != "content"} for _, _, metadata in batch]
+
+        if mode == "project":
+            embeddings = shorten(source.embed_items(contents), target.embedding_dimension)
+        else:
+            embeddings = target.embed_items(contents)
+        target.add_embedded_items(ids, contents, metadatas, embeddings, flush=False)
+
+        done += len(batch)
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate else 0.0
+        logger.info("Migrated %d/%d documents (%.1f%%, %.0f docs/s, ETA %.0fs)",
+                    done, total, 100.0 * done / max(total, 1), rate, eta)
+        if done >= total:
+            break
+
+    target.flush_index()
+    target.retrieval_cache.flush()
+    seconds = time.perf_counter() - start
+    logger.info("Migrated %d documents in %.1fs", done, seconds)
+    return {"documents": done, "seconds": seconds, "mode": mode}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cache-dir", default="./embedding_cache", help="Cache directory of the current corpus")
+    parser.add_argument("--target-cache-dir", help="Cache directory of the target, --cache-dir if omitted")
+    parser.add_argument("--source-index", default="recommendation-index", help="Current Pinecone index")
+    parser.add_argument("--source-model", help="Current embedding model, text-embedding-ada-002 if omitted")
+    parser.add_argument("--source-dimensions", type=int, help="Current embedding size, the model's own if omitted")
+    parser.add_argument("--target-index", help="Pinecone index to create and fill; required with Pinecone")
+    parser.add_argument("--model", help="Target embedding model, the source model if omitted")
+    parser.add_argument("--dimensions", type=int, required=True, help="Target embedding size, e.g. 256 or 512")
+    parser.add_argument("--mode", choices=["reembed", "project"], default="reembed")
+    parser.add_argument("--backend", choices=["pinecone", "local"],
+                        help="Vector backend of the target; chosen from ENVIRONMENT if omitted")
+    parser.add_argument("--namespace-key", help="Metadata key to route target vectors into namespaces by")
+    parser.add_argument("--batch-size", type=int, default=256, help="Documents per batch")
+    parser.add_argument("--limit", type=int, help="Migrate at most this many documents")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    source = RetrivalEngine(
+        index_name=args.source_index,
+        cache_dir=args.cache_dir,
+        embedding_model=args.source_model,
+        embedding_dimensions=args.source_dimensions,
+    )
+    target = RetrivalEngine(
+        index_name=args.target_index or args.source_index,
+        cache_dir=args.target_cache_dir or args.cache_dir,
+        embedding_model=args.model or args.source_model,
+        embedding_dimensions=args.dimensions,
+        vector_backend=args.backend,
+        namespace_key=args.namespace_key,
+    )
+    if target.use_pinecone and (not args.target_index or args.target_index == args.source_index):
+        raise SystemExit("Give --target-index: a Pinecone index cannot change dimension in place")
+
+    stats = migrate(source, target, mode=args.mode, batch_size=args.batch_size, limit=args.limit)
+    print(f"Migrated {stats['documents']} documents in {stats['seconds']:.1f}s ({stats['mode']})")
+
+
+if __name__ == "__main__":
+    main()
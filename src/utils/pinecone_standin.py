@@ -0,0 +1,215 @@
+"""
+Local stand-in for the Pinecone data-plane REST API.
+
+Serves upsert, query, fetch, delete and describe_index_stats from an
+in-process ``LocalBackend``, so the retrieval services can be run, load-tested
+and benchmarked offline through the real Pinecone client.
+
+Usage:
+    python -m src.utils.pinecone_standin --port 5081 --path ./standin_index
+
+then point the services at it, either with ``PINECONE_INDEX_HOST=http://localhost:5081``
+in the environment or explicitly:
+
+    RetrivalEngine(vector_backend=PineconeBackend(host="http://localhost:5081", api_key="standin"))
+
+Any API key is accepted. Only the dense-vector operations above are served;
+sparse values, list and update are not.
+"""
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.services.vector_backend import LocalBackend
+
+logger = logging.getLogger(__name__)
+
+
+def _records(response: Dict[str, Any], include_values: bool = True) -> list:
+    records = []
+    for match in response["matches"]:
+        record = {"id": match["id"], "score": match["score"], "values": match.get("values", []) if include_values else []}
+        if match.get("metadata"):
+            record["metadata"] = match["metadata"]
+        records.append(record)
+    return records
+
+
+class StandInServer:
+    """
+    Threaded HTTP server speaking the Pinecone data-plane API over a ``LocalBackend``.
+
+    Request and response bodies use Pinecone's camelCase JSON, so both the
+    sync and asyncio Pinecone clients can be pointed at ``url``.
+    """
+
+    def __init__(self, backend: Optional[LocalBackend] = None, host: str = "127.0.0.1", port: int = 5081):
+        """
+        Bind the server; call ``serve_forever`` or ``start`` to handle requests.
+
+        Args:
+            backend (LocalBackend, optional): Store to serve, a fresh in-memory one if None
+            host (str): Interface to listen on
+            port (int): Port to listen on, any free port if 0
+        """
+        self.backend = backend if backend is not None else LocalBackend(autosave=False)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def upsert(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        vectors = [
+            {"id": vector["id"], "values": vector["values"], "metadata": vector.get("metadata") or {}}
+            for vector in body.get("vectors", [])
+        ]
+        self.backend.upsert(vectors, namespace=body.get("namespace", ""))
+        return {"upsertedCount": len(vectors)}
+
+    def query(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        namespace = body.get("namespace", "")
+        vector = body.get("vector")
+        if vector is None and body.get("id") is not None:
+            stored = self.backend.fetch([body["id"]], namespace=namespace)["vectors"].get(body["id"])
+            vector = stored["values"] if stored else None
+        if vector is None:
+            raise ValueError("Query needs a vector or the id of a stored vector")
+        include_values = bool(body.get("includeValues"))
+        response = self.backend.query(
+            vector,
+            top_k=int(body["topK"]),
+            filter=body.get("filter"),
+            namespace=namespace,
+            include_metadata=bool(body.get("includeMetadata")),
+            include_values=include_values,
+        )
+        return {"matches": _records(response, include_values), "namespace": namespace, "usage": {"readUnits": 1}}
+
+    def fetch(self, query: Dict[str, list]) -> Dict[str, Any]:
+        namespace = query.get("namespace", [""])[0]
+        vectors = self.backend.fetch(query.get("ids", []), namespace=namespace)["vectors"]
+        return {
+            "vectors": {
+                item_id: {"id": item_id, "values": list(vector["values"]), "metadata": vector["metadata"]}
+                for item_id, vector in vectors.items()
+            },
+            "namespace": namespace,
+            "usage": {"readUnits": 1},
+        }
+
+    def delete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        self.backend.delete(
+            body.get("ids"),
+            namespace=body.get("namespace", ""),
+            filter=body.get("filter"),
+            delete_all=bool(body.get("deleteAll")),
+        )
+        return {}
+
+    def describe_index_stats(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        stats = self.backend.describe_index_stats()
+        return {
+            "namespaces": {name: {"vectorCount": entry["vector_count"]} for name, entry in stats["namespaces"].items()},
+            "dimension": stats["dimension"] or 0,
+            "indexFullness": 0.0,
+            "totalVectorCount": stats["total_vector_count"],
+        }
+
+    def dispatch(self, method: str, path: str, body: Optional[Dict[str, Any]]) -> Tuple[int, Dict[str, Any]]:
+        """Route one request; returns the status code and JSON response body."""
+        url = urlparse(path)
+        routes = {
+            ("POST", "/vectors/upsert"): lambda: self.upsert(body),
+            ("POST", "/query"): lambda: self.query(body),
+            ("GET", "/vectors/fetch"): lambda: self.fetch(parse_qs(url.query)),
+            ("POST", "/vectors/delete"): lambda: self.delete(body),
+            ("POST", "/describe_index_stats"): lambda: self.describe_index_stats(body),
+            ("GET", "/describe_index_stats"): lambda: self.describe_index_stats({}),
+        }
+        route = routes.get((method, url.path))
+        if route is None:
+            return 404, {"code": 5, "message": f"Not found: {method} {url.path}"}
+        try:
+            return 200, route()
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {"code": 3, "message": str(e)}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self, method: str) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length)) if length else {}
+                except json.JSONDecodeError as e:
+                    status, payload = 400, {"code": 3, "message": f"Invalid JSON: {e}"}
+                else:
+                    status, payload = server.dispatch(method, self.path, body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, format, *args):
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def start(self) -> "StandInServer":
+        """Serve from a daemon thread, e.g. inside a benchmark or load test."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=5081, help="Port to listen on")
+    parser.add_argument("--path", help="Directory to persist the index in; in-memory if omitted")
+    parser.add_argument("--index-type", default="flat", choices=["flat", "ivf"], help="Local index search mode")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = StandInServer(LocalBackend(args.path, index_type=args.index_type), host=args.host, port=args.port)
+    logger.info("Serving the Pinecone data-plane API at %s", server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.backend.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+# The services import each other as ``src.services...`` from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeEmbeddings:
+    """Deterministic stand-in for the OpenAI embeddings client that records every call."""
+
+    def __init__(self, dimensions: int = 1536):
+        # Defaults to the size of text-embedding-ada-002, the engine's default model
+        self.dimensions = dimensions
+        self.calls = 0
+        self.texts = []
+
+    def vector(self, text: str):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [digest[i % len(digest)] / 255.0 + 0.01 for i in range(self.dimensions)]
+
+    def embed_query(self, text):
+        self.calls += 1
+        self.texts.append(text)
+        return self.vector(text)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts.extend(texts)
+        return [self.vector(text) for text in texts]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+
+@pytest.fixture(autouse=True)
+def openai_api_key(monkeypatch):
+    # EmbeddingCache builds an OpenAIEmbeddings client, which needs a key even if it is never called
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+
+@pytest.fixture
+def fake_embeddings():
+    return FakeEmbeddings()
+
+
+@pytest.fixture
+def make_cache(tmp_path, fake_embeddings):
+    """Build EmbeddingCaches under a temporary directory that embed with ``fake_embeddings``."""
+    from src.services.embedding_cache import EmbeddingCache
+
+    def make(cache_dir=None, model=None, **options):
+        cache = EmbeddingCache(cache_dir=str(cache_dir or tmp_path / "cache"), **options)
+        cache.embeddings_model = model or fake_embeddings
+        return cache
+
+    return make
+
+
+@pytest.fixture
+def make_engine(tmp_path, fake_embeddings):
+    """Build local-index RetrivalEngines under a temporary directory that embed with ``fake_embeddings``."""
+    from src.services.retrival_engine import RetrivalEngine
+
+    def make(cache_dir=None, model=None, **options):
+        options.setdefault("use_pinecone", False)
+        engine = RetrivalEngine(cache_dir=str(cache_dir or tmp_path / "engine"), **options)
+        engine.embedding_cache.embeddings_model = model or fake_embeddings
+        return engine
+
+    return make
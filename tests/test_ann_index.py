@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.services.ann_index import IVFIndex
+from src.services.local_vector_store import LocalVectorIndex
+from src.utils.ann_recall_report import build_index, recall_report, synthetic_corpus
+
+
+def test_untrained_ivf_index_refuses_to_assign():
+    with pytest.raises(RuntimeError):
+        IVFIndex().assign(np.ones((1, 4), dtype=np.float32))
+
+
+def test_probing_every_cluster_is_exact():
+    corpus = synthetic_corpus(2000, 32, clusters=16)
+    index = build_index(corpus, nlist=16)
+    queries = synthetic_corpus(20, 32, clusters=16, seed=1)
+
+    rows = recall_report(index, queries, k=5, nprobes=[1, 4, 16])
+
+    recalls = [row["recall"] for row in rows]
+    assert recalls[-1] == 1.0
+    assert recalls[1] <= recalls[2] <= recalls[3]
+    assert recalls[2] > 0.8
+
+
+def test_ivf_state_round_trips():
+    index = IVFIndex(nlist=8)
+    index.train(synthetic_corpus(500, 16, clusters=8))
+
+    restored = IVFIndex.from_state(index.state())
+
+    np.testing.assert_array_equal(restored.centroids, index.centroids)
+    query = synthetic_corpus(1, 16, seed=3)[0]
+    assert set(restored.probe(query, 3)) == set(index.probe(query, 3))
+
+
+def test_ivf_local_index_trains_and_persists(tmp_path):
+    corpus = synthetic_corpus(600, 16, clusters=8)
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(path, index_type="ivf", nlist=8, nprobe=8, ivf_train_size=500)
+    index.upsert([{"id": str(n), "values": row} for n, row in enumerate(corpus)])
+
+    assert index.ivf is not None and index.ivf.trained
+    reopened = LocalVectorIndex(path, index_type="ivf", nlist=8, nprobe=8, ivf_train_size=500)
+    assert reopened.ivf is not None
+    matches = reopened.query(corpus[42], top_k=1)["matches"]
+    assert matches[0]["id"] == "42"
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+
+def test_aget_embeddings_matches_the_sync_api(make_cache, fake_embeddings):
+    cache = make_cache()
+
+    async def main():
+        single = await cache.aget_embedding("a")
+        many = await cache.aget_embeddings(["a", "b", "b"])
+        return single, many
+
+    single, many = asyncio.run(main())
+
+    assert many[0] == pytest.approx(single)
+    assert many[1] == many[2] == pytest.approx(fake_embeddings.vector("b"))
+    assert cache.get_embeddings(["a", "b"]) == many[:2]
+    assert sorted(fake_embeddings.texts) == ["a", "b"]
+
+
+def test_concurrent_async_misses_embed_once(make_cache, fake_embeddings):
+    cache = make_cache()
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_embeddings(["x", "y"]) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert all(result == results[0] for result in results)
+    assert sorted(fake_embeddings.texts) == ["x", "y"]
+
+
+def test_async_engine_adds_and_retrieves_like_the_sync_engine(make_engine):
+    engine = make_engine()
+
+    async def main():
+        ids = await engine.abulk_add_items(["apples", "pears"], [{"src": "a"}, {"src": "b"}], ["fruit", "fruit"])
+        return ids, await engine.aget_retrivals("apples", top_k=2)
+
+    ids, results = asyncio.run(main())
+
+    assert [result["id"] for result in results] == ids
+    assert results[0]["metadata"] == {"src": "a", "item_type": "fruit", "content": "apples"}
+    assert engine.get_retrivals("apples", top_k=2) == results
+
+
+def test_first_async_call_opens_the_engine_off_the_event_loop(tmp_path, make_engine):
+    cache_dir = tmp_path / "engine"
+    make_engine(cache_dir).bulk_add_items(["apples", "pears"], [{}, {}], ["fruit", "fruit"])
+    engine = make_engine(cache_dir)
+    open_index = engine._open_index
+
+    def slow_open_index():
+        time.sleep(0.3)
+        return open_index()
+
+    engine._open_index = slow_open_index
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        matches = await engine.aget_retrivals("apples", top_k=1)
+        ticker.cancel()
+        return matches, ticks
+
+    matches, ticks = asyncio.run(main())
+
+    assert matches[0]["metadata"]["content"] == "apples"
+    assert ticks >= 10
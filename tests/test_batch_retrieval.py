@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.services.local_vector_store import LocalVectorIndex
+
+
+def test_query_many_matches_individual_queries():
+    rng = np.random.default_rng(0)
+    index = LocalVectorIndex()
+    index.upsert([
+        {"id": str(n), "values": row, "metadata": {"parity": n % 2}}
+        for n, row in enumerate(rng.standard_normal((50, 8)))
+    ])
+    queries = rng.standard_normal((4, 8))
+    filters = [None, {"parity": 0}, None, {"parity": 1}]
+
+    batched = index.query_many(queries, top_k=3, filters=filters)
+
+    for response, query, query_filter in zip(batched, queries, filters):
+        single = index.query(query, top_k=3, filter=query_filter)["matches"]
+        assert [match["id"] for match in response["matches"]] == [match["id"] for match in single]
+        np.testing.assert_allclose(
+            [match["score"] for match in response["matches"]], [match["score"] for match in single], rtol=1e-5
+        )
+
+
+def populated_engine(make_engine):
+    engine = make_engine()
+    engine.bulk_add_items(
+        ["apples", "pears", "carrots", "leeks"], [{}, {}, {}, {}], ["fruit", "fruit", "vegetable", "vegetable"]
+    )
+    return engine
+
+
+def test_batch_retrieval_matches_single_retrievals(make_engine):
+    engine = populated_engine(make_engine)
+    queries = ["apples", "leeks", "apples"]
+    filters = [None, {"item_type": "vegetable"}, {"item_type": "fruit"}]
+
+    batched = engine.get_retrivals_batch(queries, top_k=2, filters=filters)
+
+    engine.clear_retrieval_cache()
+    assert batched == [engine.get_retrivals(query, top_k=2, filter_criteria=f) for query, f in zip(queries, filters)]
+    assert {match["metadata"]["item_type"] for match in batched[1]} == {"vegetable"}
+
+
+def test_batch_retrieval_embeds_uncached_queries_in_one_request(make_engine, fake_embeddings):
+    engine = populated_engine(make_engine)
+    engine.get_retrivals("apples")
+    calls = fake_embeddings.calls
+
+    results = engine.get_retrivals_batch(["apples", "plums", "figs", "plums"], top_k=1)
+
+    assert fake_embeddings.calls == calls + 1
+    assert fake_embeddings.texts[-2:] == ["plums", "figs"]
+    assert results[1] == results[3]
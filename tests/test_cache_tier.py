@@ -0,0 +1,61 @@
+import numpy as np
+
+from src.services.cache_tier import BoundedCache
+
+
+def test_lru_evicts_the_least_recently_read():
+    cache = BoundedCache(max_entries=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache.get("a")
+    cache["c"] = 3
+
+    assert list(cache) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lfu_evicts_the_least_frequently_read():
+    evicted = []
+    cache = BoundedCache(max_entries=2, policy="lfu", on_evict=lambda key, value: evicted.append(key))
+    cache["a"] = 1
+    cache.get("a")
+    cache.get("a")
+    cache["b"] = 2
+    cache.get("b")
+    cache["c"] = 3
+
+    assert sorted(cache) == ["a", "c"]
+    assert evicted == ["b"]
+
+
+def test_byte_budget_counts_array_buffers():
+    cache = BoundedCache(max_bytes=3 * 4 * 8)
+    for key in "abcd":
+        cache[key] = np.zeros(8, dtype=np.float32)
+
+    assert list(cache) == ["b", "c", "d"]
+    assert cache.current_bytes == 3 * 4 * 8
+
+
+def test_ttl_expires_entries_on_read():
+    now = [0.0]
+    cache = BoundedCache(ttl=10, clock=lambda: now[0])
+    cache["a"] = 1
+    now[0] = 11
+
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_embedding_cache_serves_evicted_entries_from_disk(make_cache, fake_embeddings):
+    cache = make_cache(max_memory_entries=2)
+    for text in "abc":
+        cache.get_embedding(text)
+
+    assert len(cache.cache) == 2
+    cache.get_embedding("a")
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["stored"] == 3
+    assert fake_embeddings.calls == 3
@@ -0,0 +1,55 @@
+import pytest
+
+
+def populated_engine(make_engine, **options):
+    engine = make_engine(**options)
+    ids = engine.bulk_add_items(
+        ["apples", "pears", "carrots"],
+        [{"source": "orchard"}, {"source": "orchard"}, {"source": "field"}],
+        ["fruit", "fruit", "vegetable"],
+    )
+    return engine, ids
+
+
+def test_delete_items_removes_vectors_and_documents(make_engine):
+    engine, ids = populated_engine(make_engine)
+
+    assert engine.delete_items([ids[0], ids[0], "unknown"]) == 1
+
+    assert ids[0] not in engine.index
+    assert engine.document_store.get_many([ids[0]]) == {}
+    assert ids[0] not in [match["id"] for match in engine.get_retrivals("apples", top_k=3)]
+
+
+def test_delete_items_only_drops_cached_results_containing_them(make_engine):
+    engine, ids = populated_engine(make_engine)
+    engine.get_retrivals("apples", top_k=1)
+    engine.get_retrivals("carrots", top_k=1, filter_criteria={"item_type": "vegetable"})
+
+    engine.delete_items([ids[0]])
+
+    assert len(engine.retrieval_cache) == 1
+
+
+def test_delete_items_sends_batched_requests(make_engine, monkeypatch):
+    engine, ids = populated_engine(make_engine)
+    monkeypatch.setattr(engine, "DELETE_BATCH_SIZE", 2)
+    batches = []
+    delete = engine.index.delete
+    monkeypatch.setattr(engine.index, "delete", lambda chunk, **kwargs: batches.append(list(chunk)) or delete(chunk, **kwargs))
+
+    assert engine.delete_items(ids) == 3
+    assert [len(batch) for batch in batches] == [2, 1]
+
+
+def test_delete_by_filter_matches_full_document_metadata(make_engine):
+    engine, ids = populated_engine(make_engine, filterable_fields=[])
+
+    assert engine.delete_by_filter({"source": "orchard"}) == 2
+
+    assert len(engine.index) == 1 and ids[2] in engine.index
+
+
+def test_delete_by_filter_requires_a_filter(make_engine):
+    with pytest.raises(ValueError):
+        make_engine().delete_by_filter({})
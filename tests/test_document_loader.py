@@ -0,0 +1,122 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.document_loader import HostLimiter, _interleave_hosts, iter_load_results, load_documents_concurrently, load_url
+
+PAGE = b"<html lang='en'><head><title>Apples</title></head><body>Apples are fruit.</body></html>"
+
+
+class Site:
+    """Serves HTML pages and records how many requests are in flight at once."""
+
+    def __init__(self):
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.failures = {}
+
+    def handle(self, handler):
+        with self.lock:
+            self.requests.append(handler.path)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            if handler.path.startswith("/slow"):
+                time.sleep(0.1)
+            if handler.path == "/missing":
+                handler.send_error(404)
+                return
+            if self.failures.get(handler.path, 0) > 0:
+                self.failures[handler.path] -= 1
+                handler.send_error(503)
+                return
+            handler.send_response(200)
+            handler.send_header("Content-Type", "text/html")
+            handler.send_header("Content-Length", str(len(PAGE)))
+            handler.end_headers()
+            handler.wfile.write(PAGE)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def site():
+    state = Site()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            state.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_load_url_parses_html(site):
+    result = load_url(f"{site.url}/apples")
+
+    assert result["error"] is None and result["attempts"] == 1
+    assert result["bytes"] == len(PAGE)
+    (document,) = result["documents"]
+    assert "Apples are fruit." in document.page_content
+    assert document.metadata == {"source": f"{site.url}/apples", "title": "Apples", "language": "en"}
+
+
+def test_load_url_retries_server_errors(site):
+    site.failures["/flaky"] = 2
+
+    result = load_url(f"{site.url}/flaky", base_delay=0.01)
+
+    assert result["error"] is None and result["attempts"] == 3
+
+
+def test_load_url_reports_client_errors_without_retrying(site):
+    result = load_url(f"{site.url}/missing", base_delay=0.01)
+
+    assert result["error"].startswith("HTTPError") and result["attempts"] == 1
+    assert result["documents"] == []
+    assert load_url("not a url")["error"].startswith("ValueError")
+
+
+def test_results_cover_each_distinct_url_in_input_order(site):
+    urls = [f"{site.url}/b", "", f"{site.url}/missing", f"{site.url}/a", f"{site.url}/b "]
+
+    results = load_documents_concurrently(urls)
+
+    assert [result["url"] for result in results] == [f"{site.url}/b", f"{site.url}/missing", f"{site.url}/a"]
+    assert [result["error"] is None for result in results] == [True, False, True]
+    assert sorted(site.requests) == ["/a", "/b", "/missing"]
+
+
+def test_per_host_limit_caps_concurrent_requests(site):
+    urls = [f"{site.url}/slow/{n}" for n in range(8)]
+
+    results = list(iter_load_results(urls, max_workers=8, per_host_limit=2))
+
+    assert len(results) == 8 and all(result["error"] is None for result in results)
+    assert site.peak == 2
+
+
+def test_host_limiter_shares_one_semaphore_per_host():
+    limiter = HostLimiter(per_host=1)
+
+    assert limiter("http://A.example/x") is limiter("http://a.example/y")
+    assert limiter("http://a.example/") is not limiter("http://b.example/")
+
+
+def test_urls_are_interleaved_across_hosts():
+    urls = ["http://a/1", "http://a/2", "http://a/3", "http://b/1"]
+
+    assert _interleave_hosts(urls) == ["http://a/1", "http://b/1", "http://a/2", "http://a/3"]
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+from src.services.document_store import MAX_FILTERABLE_STRING, DocumentStore, filterable_metadata
+
+
+def test_filterable_metadata_keeps_short_scalars_and_string_lists():
+    metadata = {
+        "content": "chunk text",
+        "source": "https://example.com",
+        "page": 3,
+        "tags": ["a", "b"],
+        "summary": "x" * (MAX_FILTERABLE_STRING + 1),
+        "nested": {"a": 1},
+    }
+
+    assert filterable_metadata(metadata) == {"source": "https://example.com", "page": 3, "tags": ["a", "b"]}
+    assert filterable_metadata(metadata, fields=["page", "content", "missing"]) == {"page": 3}
+
+
+def test_document_store_round_trips_and_selects_fields(tmp_path):
+    store = DocumentStore(str(tmp_path / "documents.sqlite3"))
+    store.put_many([("a", "first", {"source": "x", "page": 1}), ("b", "second", {"source": "y"})])
+    store.put_many([("a", "first, edited", {"source": "x", "page": 2})])
+
+    assert len(store) == 2 and "a" in store
+    assert store.get_many(["a", "missing"]) == {"a": {"source": "x", "page": 2, "content": "first, edited"}}
+    assert store.get_many(["a", "b"], fields=["source"]) == {"a": {"source": "x"}, "b": {"source": "y"}}
+
+
+def test_document_store_finds_and_deletes_by_filter(tmp_path):
+    store = DocumentStore(str(tmp_path / "documents.sqlite3"))
+    store.put_many([(str(n), f"text {n}", {"page": n}) for n in range(5)])
+
+    ids = store.find_ids({"page": {"$gte": 3}})
+
+    assert sorted(ids) == ["3", "4"]
+    assert store.delete_many(ids) == 2
+    assert len(store) == 3
+
+
+def test_engine_keeps_text_out_of_the_index(make_engine):
+    engine = make_engine()
+    long_text = "word " * 100
+    [item_id] = engine.bulk_add_items([long_text], [{"source": "s", "notes": "n" * 1000}], ["article"])
+
+    indexed = engine.index.fetch([item_id])["vectors"][item_id]["metadata"]
+    assert indexed == {"source": "s", "item_type": "article"}
+    result = engine.get_retrivals(long_text, top_k=1)[0]
+    assert result["metadata"]["content"] == long_text
+    assert result["metadata"]["notes"] == "n" * 1000
+
+
+def test_async_add_stores_documents_off_the_event_loop(make_engine, monkeypatch):
+    engine = make_engine()
+    threads = []
+    put_many = engine.document_store.put_many
+
+    def recording_put_many(documents):
+        threads.append(threading.current_thread())
+        return put_many(documents)
+
+    monkeypatch.setattr(engine.document_store, "put_many", recording_put_many)
+
+    async def main():
+        await engine.abulk_add_items(["apples"], [{}], ["fruit"])
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+
+    assert threads and loop_thread not in threads
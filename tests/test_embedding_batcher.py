@@ -0,0 +1,92 @@
+import pytest
+
+from src.services import embedding_batcher
+from src.services.embedding_batcher import BatchEmbedder, call_with_retry, is_retryable, pack_batches
+
+
+class ApiError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    delays = []
+    monkeypatch.setattr(embedding_batcher.time, "sleep", delays.append)
+    return delays
+
+
+def test_pack_batches_respects_token_and_size_budgets():
+    items = [(str(n), "x" * tokens) for n, tokens in enumerate([3, 3, 3, 5, 1, 1, 1])]
+    batches = pack_batches(items, len, max_batch_tokens=6, max_batch_size=2)
+
+    assert [[key for key, _ in batch] for batch in batches] == [["0", "1"], ["2"], ["3", "4"], ["5", "6"]]
+
+
+def test_pack_batches_keeps_an_oversized_text_in_its_own_batch():
+    batches = pack_batches([("a", "x" * 10), ("b", "x")], len, max_batch_tokens=4)
+
+    assert [[key for key, _ in batch] for batch in batches] == [["a"], ["b"]]
+
+
+def test_is_retryable():
+    assert is_retryable(ApiError(429))
+    assert is_retryable(ApiError(503))
+    assert not is_retryable(ApiError(400))
+    assert not is_retryable(ValueError("bad input"))
+
+
+def test_call_with_retry_backs_off_on_retryable_errors(no_sleep):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ApiError(429)
+        return "ok"
+
+    assert call_with_retry(flaky, max_retries=5) == "ok"
+    assert len(attempts) == 3
+    assert len(no_sleep) == 2
+
+
+def test_call_with_retry_raises_other_errors_at_once(no_sleep):
+    def broken():
+        raise ApiError(400)
+
+    with pytest.raises(ApiError):
+        call_with_retry(broken)
+    assert no_sleep == []
+
+
+def test_batch_embedder_sends_one_request_per_batch(no_sleep, fake_embeddings):
+    embedder = BatchEmbedder(fake_embeddings.embed_documents, max_batch_tokens=10_000, max_batch_size=3, max_concurrency=2)
+    items = [(str(n), f"text {n}") for n in range(7)]
+
+    results = {}
+    for batch in embedder.embed(items):
+        results.update(batch)
+
+    assert fake_embeddings.calls == 3
+    assert results["6"] == fake_embeddings.vector("text 6")
+
+
+def test_embedding_client_leaves_batching_and_retries_to_the_cache(tmp_path):
+    from src.services.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(cache_dir=str(tmp_path), max_batch_size=64)
+
+    assert cache.embeddings_model.chunk_size == 64
+    assert cache.embeddings_model.max_retries == 0
+
+
+def test_get_embeddings_packs_misses_into_batches(make_cache, fake_embeddings, no_sleep):
+    cache = make_cache(max_batch_size=5, max_concurrency=3)
+    texts = [f"text number {n}" for n in range(12)]
+
+    embeddings = cache.get_embeddings(texts + texts[:2])
+
+    assert len(embeddings) == 14
+    assert fake_embeddings.calls == 3
+    assert embeddings[12] == embeddings[0]
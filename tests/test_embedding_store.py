@@ -0,0 +1,93 @@
+import multiprocessing
+import pickle
+
+import pytest
+
+from src.services.embedding_store import AppendOnlyEmbeddingStore
+
+
+def key(n: int) -> str:
+    return f"{n:032x}"
+
+
+def test_append_only_store_round_trips_across_instances(tmp_path):
+    path = tmp_path / "embeddings.log"
+    store = AppendOnlyEmbeddingStore(str(path))
+    written = store.put_many({key(1): [1.0, 2.0], key(2): [3.0, 4.0]})
+
+    assert written == path.stat().st_size
+    reopened = AppendOnlyEmbeddingStore(str(path))
+    assert len(reopened) == 2
+    assert reopened.get(key(2)) == pytest.approx([3.0, 4.0])
+
+
+def test_append_only_store_skips_keys_already_stored(tmp_path):
+    store = AppendOnlyEmbeddingStore(str(tmp_path / "embeddings.log"))
+    store.put(key(1), [1.0])
+
+    assert store.put_many({key(1): [9.0]}) == 0
+    assert store.get(key(1)) == pytest.approx([1.0])
+
+
+def test_append_only_store_drops_a_torn_tail(tmp_path):
+    path = tmp_path / "embeddings.log"
+    AppendOnlyEmbeddingStore(str(path)).put_many({key(1): [1.0, 2.0]})
+    with open(path, "ab") as f:
+        f.write(b"partial record")
+
+    store = AppendOnlyEmbeddingStore(str(path))
+    assert len(store) == 1
+    store.put(key(2), [5.0, 6.0])
+    assert AppendOnlyEmbeddingStore(str(path)).get(key(2)) == pytest.approx([5.0, 6.0])
+
+
+def test_append_only_store_compact_and_clear_are_seen_by_other_instances(tmp_path):
+    path = tmp_path / "embeddings.log"
+    store = AppendOnlyEmbeddingStore(str(path))
+    other = AppendOnlyEmbeddingStore(str(path))
+    store.put_many({key(n): [float(n)] for n in range(10)})
+
+    store.compact()
+    assert other.refresh() == 10
+    assert other.get(key(7)) == pytest.approx([7.0])
+
+    store.clear()
+    other.refresh()
+    assert len(other) == 0
+
+
+def test_embedding_cache_imports_the_legacy_pickle_once(tmp_path, make_cache, fake_embeddings):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    with open(cache_dir / "embedding_cache.pkl", "wb") as f:
+        pickle.dump({key(1): [0.5, 0.25]}, f)
+
+    cache = make_cache(cache_dir)
+    assert len(cache.store) == 1
+    cache.get_embeddings(["hello", "world"])
+    assert fake_embeddings.calls == 1
+
+    reopened = make_cache(cache_dir)
+    assert len(reopened.store) == 3
+    assert reopened.get_embedding("hello") == pytest.approx(cache.get_embedding("hello"))
+    assert fake_embeddings.calls == 1
+
+
+def _append(path: str, worker: int, count: int) -> None:
+    store = AppendOnlyEmbeddingStore(path)
+    for n in range(count):
+        store.put_many({key(worker * 1000 + n): [float(worker)], key(999_999): [1.0]})
+
+
+def test_append_only_store_merges_concurrent_writers(tmp_path):
+    path = str(tmp_path / "embeddings.log")
+    workers = [multiprocessing.Process(target=_append, args=(path, worker, 50)) for worker in range(1, 4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    store = AppendOnlyEmbeddingStore(path)
+    assert len(store) == 3 * 50 + 1
+    assert store.get(key(3049)) == pytest.approx([3.0])
@@ -0,0 +1,95 @@
+import pytest
+from langchain_core.documents import Document
+
+from src.services import ingestion_pipeline
+from src.services.ingestion_pipeline import IngestionPipeline
+from src.services.local_vector_store import LocalVectorIndex
+
+PAGES = {
+    "http://site/fruit": "apples\n\npears\n\nplums",
+    "http://site/vegetables": "carrots\n\nleeks",
+}
+
+
+class ParagraphSplitter:
+    def split_documents(self, documents):
+        return [
+            Document(page_content=paragraph, metadata=document.metadata)
+            for document in documents
+            for paragraph in document.page_content.split("\n\n")
+        ]
+
+
+@pytest.fixture(autouse=True)
+def fake_loader(monkeypatch):
+    def iter_load_results(urls, **options):
+        for url in urls:
+            if url in PAGES:
+                yield {"url": url, "documents": [Document(page_content=PAGES[url], metadata={"source": url})], "error": None}
+            else:
+                yield {"url": url, "documents": [], "error": "HTTPError: 404"}
+
+    monkeypatch.setattr(ingestion_pipeline, "iter_load_results", iter_load_results)
+
+
+def pipeline(engine, **options):
+    return IngestionPipeline(engine, "article", splitter=ParagraphSplitter(), metadata={"category": "food"}, batch_size=2, **options)
+
+
+def test_run_indexes_every_chunk_and_reports_stats(make_engine):
+    engine = make_engine()
+
+    stats = pipeline(engine).run([*PAGES, "http://site/missing"])
+
+    assert {key: stats[key] for key in ("urls", "failed", "documents", "chunks", "skipped", "upserted")} == {
+        "urls": 2, "failed": 1, "documents": 2, "chunks": 5, "skipped": 0, "upserted": 5,
+    }
+    assert stats["failed_urls"] == [("http://site/missing", "HTTPError: 404")]
+    match = engine.get_retrivals("leeks", top_k=1)[0]
+    assert match["metadata"]["content"] == "leeks"
+    assert match["metadata"]["category"] == "food" and match["metadata"]["item_type"] == "article"
+
+
+def test_rerun_skips_indexed_chunks_without_embedding_them(make_engine, fake_embeddings):
+    engine = make_engine()
+    pipeline(engine).run(list(PAGES))
+    calls = fake_embeddings.calls
+
+    stats = pipeline(engine).run(list(PAGES))
+
+    assert stats["skipped"] == 5 and stats["upserted"] == 0
+    assert fake_embeddings.calls == calls
+
+
+def test_local_index_is_saved_once_per_run(make_engine, monkeypatch):
+    saves = []
+    save = LocalVectorIndex._save
+    monkeypatch.setattr(LocalVectorIndex, "_save", lambda index: saves.append(index.path) or save(index))
+    engine = make_engine()
+
+    pipeline(engine, embed_workers=3).run(list(PAGES))
+
+    assert len(saves) == 1 and len(engine.index) == 5
+
+
+def test_stage_failures_stop_the_run(make_engine, monkeypatch):
+    engine = make_engine()
+
+    def embed_items(contents):
+        raise RuntimeError("embeddings unavailable")
+
+    monkeypatch.setattr(engine, "embed_items", embed_items)
+
+    with pytest.raises(RuntimeError, match="embeddings unavailable"):
+        pipeline(engine).run(list(PAGES))
+    assert len(engine.index) == 0
+
+
+def test_engine_embed_items_goes_through_the_cache(make_engine, fake_embeddings):
+    engine = make_engine()
+
+    first = engine.embed_items(["apples", "pears"])
+    second = engine.embed_items(["pears", "apples"])
+
+    assert fake_embeddings.calls == 1
+    assert list(second[0]) == list(first[1])
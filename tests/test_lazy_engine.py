@@ -0,0 +1,48 @@
+import pytest
+
+from src.config import pinecone_config
+from src.services.retrival_engine import RetrivalEngine
+
+
+def test_constructing_an_engine_opens_nothing(tmp_path):
+    engine = RetrivalEngine(cache_dir=str(tmp_path), use_pinecone=False)
+
+    assert engine._embedding_cache is None
+    assert engine._index is None
+    assert engine._document_store is None
+    assert engine._retrieval_cache is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_warm_up_opens_every_component(tmp_path):
+    engine = RetrivalEngine(cache_dir=str(tmp_path), use_pinecone=False)
+
+    timings = engine.warm_up()
+
+    assert set(timings) == {"embedding_cache", "retrieval_cache", "document_store", "index"}
+    assert engine._embedding_cache is not None and engine._index is not None
+
+
+def test_shared_returns_one_engine_per_configuration(tmp_path):
+    first = RetrivalEngine.shared(cache_dir=str(tmp_path / "a"), use_pinecone=False)
+
+    assert RetrivalEngine.shared(cache_dir=str(tmp_path / "a"), use_pinecone=False) is first
+    assert RetrivalEngine.shared(cache_dir=str(tmp_path / "b"), use_pinecone=False) is not first
+
+
+def test_pinecone_clients_are_pooled_per_key(monkeypatch):
+    created = []
+    monkeypatch.setattr(pinecone_config, "Pinecone", lambda api_key: created.append(api_key) or object())
+    monkeypatch.setattr(pinecone_config, "_clients", {})
+
+    assert pinecone_config.get_pinecone_client("key-1") is pinecone_config.get_pinecone_client("key-1")
+    pinecone_config.get_pinecone_client("key-2")
+
+    assert created == ["key-1", "key-2"]
+
+
+def test_missing_pinecone_key_is_reported(monkeypatch):
+    monkeypatch.delenv("PINECONE_API_KEY", raising=False)
+
+    with pytest.raises(ValueError):
+        pinecone_config.get_pinecone_client()
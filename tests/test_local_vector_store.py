@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from src.services.local_vector_store import LocalVectorIndex, NamespacedLocalIndex
+
+
+def vectors():
+    return [
+        {"id": "x", "values": [1.0, 0.0, 0.0], "metadata": {"kind": "axis", "rank": 1}},
+        {"id": "y", "values": [0.0, 1.0, 0.0], "metadata": {"kind": "axis", "rank": 2}},
+        {"id": "xy", "values": [1.0, 1.0, 0.0], "metadata": {"kind": "diagonal", "rank": 3}},
+    ]
+
+
+@pytest.fixture
+def count_saves(monkeypatch):
+    saves = []
+    save = LocalVectorIndex._save
+
+    def counted(index):
+        saves.append(index.path)
+        save(index)
+
+    monkeypatch.setattr(LocalVectorIndex, "_save", counted)
+    return saves
+
+
+def test_query_ranks_by_cosine_similarity():
+    index = LocalVectorIndex()
+    index.upsert(vectors())
+
+    matches = index.query([1.0, 0.1, 0.0], top_k=2)["matches"]
+
+    assert [match["id"] for match in matches] == ["x", "xy"]
+    assert matches[0]["score"] == pytest.approx(0.995, abs=1e-3)
+    assert matches[0]["metadata"] == {"kind": "axis", "rank": 1}
+
+
+def test_query_applies_pinecone_style_filters():
+    index = LocalVectorIndex()
+    index.upsert(vectors())
+
+    matches = index.query([1.0, 0.0, 0.0], top_k=3, filter={"kind": "axis", "rank": {"$gte": 2}})["matches"]
+
+    assert [match["id"] for match in matches] == ["y"]
+
+
+def test_upsert_replaces_and_delete_removes():
+    index = LocalVectorIndex()
+    index.upsert(vectors())
+    index.upsert([{"id": "x", "values": [0.0, 0.0, 1.0], "metadata": {"kind": "moved"}}])
+
+    assert index.fetch(["x"])["vectors"]["x"]["metadata"] == {"kind": "moved"}
+    assert index.delete(["x", "missing"]) == 1
+    assert "x" not in index and len(index) == 2
+
+
+def test_index_reloads_from_its_directory(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "index"))
+    index.upsert(vectors())
+
+    reopened = LocalVectorIndex(str(tmp_path / "index"))
+    assert len(reopened) == 3
+    assert reopened.query([0.0, 1.0, 0.0], top_k=1)["matches"][0]["id"] == "y"
+
+
+def test_save_interval_batches_saves(tmp_path, count_saves):
+    index = LocalVectorIndex(str(tmp_path / "index"), save_interval=0.1)
+    for vector in vectors():
+        index.upsert([vector])
+
+    assert count_saves == []
+    time.sleep(0.3)
+    assert len(count_saves) == 1
+    assert len(LocalVectorIndex(str(tmp_path / "index"))) == 3
+
+
+def test_flush_saves_pending_changes_once(tmp_path, count_saves):
+    index = NamespacedLocalIndex(str(tmp_path / "index"), save_interval=60)
+    index.upsert(vectors()[:2], namespace="a")
+    index.upsert(vectors()[2:], namespace="b")
+
+    index.flush()
+    index.flush()
+
+    assert len(count_saves) == 2
+    assert NamespacedLocalIndex(str(tmp_path / "index")).namespaces() == ["a", "b"]
+
+
+def test_engine_bulk_add_saves_the_local_index_once(make_engine, count_saves):
+    engine = make_engine()
+    engine.bulk_add_items([f"text {n}" for n in range(50)], [{}] * 50, ["note"] * 50)
+
+    assert len(count_saves) == 1
+    assert engine.get_retrivals("text 7", top_k=1)[0]["metadata"]["content"] == "text 7"
@@ -0,0 +1,181 @@
+import multiprocessing
+import threading
+
+import numpy as np
+import pytest
+
+from src.services.embedding_store import MemmapEmbeddingStore
+from src.utils.file_lock import file_lock
+
+
+def key(n: int) -> str:
+    return f"{n:032x}"
+
+
+def test_memmap_store_returns_read_only_views(tmp_path):
+    store = MemmapEmbeddingStore(str(tmp_path / "matrix.f32"))
+    store.put_many({key(1): [1.0, 2.0, 3.0]})
+
+    view = store.get(key(1))
+    assert view.dtype == np.float32
+    np.testing.assert_array_equal(view, [1.0, 2.0, 3.0])
+    with pytest.raises(ValueError):
+        view[0] = 0.0
+    assert store.get(key(2)) is None
+
+
+def test_memmap_store_grows_and_reopens(tmp_path):
+    path = str(tmp_path / "matrix.f32")
+    store = MemmapEmbeddingStore(path, initial_capacity=4)
+    store.put_many({key(n): [float(n)] * 3 for n in range(10)})
+
+    assert store.capacity >= 10
+    matrix = store.get_many([key(9), key(0), key(9)])
+    assert matrix.shape == (3, 3)
+    np.testing.assert_array_equal(matrix[:, 0], [9.0, 0.0, 9.0])
+    assert store.get_many([]).shape == (0, 3)
+
+    reopened = MemmapEmbeddingStore(path)
+    assert len(reopened) == 10
+    np.testing.assert_array_equal(reopened.get(key(5)), [5.0] * 3)
+
+
+def test_memmap_store_rejects_other_dimensions(tmp_path):
+    store = MemmapEmbeddingStore(str(tmp_path / "matrix.f32"))
+    store.put(key(1), [1.0, 2.0])
+
+    with pytest.raises(ValueError):
+        store.put(key(2), [1.0, 2.0, 3.0])
+
+
+def test_mmap_cache_imports_the_log_and_returns_arrays(tmp_path, make_cache, fake_embeddings):
+    cache_dir = tmp_path / "cache"
+    make_cache(cache_dir).get_embeddings(["a", "b"])
+
+    cache = make_cache(cache_dir, storage="mmap")
+    assert len(cache.store) == 2
+    embeddings = cache.get_embeddings(["a", "c", "b"])
+    assert isinstance(embeddings, np.ndarray)
+    assert embeddings.shape == (3, fake_embeddings.dimensions)
+    np.testing.assert_allclose(embeddings[1], fake_embeddings.vector("c"), rtol=1e-6)
+    assert fake_embeddings.texts == ["a", "b", "c"]
+
+
+def _write_rows(path: str, worker: int, count: int) -> None:
+    store = MemmapEmbeddingStore(path, initial_capacity=4)
+    for n in range(count):
+        store.put_many({key(worker * 1000 + n): [float(worker)] * 4, key(999_999): [1.0] * 4})
+
+
+def test_memmap_store_merges_concurrent_writers(tmp_path):
+    path = str(tmp_path / "matrix.f32")
+    workers = [multiprocessing.Process(target=_write_rows, args=(path, worker, 50)) for worker in range(1, 4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    store = MemmapEmbeddingStore(path)
+    assert len(store) == 3 * 50 + 1
+    np.testing.assert_array_equal(store.get(key(2049)), [2.0] * 4)
+
+
+def test_memmap_clear_and_regrow_across_two_instances(tmp_path):
+    path = str(tmp_path / "matrix.f32")
+    writer = MemmapEmbeddingStore(path, initial_capacity=4)
+    reader = MemmapEmbeddingStore(path)
+    writer.put_many({key(n): [float(n)] * 3 for n in range(3)})
+    reader.refresh()
+    view = reader.get(key(1))
+
+    writer.clear()
+    writer.put_many({key(100 + n): [100.0 + n] * 3 for n in range(10)})
+    reader.refresh()
+
+    # The old view keeps its values; the reader sees only the new generation
+    np.testing.assert_array_equal(view, [1.0] * 3)
+    assert reader.generation == writer.generation
+    assert len(reader) == 10
+    assert reader.get(key(1)) is None
+    np.testing.assert_array_equal(reader.get(key(105)), [105.0] * 3)
+
+
+def test_memmap_compact_keeps_rows_and_bumps_the_generation(tmp_path):
+    path = str(tmp_path / "matrix.f32")
+    writer = MemmapEmbeddingStore(path, initial_capacity=64)
+    reader = MemmapEmbeddingStore(path)
+    writer.put_many({key(n): [float(n)] * 3 for n in range(5)})
+    reader.refresh()
+    generation = reader.generation
+
+    writer.compact()
+    assert writer.capacity == 5
+    reader.refresh()
+    assert reader.generation == generation + 1
+    np.testing.assert_array_equal(reader.get_many([key(4), key(0)])[:, 0], [4.0, 0.0])
+
+    reader.put(key(9), [9.0] * 3)
+    writer.refresh()
+    np.testing.assert_array_equal(writer.get(key(9)), [9.0] * 3)
+
+
+def populated_pair(tmp_path):
+    path = str(tmp_path / "matrix.f32")
+    writer = MemmapEmbeddingStore(path, initial_capacity=64)
+    reader = MemmapEmbeddingStore(path)
+    writer.put_many({key(n): [float(n)] * 3 for n in range(5)})
+    reader.refresh()
+    return writer, reader
+
+
+def test_refresh_between_the_steps_of_a_compaction_reads_the_same_rows(tmp_path):
+    writer, reader = populated_pair(tmp_path)
+
+    # The matrix is swapped in before the keys are published
+    writer._replace_matrix(np.array(writer._matrix[:writer.rows]))
+    reader.refresh()
+
+    assert reader.capacity == 5
+    np.testing.assert_array_equal(reader.get_many([key(4), key(1)])[:, 0], [4.0, 1.0])
+
+
+def test_refresh_waits_for_a_clear_to_publish_its_keys(tmp_path):
+    writer, reader = populated_pair(tmp_path)
+
+    with file_lock(writer.lock_path):
+        writer._replace_matrix(None)
+        refresh = threading.Thread(target=reader.refresh)
+        refresh.start()
+        refresh.join(0.2)
+        assert refresh.is_alive()
+        writer._write_keys(writer.generation + 1, b"")
+    refresh.join()
+
+    assert reader.generation == writer.generation + 1
+    assert len(reader) == 0
+
+
+def test_refresh_finishes_a_clear_cut_short(tmp_path):
+    writer, reader = populated_pair(tmp_path)
+    generation = reader.generation
+
+    writer._replace_matrix(None)
+    reader.refresh()
+
+    assert reader.generation == generation + 1 and len(reader) == 0
+    reader.put(key(7), [7.0] * 3)
+    writer.refresh()
+    assert len(writer) == 1
+    np.testing.assert_array_equal(writer.get(key(7)), [7.0] * 3)
+
+
+def test_memmap_store_upgrades_a_keys_file_without_header(tmp_path):
+    path = tmp_path / "matrix.f32"
+    MemmapEmbeddingStore(str(path)).put_many({key(n): [1.0, 2.0] for n in range(2)})
+    keys_path = path.with_suffix(".keys")
+    keys_path.write_bytes(keys_path.read_bytes()[MemmapEmbeddingStore._HEADER.size:])
+
+    store = MemmapEmbeddingStore(str(path))
+    assert len(store) == 2
+    np.testing.assert_array_equal(store.get(key(1)), [1.0, 2.0])
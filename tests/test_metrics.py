@@ -0,0 +1,71 @@
+import pytest
+
+from src.services.metrics import (
+    EMBEDDING_CACHE_HITS,
+    EMBEDDING_CACHE_MISSES,
+    RETRIEVAL_CACHE_HITS,
+    RETRIEVAL_CACHE_MISSES,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+)
+
+
+def test_counter_tracks_values_per_label():
+    counter = Counter("requests_total", "Requests", ["status"])
+    counter.inc(status="ok")
+    counter.inc(2, status="ok")
+    counter.inc(status="error")
+
+    assert counter.value(status="ok") == 3
+    assert counter.snapshot() == {"ok": 3, "error": 1}
+    with pytest.raises(ValueError):
+        counter.inc(code="500")
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.render() == [
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3",
+    ]
+    assert histogram.snapshot()[""]["count"] == 3
+
+
+def test_registry_returns_the_existing_metric_for_a_name():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "Hits")
+
+    assert registry.counter("hits_total", "Hits") is counter
+    counter.inc()
+    assert registry.render_prometheus() == "# HELP hits_total Hits\n# TYPE hits_total counter\nhits_total 1\n"
+
+
+def test_embedding_cache_counts_hits_by_tier_and_misses(make_cache):
+    cache = make_cache()
+    misses = EMBEDDING_CACHE_MISSES.value()
+    memory_hits = EMBEDDING_CACHE_HITS.value(tier="memory")
+
+    cache.get_embedding("text")
+    cache.get_embedding("text")
+
+    assert EMBEDDING_CACHE_MISSES.value() == misses + 1
+    assert EMBEDDING_CACHE_HITS.value(tier="memory") == memory_hits + 1
+
+
+def test_engine_counts_retrieval_cache_hits_and_misses(make_engine):
+    engine = make_engine()
+    engine.bulk_add_items(["apples"], [{}], ["fruit"])
+    hits, misses = RETRIEVAL_CACHE_HITS.value(), RETRIEVAL_CACHE_MISSES.value()
+
+    engine.get_retrivals("apples")
+    engine.get_retrivals("apples")
+
+    assert RETRIEVAL_CACHE_MISSES.value() == misses + 1
+    assert RETRIEVAL_CACHE_HITS.value() == hits + 1
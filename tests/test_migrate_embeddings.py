@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from src.services.embedding_cache import embedding_variant
+from src.utils.migrate_embeddings import migrate, shorten
+from tests.conftest import FakeEmbeddings
+
+
+@pytest.mark.parametrize("model, dimensions, expected", [
+    (None, None, None),
+    ("text-embedding-ada-002", 1536, None),
+    ("text-embedding-3-small", 256, "text-embedding-3-small-256"),
+    ("text-embedding-3-large", None, "text-embedding-3-large-3072"),
+])
+def test_embedding_variant_names(model, dimensions, expected):
+    assert embedding_variant(model, dimensions) == expected
+
+
+def test_fixed_dimension_models_cannot_be_resized():
+    with pytest.raises(ValueError):
+        embedding_variant("text-embedding-ada-002", 256)
+
+
+def test_shorten_truncates_and_renormalises():
+    shortened = shorten([[3.0, 4.0, 12.0], [0.0, 0.0, 1.0]], 2)
+
+    np.testing.assert_allclose(shortened, [[0.6, 0.8], [0.0, 0.0]])
+    with pytest.raises(ValueError):
+        shorten([[1.0, 0.0]], 3)
+
+
+def test_variants_get_their_own_files(make_engine, tmp_path):
+    engine = make_engine(
+        embedding_model="text-embedding-3-small", embedding_dimensions=256, model=FakeEmbeddings(256)
+    )
+    engine.bulk_add_items(["apples"], [{}], ["fruit"])
+    engine.flush_index()
+
+    names = {path.name for path in (tmp_path / "engine").iterdir()}
+    assert "local_index-text-embedding-3-small-256" in names
+    assert "local_index" not in names
+
+
+def source_engine(make_engine, **options):
+    source = make_engine(**options)
+    source.bulk_add_items(["apples", "pears", "carrots"], [{"source": "orchard"}] * 3, ["fruit", "fruit", "vegetable"])
+    return source
+
+
+def test_reembed_copies_every_document_into_the_target(make_engine):
+    source = source_engine(make_engine)
+    target_model = FakeEmbeddings(256)
+    target = make_engine(
+        embedding_model="text-embedding-3-small", embedding_dimensions=256, model=target_model
+    )
+
+    stats = migrate(source, target, batch_size=2)
+
+    assert stats["documents"] == 3 and target_model.calls == 2
+    assert len(target.index) == 3
+    match = target.get_retrivals("pears", top_k=1)[0]
+    assert match["metadata"]["content"] == "pears" and match["metadata"]["source"] == "orchard"
+    assert len(source.index) == 3
+
+
+def test_limit_stops_a_trial_run_early(make_engine):
+    source = source_engine(make_engine)
+    target = make_engine(
+        embedding_model="text-embedding-3-small", embedding_dimensions=256, model=FakeEmbeddings(256)
+    )
+
+    assert migrate(source, target, batch_size=2, limit=1)["documents"] == 1
+    assert len(target.index) == 1
+
+
+def test_project_shortens_cached_source_embeddings(make_engine, fake_embeddings):
+    source = source_engine(make_engine, embedding_model="text-embedding-3-small", embedding_dimensions=1536)
+    target_model = FakeEmbeddings(256)
+    target = make_engine(
+        embedding_model="text-embedding-3-small", embedding_dimensions=256, model=target_model
+    )
+    calls = fake_embeddings.calls
+
+    assert migrate(source, target, mode="project")["documents"] == 3
+
+    assert fake_embeddings.calls == calls and target_model.calls == 0
+    stored = target.index.fetch([source.document_store.find_ids({"item_type": "vegetable"})[0]])
+    (vector,) = [entry["values"] for entry in stored["vectors"].values()]
+    np.testing.assert_allclose(vector, shorten([fake_embeddings.vector("carrots")], 256)[0], rtol=1e-5)
+
+
+@pytest.mark.parametrize("source_options, target_options", [
+    ({}, {"embedding_model": "text-embedding-3-small", "embedding_dimensions": 256}),
+    (
+        {"embedding_model": "text-embedding-3-small", "embedding_dimensions": 256},
+        {"embedding_model": "text-embedding-3-small", "embedding_dimensions": 512},
+    ),
+])
+def test_project_rejects_unshortenable_pairs(make_engine, source_options, target_options):
+    with pytest.raises(ValueError):
+        migrate(make_engine(**source_options), make_engine(**target_options), mode="project")
+
+
+def test_unknown_mode_is_rejected(make_engine):
+    with pytest.raises(ValueError):
+        migrate(make_engine(), make_engine(), mode="copy")
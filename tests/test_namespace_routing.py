@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from src.services.metadata_filter import pinned_values
+
+
+@pytest.mark.parametrize("filter_criteria, expected", [
+    (None, None),
+    ({"source": "x"}, None),
+    ({"item_type": "fruit"}, ["fruit"]),
+    ({"item_type": {"$eq": "fruit"}}, ["fruit"]),
+    ({"item_type": {"$in": ["fruit", "vegetable"]}}, ["fruit", "vegetable"]),
+    ({"item_type": {"$in": []}}, []),
+    ({"$and": [{"item_type": {"$in": ["fruit", "nut"]}}, {"item_type": "nut"}]}, ["nut"]),
+    ({"$and": [{"item_type": "fruit"}, {"item_type": "vegetable"}]}, []),
+    ({"$or": [{"item_type": "fruit"}, {"item_type": "vegetable"}]}, None),
+    ({"item_type": {"$ne": "fruit"}}, None),
+])
+def test_pinned_values(filter_criteria, expected):
+    assert pinned_values(filter_criteria, "item_type") == expected
+
+
+def routed_engine(make_engine):
+    engine = make_engine(namespace_key="item_type")
+    engine.bulk_add_items(
+        ["apples", "pears", "carrots"], [{}, {}, {}], ["fruit", "fruit", "vegetable"]
+    )
+    return engine
+
+
+def test_items_are_stored_in_their_type_namespace(make_engine):
+    engine = routed_engine(make_engine)
+
+    assert engine.index.namespaces() == ["fruit", "vegetable"]
+    assert engine._route({"item_type": "vegetable"}) == ["vegetable"]
+    assert engine._route(None) == ["fruit", "vegetable"]
+
+
+def test_unpinned_queries_fan_out_and_merge(make_engine):
+    engine = routed_engine(make_engine)
+
+    matches = engine.get_retrivals("apples", top_k=3)
+
+    assert len(matches) == 3
+    assert matches[0]["metadata"]["content"] == "apples"
+    assert [match["score"] for match in matches] == sorted((match["score"] for match in matches), reverse=True)
+
+
+def test_pinned_queries_only_search_their_namespace(make_engine):
+    engine = routed_engine(make_engine)
+
+    matches = engine.get_retrivals("apples", top_k=3, filter_criteria={"item_type": "vegetable"})
+
+    assert [match["metadata"]["content"] for match in matches] == ["carrots"]
+
+
+@pytest.mark.parametrize("filter_criteria", [
+    {"item_type": {"$in": []}},
+    {"$and": [{"item_type": "fruit"}, {"item_type": "vegetable"}]},
+])
+def test_filters_pinning_no_namespace_return_no_matches(make_engine, filter_criteria):
+    engine = routed_engine(make_engine)
+    vector = engine.embed_items(["apples"])[0]
+
+    assert engine._route(filter_criteria) == []
+    assert engine.get_retrivals("apples", filter_criteria=filter_criteria) == []
+    assert asyncio.run(engine._aquery(vector, 3, filter_criteria)) == {"matches": []}
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.services.embedding_store import MemmapEmbeddingStore
+from src.services.local_vector_store import LocalVectorIndex
+from src.services.quantization import ProductQuantizer, dequantize_int8, int8_scores, quantize_int8
+from src.utils.ann_recall_report import synthetic_corpus
+
+
+def test_int8_round_trip_error_is_within_half_a_step():
+    vectors = np.random.default_rng(0).standard_normal((20, 16)).astype(np.float32)
+
+    codes, scales = quantize_int8(vectors)
+
+    assert codes.dtype == np.int8
+    assert np.all(np.abs(dequantize_int8(codes, scales) - vectors) <= scales[:, None] / 2 + 1e-6)
+
+
+def test_int8_scores_approximate_dot_products():
+    vectors = np.random.default_rng(1).standard_normal((50, 32)).astype(np.float32)
+    query = vectors[7]
+    codes, scales = quantize_int8(vectors)
+
+    np.testing.assert_allclose(int8_scores(codes, scales, query), vectors @ query, atol=0.2)
+    np.testing.assert_allclose(int8_scores(codes, scales, query, rows=np.array([7, 3])), vectors[[7, 3]] @ query, atol=0.2)
+
+
+def test_product_quantizer_round_trips_its_state():
+    vectors = synthetic_corpus(400, 16, clusters=8)
+    quantizer = ProductQuantizer(subvectors=4)
+    quantizer.train(vectors)
+
+    restored = ProductQuantizer.from_state(quantizer.state())
+
+    assert quantizer.code_size == 4
+    np.testing.assert_array_equal(restored.encode(vectors[:5]), quantizer.encode(vectors[:5]))
+
+
+@pytest.mark.parametrize("quantization", ["int8", "pq"])
+def test_quantized_local_index_rescoring_finds_the_exact_neighbour(tmp_path, quantization):
+    corpus = synthetic_corpus(600, 32, clusters=16)
+    index = LocalVectorIndex(str(tmp_path / "index"), quantization=quantization, pq_train_size=500)
+    index.upsert([{"id": str(n), "values": row} for n, row in enumerate(corpus)])
+
+    match = index.query(corpus[123], top_k=1)["matches"][0]
+
+    assert match["id"] == "123"
+    assert match["score"] == pytest.approx(1.0, abs=1e-5)
+    usage = index.memory_usage()
+    assert usage["mapped_bytes"] == 600 * 32 * 4
+    assert usage["bytes_per_vector"] < 32 * 4
+
+
+def test_int8_memmap_store_decodes_close_to_the_original(tmp_path):
+    store = MemmapEmbeddingStore(str(tmp_path / "matrix.i8"), dtype="int8")
+    store.put_many({f"{n:032x}": [1.0, -2.0, 3.0 + n] for n in range(5)})
+
+    np.testing.assert_allclose(store.get(f"{3:032x}"), [1.0, -2.0, 6.0], atol=6.0 / 127)
+    assert store.get_many([f"{1:032x}"]).dtype == np.float32
+
+
+def test_int8_cache_imports_the_float32_matrix(tmp_path, make_cache, fake_embeddings):
+    cache_dir = tmp_path / "cache"
+    make_cache(cache_dir, storage="mmap").get_embeddings(["a", "b"])
+
+    quantized = make_cache(cache_dir, storage="mmap", quantization="int8")
+
+    assert len(quantized.store) == 2
+    np.testing.assert_allclose(quantized.get_embedding("a"), fake_embeddings.vector("a"), atol=0.01)
+    assert fake_embeddings.calls == 1
+
+
+def test_mapped_index_reloads_its_last_save_after_a_crash(tmp_path):
+    corpus = synthetic_corpus(4, 8, clusters=2)
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(path, quantization="int8", save_interval=60)
+    index.upsert([{"id": str(n), "values": row, "metadata": {"n": n}} for n, row in enumerate(corpus)])
+    index.flush()
+
+    # Overwrite one row and delete another, which moves the last row into its slot,
+    # then "crash": reload from disk without saving
+    index.autosave = False
+    index.upsert([{"id": "1", "values": corpus[2], "metadata": {"n": 2}}])
+    index.delete(["0"])
+    reloaded = LocalVectorIndex(path, quantization="int8")
+
+    assert sorted(reloaded.ids) == ["0", "1", "2", "3"]
+    for n, row in enumerate(corpus):
+        np.testing.assert_allclose(reloaded.fetch([str(n)])["vectors"][str(n)]["values"], row, rtol=1e-6)
+        assert reloaded.query(row, top_k=1)["matches"][0]["id"] == str(n)
+
+    index.save()
+    saved = LocalVectorIndex(path, quantization="int8")
+    assert sorted(saved.ids) == ["1", "2", "3"]
+    np.testing.assert_allclose(saved.fetch(["1"])["vectors"]["1"]["values"], corpus[2], rtol=1e-6)
+    np.testing.assert_allclose(saved.fetch(["3"])["vectors"]["3"]["values"], corpus[3], rtol=1e-6)
+    assert sorted(name for name in os.listdir(path) if name.endswith(".f32")) == ["vectors.1.f32"]
@@ -0,0 +1,131 @@
+import math
+import pickle
+
+from src.services.metrics import SEMANTIC_CACHE_HITS
+from src.services.retrieval_cache import RetrievalCache, SemanticQueryCache
+
+
+def results(*ids):
+    return [{"id": item_id, "score": 1.0} for item_id in ids]
+
+
+def test_invalidate_makes_every_entry_a_miss():
+    cache = RetrievalCache()
+    cache.put("q1", results("a"))
+    cache.put("q2", results("b"))
+
+    cache.invalidate()
+
+    assert cache.get("q1") is None and "q2" not in cache
+    cache.put("q1", results("c"))
+    assert cache.get("q1") == results("c")
+
+
+def test_discard_ids_only_drops_results_containing_them():
+    cache = RetrievalCache()
+    cache.put("q1", results("a", "b"))
+    cache.put("q2", results("b"))
+    cache.put("q3", results("c"))
+
+    assert cache.discard_ids(["b"]) == 2
+    assert cache.get("q1") is None and cache.get("q2") is None
+    assert cache.get("q3") == results("c")
+
+
+def test_entries_are_bounded():
+    cache = RetrievalCache(max_entries=2)
+    for n in range(3):
+        cache.put(f"q{n}", results(str(n)))
+
+    assert len(cache) == 2
+    assert cache.get("q0") is None
+    # Evicted entries leave the id index too
+    assert cache.discard_ids(["0"]) == 0
+
+
+def test_flush_is_batched_and_reloads_current_entries(tmp_path):
+    path = str(tmp_path / "retrievals.pkl")
+    cache = RetrievalCache(path, flush_every=4, flush_interval=3600)
+    cache.put("stale", results("a"))
+    cache.invalidate()
+    cache.put("q1", results("b"))
+    cache.maybe_flush()
+    assert not (tmp_path / "retrievals.pkl").exists()
+
+    cache.put("q2", results("c"))
+    cache.maybe_flush()
+
+    reloaded = RetrievalCache(path)
+    assert reloaded.generation == 1
+    assert reloaded.get("q2") == results("c")
+    assert reloaded.get("stale") is None
+
+
+def test_loads_the_legacy_format(tmp_path):
+    path = tmp_path / "retrievals.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"q1": results("a")}, f)
+
+    assert RetrievalCache(str(path)).get("q1") == results("a")
+
+
+def test_engine_invalidates_cached_results_when_items_are_added(make_engine):
+    engine = make_engine()
+    engine.bulk_add_items(["apples"], [{}], ["fruit"])
+    assert len(engine.get_retrivals("apples", top_k=5)) == 1
+
+    engine.bulk_add_items(["apple pie"], [{}], ["fruit"])
+
+    assert len(engine.get_retrivals("apples", top_k=5)) == 2
+
+
+def unit(degrees: float, dimensions: int = 4):
+    angle = math.radians(degrees)
+    return [math.cos(angle), math.sin(angle)] + [0.0] * (dimensions - 2)
+
+
+def test_semantic_cache_returns_candidates_above_the_threshold_best_first():
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.add(unit(0), "scope", "a")
+    cache.add(unit(30), "scope", "b")
+    cache.add(unit(90), "scope", "c")
+
+    assert cache.candidates(unit(20), "scope") == ["b", "a"]
+    assert cache.lookup(unit(20), "scope") == "b"
+    assert cache.lookup(unit(20), "other scope") is None
+
+
+def test_semantic_cache_discard_forgets_a_key():
+    cache = SemanticQueryCache(threshold=0.8)
+    cache.add(unit(0), "scope", "a")
+    cache.add(unit(10), "scope", "b")
+
+    cache.discard("scope", "a")
+
+    assert cache.candidates(unit(0), "scope") == ["b"]
+    assert len(cache) == 1
+
+
+def test_semantic_cache_overwrites_the_oldest_entry_when_full():
+    cache = SemanticQueryCache(threshold=0.99, max_entries=100)
+    for n in range(250):
+        cache.add(unit(n * 0.3, 8), "scope", f"q{n}")
+
+    assert len(cache) == 100
+    assert cache.lookup(unit(0, 8), "scope") is None
+    assert cache.lookup(unit(249 * 0.3, 8), "scope") == "q249"
+
+
+def test_engine_falls_back_to_the_next_similar_query(make_engine, fake_embeddings):
+    directions = {"a": 0, "b": 53, "c": 20, "item": 45}
+    fake_embeddings.vector = lambda text: unit(directions[text], fake_embeddings.dimensions)
+    engine = make_engine(semantic_cache_threshold=0.8, retrieval_cache_size=1)
+    engine.bulk_add_items(["item"], [{}], ["note"])
+    engine.get_retrivals("a")
+    # Caching b's results evicts a's, but the semantic cache still links to both
+    expected = engine.get_retrivals("b")
+    hits = SEMANTIC_CACHE_HITS.value()
+
+    assert engine.get_retrivals("c") == expected
+    assert SEMANTIC_CACHE_HITS.value() == hits + 1
+    assert len(engine.semantic_cache) == 1
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert not flight.in_flight("key")
+
+
+def test_errors_are_shared_with_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    call()
+    leader.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_do_many_only_computes_unclaimed_keys():
+    flight = SingleFlight()
+    computed = []
+
+    def compute(keys):
+        computed.append(sorted(keys))
+        return {key: key * 2 for key in keys}
+
+    assert flight.do_many([1, 2, 2, 3], compute) == {1: 2, 2: 4, 3: 6}
+    assert computed == [[1, 2, 3]]
+
+
+def test_cancelled_leader_hands_the_call_to_a_waiter():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        leader = asyncio.create_task(flight.ado("key", work))
+        await asyncio.sleep(0.01)
+        waiters = [asyncio.create_task(flight.ado("key", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await asyncio.gather(*waiters) == ["value"] * 3
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert len(calls) == 2
+        assert not flight.in_flight("key")
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_call_running():
+    async def main():
+        flight = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        leader = asyncio.create_task(flight.ado("key", work))
+        await asyncio.sleep(0.01)
+        cancelled = asyncio.create_task(flight.ado("key", work))
+        waiter = asyncio.create_task(flight.ado("key", work))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+
+        assert await leader == "value"
+        assert await waiter == "value"
+        assert cancelled.cancelled()
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_ado_many_retries_keys_of_a_cancelled_leader():
+    async def main():
+        flight = SingleFlight()
+
+        async def compute(keys):
+            await asyncio.sleep(0.05)
+            return {key: key * 2 for key in keys}
+
+        leader = asyncio.create_task(flight.ado_many([1, 2], compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(flight.ado_many([2, 3], compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        assert await waiter == {2: 4, 3: 6}
+
+    asyncio.run(main())
+
+
+def test_embedding_cache_coalesces_concurrent_misses(make_cache, fake_embeddings):
+    class SlowEmbeddings(type(fake_embeddings)):
+        def embed_documents(self, texts):
+            time.sleep(0.1)
+            return super().embed_documents(texts)
+
+    model = SlowEmbeddings()
+    cache = make_cache(model=model)
+    threads = [threading.Thread(target=cache.get_embeddings, args=(["same", "other"],)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(model.texts) == ["other", "same"]
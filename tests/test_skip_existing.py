@@ -0,0 +1,54 @@
+import asyncio
+
+
+def test_ids_are_derived_from_type_and_content(make_engine):
+    engine = make_engine()
+
+    first = engine.bulk_add_items(["apples", "apples"], [{}, {}], ["fruit", "recipe"])
+    second = make_engine(cache_dir=engine.cache_dir + "-other").bulk_add_items(["apples"], [{}], ["fruit"])
+
+    assert first[0] == second[0]
+    assert first[0] != first[1]
+
+
+def test_already_indexed_items_are_not_embedded_again(make_engine, fake_embeddings):
+    engine = make_engine()
+    engine.bulk_add_items(["apples", "pears"], [{}, {}], ["fruit", "fruit"])
+    engine.embedding_cache.clear_cache()
+    fake_embeddings.texts.clear()
+
+    ids = engine.bulk_add_items(["apples", "plums", "plums"], [{}, {}, {}], ["fruit"] * 3)
+
+    assert fake_embeddings.texts == ["plums"]
+    assert ids[1] == ids[2]
+    assert len(engine.index) == 3
+
+
+def test_skip_existing_false_overwrites_metadata(make_engine):
+    engine = make_engine()
+    engine.bulk_add_items(["apples"], [{"colour": "red"}], ["fruit"])
+
+    engine.bulk_add_items(["apples"], [{"colour": "green"}], ["fruit"], skip_existing=False)
+
+    assert engine.get_retrivals("apples", top_k=1)[0]["metadata"]["colour"] == "green"
+
+
+def test_pending_items_reports_positions_still_to_index(make_engine):
+    engine = make_engine()
+    engine.bulk_add_items(["apples"], [{}], ["fruit"])
+
+    ids, positions = engine.pending_items(["pears", "apples", "pears"], [{}, {}, {}], ["fruit"] * 3)
+
+    assert positions == [0]
+    assert ids[0] == ids[2]
+
+
+def test_async_add_skips_existing_items(make_engine, fake_embeddings):
+    engine = make_engine()
+    engine.bulk_add_items(["apples"], [{}], ["fruit"])
+    engine.embedding_cache.clear_cache()
+    fake_embeddings.texts.clear()
+
+    asyncio.run(engine.abulk_add_items(["apples", "pears"], [{}, {}], ["fruit", "fruit"]))
+
+    assert fake_embeddings.texts == ["pears"]
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from src.services import embedding_batcher
+from src.services.upsert_batcher import ParallelUpserter, estimate_payload_size, pack_upserts
+
+
+def records(count, dimensions=8, metadata=None):
+    return [{"id": f"id-{n}", "values": [0.5] * dimensions, "metadata": metadata or {}} for n in range(count)]
+
+
+def test_pack_upserts_respects_the_payload_budget():
+    vectors = records(10, dimensions=100)
+    budget = 3 * estimate_payload_size(vectors[0])
+
+    batches = pack_upserts(vectors, max_payload_bytes=budget)
+
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+    assert [vector for batch in batches for vector in batch] == vectors
+
+
+def test_pack_upserts_respects_the_vector_limit():
+    assert [len(batch) for batch in pack_upserts(records(5), max_vectors=2)] == [2, 2, 1]
+
+
+def test_metadata_counts_towards_the_payload():
+    slim = records(1)[0]
+    heavy = records(1, metadata={"text": "x" * 1000})[0]
+
+    assert estimate_payload_size(heavy) >= estimate_payload_size(slim) + 1000
+
+
+def test_parallel_upserter_sends_every_batch_per_namespace(monkeypatch):
+    monkeypatch.setattr(embedding_batcher.time, "sleep", lambda seconds: None)
+    sent = []
+    lock = threading.Lock()
+    failures = iter([True])
+
+    def upsert(batch, namespace=""):
+        if next(failures, False):
+            error = Exception("rate limited")
+            error.status_code = 429
+            raise error
+        with lock:
+            sent.append((namespace, [vector["id"] for vector in batch]))
+
+    vectors = records(5)
+    stats = ParallelUpserter(upsert, max_vectors=2, max_concurrency=3).upsert(vectors, ["a", "a", "a", "b", "b"])
+
+    assert sorted(sent) == [("a", ["id-0", "id-1"]), ("a", ["id-2"]), ("b", ["id-3", "id-4"])]
+    assert stats["batches"] == 3 and stats["vectors"] == 5
+
+
+def test_async_upserter_bounds_batches_in_flight():
+    in_flight = []
+    peak = []
+
+    async def aupsert(batch):
+        in_flight.append(batch)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(batch)
+
+    upserter = ParallelUpserter(lambda batch: None, aupsert, max_vectors=1, max_concurrency=2)
+    stats = asyncio.run(upserter.aupsert(records(6)))
+
+    assert stats["batches"] == 6
+    assert max(peak) == 2
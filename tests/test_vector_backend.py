@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from src.services.vector_backend import LocalBackend, PineconeBackend, VectorBackend, open_backend
+from src.utils.pinecone_standin import StandInServer
+
+
+@pytest.fixture
+def standin():
+    server = StandInServer(port=0).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def remote(standin):
+    return PineconeBackend(host=standin.url, api_key="standin")
+
+
+def vectors():
+    return [
+        {"id": "x", "values": [1.0, 0.0, 0.0], "metadata": {"kind": "axis"}},
+        {"id": "y", "values": [0.0, 1.0, 0.0], "metadata": {"kind": "axis"}},
+        {"id": "xy", "values": [1.0, 1.0, 0.0], "metadata": {"kind": "diagonal"}},
+    ]
+
+
+def test_open_backend_by_name():
+    assert isinstance(open_backend("local"), LocalBackend)
+    with pytest.raises(ValueError):
+        open_backend("faiss")
+
+
+def test_local_backend_is_a_vector_backend():
+    backend = LocalBackend()
+    backend.upsert(vectors(), namespace="shapes")
+
+    assert isinstance(backend, VectorBackend) and not backend.remote
+    assert backend.contains("x", namespace="shapes") and not backend.contains("x", namespace="")
+    assert backend.describe_index_stats()["namespaces"]["shapes"]["vector_count"] == 3
+
+
+def test_pinecone_client_round_trips_through_the_standin(remote):
+    remote.upsert(vectors(), namespace="shapes")
+
+    matches = remote.query([1.0, 0.1, 0.0], top_k=2, filter={"kind": "axis"}, namespace="shapes")["matches"]
+    assert [match["id"] for match in matches] == ["x", "y"]
+    assert matches[0]["metadata"] == {"kind": "axis"}
+    assert set(remote.fetch(["x", "missing"], namespace="shapes")["vectors"]) == {"x"}
+
+    remote.delete(["x"], namespace="shapes")
+    assert remote.describe_index_stats()["namespaces"]["shapes"]["vector_count"] == 2
+
+
+def test_async_pinecone_client_round_trips_through_the_standin(remote):
+    async def main():
+        await remote.aupsert(vectors())
+        response = await remote.aquery([0.0, 1.0, 0.0], top_k=1)
+        fetched = await remote.afetch(["xy"])
+        await remote.aclose()
+        return response, fetched
+
+    response, fetched = asyncio.run(main())
+
+    assert response["matches"][0]["id"] == "y"
+    assert fetched["vectors"]["xy"]["values"] == pytest.approx([1.0, 1.0, 0.0])
+
+
+def test_engine_runs_against_the_standin(remote, make_engine):
+    engine = make_engine(vector_backend=remote)
+    ids = engine.bulk_add_items(["apples", "pears"], [{}, {}], ["fruit", "fruit"])
+
+    assert engine.use_pinecone
+    assert engine.get_retrivals("apples", top_k=1)[0]["id"] == ids[0]
+    assert engine.bulk_add_items(["apples"], [{}], ["fruit"]) == ids[:1]
@@ -0,0 +1,91 @@
+import pytest
+
+from src.services.document_store import DocumentStore
+from src.services.vector_backend import LocalBackend
+from src.services.vector_store import PineconeVectorStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PineconeVectorStore(DocumentStore(str(tmp_path / "documents.sqlite3")), backend=LocalBackend())
+
+
+def populate(store):
+    return store.store_embeddings(
+        ["apples", "pears", "carrots"],
+        [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]],
+        [{"source": "orchard"}, {"source": "orchard"}, {"source": "field"}],
+    )
+
+
+def test_store_embeddings_keeps_documents_locally(store):
+    ids = populate(store)
+
+    assert len(store.document_store) == 3
+    assert store.get_embedding_by_content("pears")["metadata"] == {"source": "orchard", "content": "pears"}
+    assert store.get_total_vector_count() == 3
+    with pytest.raises(ValueError):
+        store.store_embeddings(["a"], [], [{}])
+
+    found, missing = store.get_embeddings_by_ids([ids[0], ids[0], "unknown"])
+    assert set(found) == {ids[0]} and missing == {"unknown"}
+
+
+def test_batched_fetches_cover_every_id(store, monkeypatch):
+    monkeypatch.setattr(store, "FETCH_BATCH_SIZE", 2)
+    populate(store)
+
+    found, missing = store.get_embeddings_by_contents(["apples", "pears", "carrots", "figs"])
+
+    assert set(found) == {"apples", "pears", "carrots"} and missing == {"figs"}
+
+
+def test_find_similar_returns_stored_metadata(store):
+    populate(store)
+
+    matches = store.find_similar([1.0, 0.0], top_k=2)
+
+    assert [match["metadata"]["source"] for match in matches] == ["orchard", "orchard"]
+
+
+def test_delete_embedding_drops_the_document(store):
+    ids = populate(store)
+
+    store.delete_embedding(ids[0])
+
+    assert store.get_embedding_by_id(ids[0]) is None
+    assert ids[0] not in store.document_store
+
+
+def test_delete_embeddings_by_filter_drops_matching_documents(store):
+    ids = populate(store)
+
+    store.delete_embeddings_by_filter({"source": "orchard"})
+
+    assert store.get_total_vector_count() == 1
+    assert list(store.document_store.get_many(ids)) == [ids[2]]
+
+
+def test_delete_embeddings_by_filter_stays_in_its_namespace(store, monkeypatch):
+    monkeypatch.setattr(store, "DELETE_BATCH_SIZE", 1)
+    populate(store)
+    kept = store.store_embeddings(["apples", "figs"], [[1.0, 0.0], [0.5, 0.5]], [{"source": "orchard"}] * 2, namespace="archive")
+
+    store.delete_embeddings_by_filter({"source": "orchard"})
+
+    assert store.get_total_vector_count() == 1
+    assert store.get_total_vector_count("archive") == 2
+    assert set(store.document_store.get_many(kept)) == set(kept)
+    found, missing = store.get_embeddings_by_ids(kept, namespace="archive")
+    assert set(found) == set(kept) and not missing
+
+
+def test_default_document_store_is_not_the_engines(tmp_path, monkeypatch, make_engine):
+    monkeypatch.chdir(tmp_path)
+    store = PineconeVectorStore(backend=LocalBackend())
+    populate(store)
+    engine = make_engine(cache_dir="./embedding_cache")
+
+    assert len(engine.document_store) == 0
+    assert engine.delete_by_filter({"source": "orchard"}) == 0
+    assert len(store.document_store) == 3